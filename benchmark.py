@@ -0,0 +1,1160 @@
+import argparse
+import asyncio
+import contextlib
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+#Folder containing task_manager.py
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, PROJECT_DIR)
+
+import task_manager
+
+def write_dataset(directory, num_users, num_tasks, seed = 1, completed = 0.4, due_spread = 90, skew = 0.0):
+    """
+    Function to write a tasks.txt and user.txt with random tasks into a folder
+
+    directory: string -> Folder to write the files into
+    num_users: int -> Number of users besides admin
+    num_tasks: int -> Number of tasks
+    seed: int -> Seed of the random numbers, the same seed writes the same files
+    completed: float -> Fraction of the tasks that are completed
+    due_spread: int -> Tasks are due up to this many days after they were assigned
+    skew: float -> 0 gives every user about the same number of tasks. Above 0 the n-th user
+                   gets tasks in proportion to 1/n**skew, so a few users have most of them
+    """
+    rand = random.Random(seed)
+    usernames = ["admin"] + [f"user{i}" for i in range(num_users)]
+    today = date.today()
+    if skew > 0:
+        cum_weights = list(itertools.accumulate(1 / rank**skew for rank in range(1, len(usernames) + 1)))
+        #Drawn all at once, the heaviest users come first after admin
+        assigned = rand.choices(usernames[1:] + usernames[:1], cum_weights=cum_weights, k=num_tasks)
+    else:
+        assigned = None
+
+    with open(os.path.join(directory, task_manager.USER_FILE), "w") as user_file:
+        user_file.write("\n".join(f"{username};password" for username in usernames))
+
+    with open(os.path.join(directory, task_manager.TASK_FILE), "w") as task_file:
+        lines = []
+        for i in range(num_tasks):
+            assigned_date = today - timedelta(days=rand.randint(0, 60))
+            due_date = assigned_date + timedelta(days=rand.randint(0, due_spread))
+            lines.append(";".join([
+                rand.choice(usernames) if assigned is None else assigned[i],
+                f"Task {i}",
+                f"Description of task {i}",
+                due_date.strftime(task_manager.DATETIME_STRING_FORMAT),
+                assigned_date.strftime(task_manager.DATETIME_STRING_FORMAT),
+                "Yes" if rand.random() < completed else "No"
+            ]))
+        task_file.write("\n".join(lines))
+
+def timed(function, *args):
+    """
+    Runs function(*args) and returns (seconds taken, result)
+    """
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+def show(label, seconds, note = ""):
+    """
+    Prints one benchmark result in milliseconds
+    """
+    print(f"{label:<32}{seconds*1000:10.1f} ms {note}")
+
+def bench_startup(num_tasks, num_users, repeats):
+    """
+    Benchmark of importing task_manager and of the first queries after start up
+
+    num_tasks: int -> Number of tasks in the dataset
+    num_users: int -> Number of users in the dataset
+    repeats: int -> Number of fresh interpreters the import is timed in
+    """
+    #Import time in a fresh interpreter each time, so nothing is cached
+    import_code = "import time; t = time.perf_counter(); import task_manager; print(time.perf_counter() - t)"
+    import_times = []
+    for i in range(repeats):
+        output = subprocess.run([sys.executable, "-c", import_code], cwd=PROJECT_DIR,
+                                capture_output=True, text=True, check=True).stdout
+        import_times.append(float(output))
+    show("import task_manager", statistics.median(import_times), f"(median of {repeats})")
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_dataset(directory, num_users, num_tasks)
+        old_dir = os.getcwd()
+        os.chdir(directory)
+        try:
+            store = task_manager.TaskStore()
+
+            #What a login needs
+            seconds, users = timed(lambda: store.users)
+            show("first login lookup", seconds)
+
+            #What view my tasks needs
+            seconds, tasks = timed(lambda: store.user_task_index.tasks_of("user0"))
+            show("first view of a user's tasks", seconds, f"({num_tasks} tasks loaded)")
+
+            #What generate reports needs
+            seconds, result = timed(task_manager.generate_reports, store)
+            show("first report", seconds)
+
+            seconds, result = timed(task_manager.generate_reports, store)
+            show("second report", seconds)
+        finally:
+            os.chdir(old_dir)
+
+def percentile(values, fraction):
+    """
+    Returns the value below which a fraction of the sorted values fall
+    """
+    return values[min(len(values)-1, int(len(values)*fraction))]
+
+async def server_client(socket_file, username, requests, latencies):
+    """
+    One load generator client: logs in and sends a mix of requests
+
+    socket_file: string -> Unix socket of the server
+    username: string -> User to log in as
+    requests: int -> Number of requests to send after logging in
+    latencies: list -> Seconds taken by every request are appended to it
+    """
+    import server
+    client = server.TaskClient()
+    await client.connect(socket_file)
+    await client.request("login", username=username, password="password")
+
+    rand = random.Random(username)
+    due_date = (date.today() + timedelta(days=30)).strftime(task_manager.DATETIME_STRING_FORMAT)
+    my_tasks = []
+    for i in range(requests):
+        choice = rand.random()
+        start = time.perf_counter()
+        if choice < 0.4 or not my_tasks:
+            response = await client.request("view_mine")
+            my_tasks = [index for index, title in response["tasks"]]
+        elif choice < 0.7:
+            response = await client.request("view_task", index=rand.choice(my_tasks))
+        elif choice < 0.85:
+            response = await client.request("add_task", username=username, title=f"Load {i}",
+                                            description="Added by the load generator", due_date=due_date)
+        elif choice < 0.95:
+            response = await client.request("set_due_date", index=rand.choice(my_tasks), due_date=due_date)
+            #Completed tasks cannot be changed, which is an expected answer
+            response["ok"] = True
+        else:
+            response = await client.request("report")
+        latencies.append(time.perf_counter() - start)
+        if not response["ok"]:
+            raise RuntimeError(response["error"])
+    await client.close()
+
+def bench_server(num_tasks, num_users, client_counts, requests):
+    """
+    Load test of server.py: starts a server on a generated dataset and runs
+    groups of concurrent clients against it, printing requests/sec and latencies
+
+    num_tasks: int -> Number of tasks in the dataset
+    num_users: int -> Number of users in the dataset
+    client_counts: list -> Numbers of concurrent clients to test
+    requests: int -> Number of requests each client sends
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        write_dataset(directory, num_users, num_tasks)
+        socket_file = os.path.join(directory, "bench.sock")
+        process = subprocess.Popen([sys.executable, os.path.join(PROJECT_DIR, "server.py"), "serve",
+                                    "--socket", socket_file], cwd=directory, stdout=subprocess.PIPE, text=True)
+        try:
+            #Wait for the server to finish loading
+            process.stdout.readline()
+
+            for clients in client_counts:
+                latencies = []
+                usernames = [f"user{i % num_users}" for i in range(clients)]
+
+                async def run_clients():
+                    await asyncio.gather(*[server_client(socket_file, username, requests, latencies)
+                                           for username in usernames])
+
+                seconds, result = timed(asyncio.run, run_clients())
+                latencies.sort()
+                print(f"{clients:4} clients: {len(latencies)/seconds:9.0f} requests/sec, "
+                      f"p50 {percentile(latencies, 0.5)*1000:7.2f} ms, p99 {percentile(latencies, 0.99)*1000:7.2f} ms")
+        finally:
+            process.terminate()
+            process.wait()
+
+def shared_writer(directory, worker, operations, results):
+    """
+    One writer process of the concurrency stress test: adds tasks, completes some of them
+    and moves the due dates of random tasks, all on the same files as the other writers
+
+    directory: string -> Folder with the shared tasks.txt and user.txt
+    worker: int -> Number of this writer, used in the titles of its tasks
+    operations: int -> Number of changes to make
+    results: multiprocessing.Queue -> (added titles, completed titles) is put on it at the end
+    """
+    rand = random.Random(worker)
+    storage = task_manager.TextStorage(os.path.join(directory, task_manager.TASK_FILE),
+                                       os.path.join(directory, task_manager.USER_FILE), mode="shared")
+    store = task_manager.TaskStore(storage)
+    added = []
+    completed = []
+    my_tasks = []
+
+    for i in range(operations):
+        choice = rand.random()
+        if choice < 0.5 or not my_tasks:
+            title = f"Writer {worker} task {i}"
+            task = task_manager.Task(f"user{worker}", title, "Added by the stress test", None, date.today(), False)
+            task.due_ordinal = date.today().toordinal() + 30
+            my_tasks.append(store.add_task(task))
+            added.append(title)
+        elif choice < 0.75:
+            #Completes one of its own tasks, the other writers must not undo it
+            task_index = rand.choice(my_tasks)
+            task = store.tasks[task_index]
+            old_task = task.copy()
+            task.completed = True
+            store.update_task(task_index, old_task)
+            completed.append(task.title)
+        else:
+            #Moves the due date of any task, which may be changed by another writer at the same time
+            task_index = rand.randrange(len(store.tasks))
+            task = store.tasks[task_index]
+            old_task = task.copy()
+            task.due_ordinal += 1
+            store.update_task(task_index, old_task)
+
+    store.close()
+    results.put((added, completed))
+
+def bench_concurrent(num_tasks, num_writers, operations, compact_limit):
+    """
+    Stress test of the "shared" task storage mode: runs writer processes on the same files at once,
+    then checks that no added task was lost or duplicated and no completed task was undone
+
+    num_tasks: int -> Number of tasks in the dataset
+    num_writers: int -> Number of writer processes
+    operations: int -> Number of changes each writer makes
+    compact_limit: int -> JOURNAL_COMPACT_LIMIT of the writers, low to compact often during the test
+    """
+    task_manager.JOURNAL_COMPACT_LIMIT = compact_limit
+    with tempfile.TemporaryDirectory() as directory:
+        write_dataset(directory, num_writers, num_tasks)
+        results = multiprocessing.Queue()
+        writers = [multiprocessing.Process(target=shared_writer, args=(directory, worker, operations, results))
+                   for worker in range(num_writers)]
+
+        start = time.perf_counter()
+        for writer in writers:
+            writer.start()
+        outcomes = [results.get() for writer in writers]
+        for writer in writers:
+            writer.join()
+        seconds = time.perf_counter() - start
+
+        tasks = task_manager.TextStorage(os.path.join(directory, task_manager.TASK_FILE),
+                                         os.path.join(directory, task_manager.USER_FILE), mode="shared").load_tasks()
+        title_counts = {}
+        for task in tasks:
+            title_counts[task.title] = title_counts.get(task.title, 0) + 1
+        completed_titles = {task.title for task in tasks if task.completed}
+
+        added = [title for outcome in outcomes for title in outcome[0]]
+        completed = {title for outcome in outcomes for title in outcome[1]}
+        lost = [title for title in added if title not in title_counts]
+        duplicated = [title for title in added if title_counts.get(title, 0) > 1]
+        undone = completed - completed_titles
+
+        print(f"{num_writers} writers, {num_writers*operations/seconds:.0f} changes/sec, "
+              f"{len(tasks)} tasks at the end ({num_tasks} + {len(added)} added)")
+        print(f"lost: {len(lost)}, duplicated: {len(duplicated)}, completions undone: {len(undone)}")
+        if lost or duplicated or undone or len(tasks) != num_tasks + len(added):
+            raise SystemExit("Concurrent writers corrupted the task file")
+
+def io_bytes():
+    """
+    Returns (bytes read, bytes written) by this process so far, from /proc/self/io (Linux only)
+    """
+    with open("/proc/self/io") as io:
+        fields = dict(line.split(": ") for line in io)
+    return int(fields["rchar"]), int(fields["wchar"])
+
+def bench_shards(num_tasks, num_users):
+    """
+    Benchmark of the bytes read and written by single user operations,
+    with all tasks in tasks.txt and with one shard per user
+
+    num_tasks: int -> Number of tasks in the dataset
+    num_users: int -> Number of users in the dataset
+    """
+    def view_mine(store):
+        store.user_tasks("user0")
+
+    def change(store, field, value):
+        task_index, task = store.user_tasks("user0")[0]
+        old_task = task.copy()
+        setattr(task, field, value)
+        store.update_task(task_index, old_task)
+
+    operations = [
+        ("view my tasks", view_mine),
+        ("edit due date", lambda store: change(store, "due_ordinal", date.today().toordinal() + 7)),
+        ("reassign", lambda store: change(store, "username", "user1")),
+    ]
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_dataset(directory, num_users, num_tasks)
+        task_file = os.path.join(directory, task_manager.TASK_FILE)
+        user_file = os.path.join(directory, task_manager.USER_FILE)
+        shard_dir = os.path.join(directory, task_manager.TASK_SHARD_DIR)
+        task_manager.ShardedStorage(shard_dir, user_file).replace_all(
+            task_manager.TextStorage(task_file, user_file).load_tasks(), task_manager.readUsers(user_file))
+
+        layouts = [
+            ("tasks.txt, snapshot", lambda: task_manager.TextStorage(task_file, user_file, mode="snapshot")),
+            ("tasks.txt, journal", lambda: task_manager.TextStorage(task_file, user_file, mode="journal")),
+            ("shards", lambda: task_manager.ShardedStorage(shard_dir, user_file)),
+        ]
+        print(f"{'':<22}{'operation':<16}{'read KB':>12}{'written KB':>12}")
+        for name, storage in layouts:
+            #The layout before rewrote tasks.txt, a first session writes the task cache for it again
+            store = task_manager.TaskStore(storage())
+            store.user_tasks("user0")
+            store.close()
+            for label, operation in operations:
+                #Every operation is a new session, including loading and closing
+                before = io_bytes()
+                store = task_manager.TaskStore(storage())
+                operation(store)
+                store.close()
+                after = io_bytes()
+                print(f"{name:<22}{label:<16}{(after[0]-before[0])/1024:12.1f}{(after[1]-before[1])/1024:12.1f}")
+
+def bench_parallel_report(num_tasks, num_users, worker_counts):
+    """
+    Scaling benchmark of counting the tasks for the reports with a ParallelReport,
+    checking that every worker count gives the same counts as one pass over the task objects
+
+    num_tasks: int -> Number of tasks in the dataset
+    num_users: int -> Number of users in the dataset
+    worker_counts: list -> Numbers of worker processes to test
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        write_dataset(directory, num_users, num_tasks)
+        task_file = os.path.join(directory, task_manager.TASK_FILE)
+        users = task_manager.readUsers(os.path.join(directory, task_manager.USER_FILE))
+        today = date.today().toordinal()
+
+        #What the single process report does: load every task, then count them
+        seconds, tasks = timed(task_manager.readTasks, task_file)
+        count_seconds, expected = timed(task_manager.collect_user_stats, users, tasks, today)
+        show("load + count in one process", seconds + count_seconds)
+        del tasks
+
+        base = None
+        for workers in worker_counts:
+            report = task_manager.ParallelReport([task_file], workers=workers)
+            seconds, stats = timed(report.user_stats, users, today)
+            if stats != expected:
+                raise SystemExit(f"{workers} workers counted different numbers")
+            base = base or seconds
+            show(f"{workers} workers", seconds, f"(x{base/seconds:.2f})")
+
+def load_in_new_process(directory, use_cache):
+    """
+    Returns the seconds readTasks takes in a fresh interpreter, so nothing is cached in memory
+
+    directory: string -> Folder with tasks.txt
+    use_cache: bool -> Value of TASK_CACHE
+    """
+    code = ("import time, task_manager; task_manager.TASK_CACHE = " + str(use_cache) +
+            "; t = time.perf_counter(); task_manager.readTasks(task_manager.TASK_FILE); print(time.perf_counter() - t)")
+    output = subprocess.run([sys.executable, "-c", code], cwd=directory, capture_output=True, text=True, check=True,
+                            env=dict(os.environ, PYTHONPATH=PROJECT_DIR)).stdout
+    return float(output)
+
+def bench_cold_start(task_counts, num_users):
+    """
+    Benchmark of loading tasks.txt by parsing the text and from the binary task cache
+
+    task_counts: list -> Numbers of tasks to test
+    num_users: int -> Number of users in the dataset
+    """
+    for num_tasks in task_counts:
+        with tempfile.TemporaryDirectory() as directory:
+            write_dataset(directory, num_users, num_tasks)
+            text_seconds = load_in_new_process(directory, False)
+            show(f"{num_tasks} tasks, text", text_seconds)
+            show(f"{num_tasks} tasks, writing cache", load_in_new_process(directory, True))
+            cache_seconds = load_in_new_process(directory, True)
+            show(f"{num_tasks} tasks, cache", cache_seconds, f"(x{text_seconds/cache_seconds:.2f})")
+
+def view_in_new_process(directory, read_mode):
+    """
+    Lists the titles of one user's tasks and shows one task in a fresh interpreter
+
+    directory: string -> Folder with tasks.txt and user.txt
+    read_mode: string -> Value of TASK_READ_MODE
+    Returns tuple: (seconds taken, resident memory without mapped files in MB, peak resident memory in MB)
+    """
+    code = f"""
+import time, task_manager
+task_manager.TASK_READ_MODE = {read_mode!r}
+start = time.perf_counter()
+store = task_manager.TaskStore(task_manager.TextStorage())
+titles = store.task_titles("user0")
+store.known_tasks[titles[0][0]].display()
+seconds = time.perf_counter() - start
+#Memory of this interpreter only, ru_maxrss would include the benchmark process.
+#RssAnon leaves out pages of mapped files, which the system can drop at any time
+with open("/proc/self/status") as status:
+    memory = {{line.split(":")[0]: int(line.split()[1]) for line in status if line.startswith(("RssAnon", "VmHWM"))}}
+print(seconds, memory["RssAnon"] / 1024, memory["VmHWM"] / 1024)
+"""
+    output = subprocess.run([sys.executable, "-c", code], cwd=directory, capture_output=True, text=True, check=True,
+                            env=dict(os.environ, PYTHONPATH=PROJECT_DIR)).stdout
+    return tuple(float(value) for value in output.split())
+
+def bench_mmap(task_counts, num_users):
+    """
+    Benchmark of time and peak memory of viewing one user's tasks,
+    with all tasks loaded and with the tasks file memory mapped
+
+    task_counts: list -> Numbers of tasks to test
+    num_users: int -> Number of users in the dataset
+    """
+    for num_tasks in task_counts:
+        with tempfile.TemporaryDirectory() as directory:
+            write_dataset(directory, num_users, num_tasks)
+            for read_mode in ("load", "mmap"):
+                #The first run writes the task cache or the line index
+                view_in_new_process(directory, read_mode)
+                seconds, memory, peak = view_in_new_process(directory, read_mode)
+                show(f"{num_tasks} tasks, {read_mode}", seconds, f"{memory:8.1f} MB private {peak:8.1f} MB peak")
+
+def random_texts(num_tasks, seed = 1):
+    """
+    Returns titles and descriptions made of made up words, some much more common than others like real text
+
+    num_tasks: int -> Number of titles and of descriptions
+    seed: int -> Seed of the random numbers
+    """
+    rand = random.Random(seed)
+    syllables = ["ka", "lo", "mi", "ne", "ru", "sa", "te", "vo", "zi", "pa", "do", "fe", "gu", "ha", "ji"]
+    words = sorted({"".join(rand.choices(syllables, k=rand.randint(2, 4))) for i in range(20000)})
+    rand.shuffle(words)
+    cum_weights = list(itertools.accumulate(1 / rank for rank in range(1, len(words) + 1)))
+    titles = [" ".join(rand.choices(words, cum_weights=cum_weights, k=rand.randint(2, 5))).capitalize()
+              for i in range(num_tasks)]
+    descriptions = [" ".join(rand.choices(words, cum_weights=cum_weights, k=rand.randint(5, 15)))
+                    for i in range(num_tasks)]
+    return words, titles, descriptions
+
+def bench_search(num_tasks, repeats):
+    """
+    Benchmark of searching titles and descriptions with the search index and with a substring scan
+
+    num_tasks: int -> Number of tasks
+    repeats: int -> Number of times every query is run on the index
+    """
+    words, titles, descriptions = random_texts(num_tasks)
+    tasks = []
+    for title, description in zip(titles, descriptions):
+        task = task_manager.Task("user0", title, description, None, None, False)
+        task.due_ordinal = task.assigned_ordinal = date.today().toordinal()
+        tasks.append(task)
+    del titles, descriptions
+
+    seconds, search_index = timed(task_manager.SearchIndex, tasks)
+    show("build index", seconds, f"({len(search_index.words)} words)")
+
+    with tempfile.TemporaryDirectory() as directory:
+        task_file = os.path.join(directory, task_manager.TASK_FILE)
+        task_manager.write_tasks_snapshot(task_file, tasks)
+        search_index.save(task_file)
+        seconds, loaded = timed(task_manager.SearchIndex.load, task_file, len(tasks))
+        show("load saved index", seconds)
+
+    #NumPy is imported on first use, which is not part of a search
+    task_manager.optional_numpy()
+    queries = [words[0], words[5000], f"{words[3]} {words[40]}", f"{words[100]} {words[2000]} {words[7]}",
+               words[20][:2], f"{words[1][:3]} {words[30]}"]
+    for query in queries:
+        seconds, results = timed(lambda: [search_index.search(query, task_manager.SEARCH_RESULT_LIMIT)
+                                          for i in range(repeats)])
+        found = len(search_index.search(query))
+
+        #What finding tasks without the index takes
+        terms = query.lower().split()
+        scan_seconds, scan_found = timed(lambda: sum(1 for t in tasks if all(
+            term in t.title.lower() or term in t.description.lower() for term in terms)))
+        show(f"search {query!r}", seconds / repeats,
+             f"{found:8} found, substring scan {scan_seconds*1000:8.1f} ms, {scan_found:8} found")
+
+def traced_peak(function):
+    """
+    Runs function again with tracemalloc, which slows it down, and returns the peak memory it allocated in MB
+    """
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 2**20
+
+def old_display(task):
+    """
+    Task.display as it was, building the text one line at a time
+    """
+    disp_str = f"Task: \t\t {task.title}\n"
+    disp_str += f"Assigned to: \t {task.username}\n"
+    disp_str += f"Date Assigned: \t {task.assigned_date.strftime(task_manager.DATETIME_STRING_FORMAT)}\n"
+    disp_str += f"Due Date: \t {task.due_date.strftime(task_manager.DATETIME_STRING_FORMAT)}\n"
+    disp_str += f"Task Description: \n {task.description}\n"
+    return disp_str
+
+def bench_render(num_tasks, num_users):
+    """
+    Benchmark of showing all tasks: two prints per task, one write of all of them,
+    one page, and dumping them to a file in chunks, with the peak memory of each
+
+    num_tasks: int -> Number of tasks in the dataset
+    num_users: int -> Number of users in the dataset
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        write_dataset(directory, num_users, num_tasks)
+        store = task_manager.TaskStore(task_manager.TextStorage(os.path.join(directory, task_manager.TASK_FILE),
+                                                                os.path.join(directory, task_manager.USER_FILE)))
+        tasks = store.tasks
+        out_file = os.path.join(directory, "out.txt")
+
+        def print_each():
+            #What view_all did before
+            for t in tasks:
+                print(old_display(t))
+                print("-----------------------------------")
+
+        def write_all():
+            sys.stdout.write(task_manager.render_tasks(tasks))
+
+        def write_page():
+            sys.stdout.write(task_manager.render_tasks(store.task_page(0, task_manager.PAGE_SIZE)))
+
+        def dump():
+            task_manager.dump_tasks(store, out_file)
+
+        for target in (os.devnull, out_file):
+            for label, function in (("print per task", print_each), ("one write", write_all),
+                                    ("one page", write_page)):
+                with open(target, "w") as out, contextlib.redirect_stdout(out):
+                    seconds, result = timed(function)
+                    peak = traced_peak(function)
+                show(f"{label} to {os.path.basename(target)}", seconds, f"{peak:8.1f} MB peak")
+
+        seconds, result = timed(dump)
+        show("dump to file in chunks", seconds, f"{traced_peak(dump):8.1f} MB peak")
+
+def bench_metrics(num_tasks, num_users, calls):
+    """
+    Benchmark of what instrumentation costs, switched off and on
+
+    num_tasks: int -> Number of tasks in the dataset
+    num_users: int -> Number of users in the dataset
+    calls: int -> Number of calls of an empty measured function
+    """
+    def empty():
+        pass
+    measured_empty = task_manager.measured("empty")(empty)
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_dataset(directory, num_users, num_tasks)
+        task_file = os.path.join(directory, task_manager.TASK_FILE)
+        user_file = os.path.join(directory, task_manager.USER_FILE)
+        #Writes the task cache, so every load below reads it
+        task_manager.readTasks(task_file)
+
+        for label, metrics in (("off", None), ("on", task_manager.Metrics())):
+            task_manager.METRICS = metrics
+            seconds, result = timed(lambda: [empty() for i in range(calls)])
+            measured_seconds, result = timed(lambda: [measured_empty() for i in range(calls)])
+            print(f"{'measured call, ' + label:<32}{(measured_seconds - seconds) / calls * 1e6:10.2f} us per call")
+            seconds = min(timed(task_manager.readTasks, task_file)[0] for i in range(5))
+            show(f"readTasks, {label}", seconds)
+            seconds = min(timed(task_manager.readUsers, user_file)[0] for i in range(5))
+            show(f"readUsers, {label}", seconds)
+        task_manager.METRICS = None
+
+@contextlib.contextmanager
+def settings(**values):
+    """
+    Changes settings of task_manager, like TASK_CACHE, for the with block
+    """
+    old_values = {name: getattr(task_manager, name) for name in values}
+    for name, value in values.items():
+        setattr(task_manager, name, value)
+    try:
+        yield
+    finally:
+        for name, value in old_values.items():
+            setattr(task_manager, name, value)
+
+def old_user_stats(users, tasks, today):
+    """
+    The per-user counts as getReportInfo used to count them, one loop over all tasks for every user
+    """
+    user_stats = {}
+    for user in users:
+        counts = [0, 0, 0]
+        for task in tasks:
+            if task.username == user:
+                counts[0] += 1
+                if task.completed:
+                    counts[1] += 1
+                elif task.due_ordinal < today:
+                    counts[2] += 1
+        user_stats[user] = counts
+    return user_stats
+
+def old_view_mine(tasks, username):
+    """
+    The positions and titles of a user's tasks as view_mine used to find them, by scanning all tasks
+    """
+    return [(i, t.title) for i, t in enumerate(tasks) if t.username == username]
+
+class Suite:
+    """
+    Runs the benchmark suite and collects its results
+    Every result has the time of the best of a number of runs, and the peak memory
+    allocated by one more run under tracemalloc
+    """
+    def __init__(self, repeats, memory, old_loop_limit):
+        '''
+        Inputs:
+        repeats: int -> Number of runs timed for steps that can be repeated
+        memory: bool -> Also measures peak memory, which runs every step once more
+        old_loop_limit: int -> Largest users x tasks the old report loop is run for
+        '''
+        self.repeats = repeats
+        self.memory = memory
+        self.old_loop_limit = old_loop_limit
+        self.results = []
+
+    def record(self, name, num_tasks, num_users, seconds, peak = None, **extra):
+        '''
+        Adds one result and prints it
+        '''
+        self.results.append(dict(name=name, tasks=num_tasks, users=num_users, seconds=seconds,
+                                 peak_mb=peak, **extra))
+        note = "" if peak is None else f"{peak:8.1f} MB peak"
+        print(f"{name:<28}{num_tasks:>9} tasks{seconds*1000:12.3f} ms {note}"
+              + "".join(f" {key}={value}" for key, value in extra.items()))
+
+    def measure(self, name, num_tasks, num_users, function, repeats = None, **extra):
+        '''
+        Times function, records the result and returns what function returned
+        '''
+        best = None
+        for i in range(repeats or self.repeats):
+            seconds, result = timed(function)
+            best = seconds if best is None else min(best, seconds)
+        peak = traced_peak(function) if self.memory else None
+        self.record(name, num_tasks, num_users, best, peak, **extra)
+        return result
+
+    def run(self, num_tasks, num_users, operations, **dataset):
+        '''
+        Runs every step on a generated dataset
+
+        num_tasks: int -> Number of tasks in the dataset
+        num_users: int -> Number of users in the dataset
+        operations: int -> Number of changes timed for every kind of change
+        dataset: dict -> Other arguments of write_dataset
+        '''
+        with tempfile.TemporaryDirectory() as directory:
+            seconds, result = timed(write_dataset, directory, num_users, num_tasks, 1,
+                                    dataset["completed"], dataset["due_spread"], dataset["skew"])
+            self.record("generate", num_tasks, num_users, seconds)
+            old_dir = os.getcwd()
+            os.chdir(directory)
+            try:
+                self.run_steps(num_tasks, num_users, operations)
+            finally:
+                os.chdir(old_dir)
+
+    def run_steps(self, num_tasks, num_users, operations):
+        '''
+        Runs every step in the folder of the dataset
+        '''
+        task_file, user_file = task_manager.TASK_FILE, task_manager.USER_FILE
+        today = date.today().toordinal()
+
+        #Loading
+        users = self.measure("load.users", num_tasks, num_users, lambda: task_manager.readUsers(user_file))
+        with settings(TASK_CACHE=False):
+            tasks = self.measure("load.text", num_tasks, num_users, lambda: task_manager.readTasks(task_file))
+        task_manager.write_task_cache(task_file, tasks)
+        self.measure("load.cache", num_tasks, num_users, lambda: task_manager.readTasks(task_file))
+        with settings(TASK_INDEX_PERSIST=False):
+            self.measure("load.mmap_index", num_tasks, num_users, lambda: task_manager.TaskFileView(task_file))
+        task_manager.write_line_index(task_file, *task_manager.build_line_index(open(task_file, "rb").read()))
+        self.measure("load.mmap", num_tasks, num_users, lambda: task_manager.TaskFileView(task_file))
+        self.measure("parse.from_string", num_tasks, num_users,
+                     lambda: [task_manager.Task().from_string(line) for line in open(task_file).read().split("\n")])
+
+        #View my tasks, for the user with the most tasks and one with an average number
+        user_index = self.measure("view.index_build", num_tasks, num_users, lambda: task_manager.UserTaskIndex(tasks))
+        view = task_manager.TaskFileView(task_file)
+        for label, username in (("top", "user0"), ("median", f"user{num_users // 2}")):
+            expected = self.measure(f"view.scan_{label}", num_tasks, num_users, lambda: old_view_mine(tasks, username),
+                                    user_tasks=len(user_index.tasks_of(username)))
+            indexed = self.measure(f"view.index_{label}", num_tasks, num_users,
+                                   lambda: [(i, tasks[i].title) for i in user_index.tasks_of(username)])
+            mapped = self.measure(f"view.mmap_{label}", num_tasks, num_users,
+                                  lambda: [(i, view.title(i)) for i in view.positions_of(username)])
+            if indexed != expected or mapped != expected:
+                raise SystemExit(f"view of {username} differs between scan, index and mmap")
+        view = None
+
+        #Report counts, checked against the single pass
+        expected = self.measure("report.single_pass", num_tasks, num_users,
+                                lambda: task_manager.collect_user_stats(users, tasks, today))
+        counters = [
+            ("report.columns", lambda: task_manager.TaskColumns(tasks).user_stats(users, today)),
+            ("report.cache_build", lambda: task_manager.ReportCache(tasks, task_manager.DueDateIndex(tasks))
+                                                       .user_stats(users, today)),
+            ("report.parallel", lambda: task_manager.ParallelReport([task_file]).user_stats(users, today)),
+        ]
+        if num_tasks * len(users) <= self.old_loop_limit:
+            counters.insert(0, ("report.old_loop", lambda: old_user_stats(users, tasks, today)))
+        report_cache = task_manager.ReportCache(tasks, task_manager.DueDateIndex(tasks))
+        counters.append(("report.cache", lambda: report_cache.user_stats(users, today)))
+        for name, counter in counters:
+            repeats = 1 if name == "report.old_loop" else None
+            if self.measure(name, num_tasks, num_users, counter, repeats) != expected:
+                raise SystemExit(f"{name} counted different numbers than one pass over the tasks")
+        #Frees the tasks before the next steps load their own
+        tasks = user_index = report_cache = None
+
+        #Whole reports through a TaskStore, the files of every backend have to be the same
+        reports = {}
+        for backend in ("objects", "columns", "cache", "parallel"):
+            with settings(REPORT_BACKEND=backend):
+                store = task_manager.TaskStore(task_manager.open_storage())
+                store.tasks
+                self.measure(f"report.generate_{backend}", num_tasks, num_users,
+                             lambda: task_manager.generate_reports(store))
+                reports[backend] = [open(file, "rb").read() for file in ("task_overview.txt", "user_overview.txt")]
+                store.close()
+        if any(files != reports["objects"] for files in reports.values()):
+            raise SystemExit("report files differ between report backends")
+
+        #Changes, saved the way the program saves them
+        store = task_manager.TaskStore(task_manager.open_storage())
+        rand = random.Random(num_tasks)
+        due_date = date.today() + timedelta(days=30)
+
+        def change(field, value):
+            def run():
+                for i in range(operations):
+                    task_index = rand.randrange(len(store.tasks))
+                    task = store.tasks[task_index]
+                    old_task = task.copy()
+                    setattr(task, field, value)
+                    store.update_task(task_index, old_task)
+            return run
+
+        def add():
+            for i in range(operations):
+                store.add_task(task_manager.Task("user0", f"Added {i}", "Added by the benchmark", due_date,
+                                                 date.today(), False))
+
+        #The indexes the menu keeps current are built first, as they would be in a session
+        store.tasks
+        store.report_cache
+        for name, run in (("mutate.add", add), ("mutate.complete", change("completed", True)),
+                          ("mutate.due_date", change("due_ordinal", due_date.toordinal())),
+                          ("mutate.reassign", change("username", "user1"))):
+            #Changes can not be undone, so every run makes new ones
+            seconds, result = timed(run)
+            peak = traced_peak(run) if self.memory else None
+            self.record(name, num_tasks, num_users, seconds / operations, peak, operations=operations)
+        #Saves what is still waiting to be written and merges the journal into tasks.txt
+        seconds, result = timed(store.close)
+        self.record("mutate.close", num_tasks, num_users, seconds)
+
+def run_suite(task_counts, num_users, operations, repeats, memory, old_loop_limit, output, **dataset):
+    """
+    Benchmark suite of loading, viewing a user's tasks, reports and changes at several numbers of tasks
+    Writes the results with the settings and machine they were measured on as JSON, for compare
+
+    task_counts: list -> Numbers of tasks to test
+    num_users: int -> Number of users in the dataset
+    operations: int -> Number of changes timed for every kind of change
+    repeats: int -> Number of runs timed for steps that can be repeated
+    memory: bool -> Also measures peak memory
+    old_loop_limit: int -> Largest users x tasks the old report loop is run for
+    output: string -> File the results are written to, None to only print them
+    dataset: dict -> completed, due_spread and skew, see write_dataset
+    """
+    suite = Suite(repeats, memory, old_loop_limit)
+    for num_tasks in task_counts:
+        suite.run(num_tasks, num_users, operations, **dataset)
+
+    if output is not None:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_DIR,
+                                capture_output=True, text=True).stdout.strip()
+        settings_used = {name: getattr(task_manager, name) for name in
+                         ("STORAGE_BACKEND", "TASK_STORAGE_MODE", "TASK_CACHE", "TASK_READ_MODE", "FLUSH_COUNT")}
+        meta = {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "commit": commit or None,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "users": num_users,
+            "operations": operations,
+            "repeats": repeats,
+            "dataset": dataset,
+            "settings": settings_used,
+        }
+        with open(output, "w") as out_file:
+            json.dump({"meta": meta, "results": suite.results}, out_file, indent=1)
+        print(f"Results written to {output}")
+
+def compare_results(base_file, new_file, threshold, min_difference):
+    """
+    Compares two result files of the suite, step by step
+    Exits with an error if any step got slower by more than threshold
+
+    base_file: string -> Results to compare against
+    new_file: string -> New results
+    threshold: float -> Allowed slow down, 0.2 is 20% slower
+    min_difference: float -> Milliseconds a step has to be slower by as well, so timer noise is not flagged
+    """
+    with open(base_file) as base, open(new_file) as new:
+        base_results = {(result["name"], result["tasks"]): result for result in json.load(base)["results"]}
+        new_results = json.load(new)["results"]
+
+    slower = 0
+    print(f"{'step':<32}{'tasks':>9}{'base ms':>12}{'new ms':>12}{'ratio':>8}")
+    for result in new_results:
+        old_result = base_results.get((result["name"], result["tasks"]))
+        if old_result is None or not old_result["seconds"]:
+            continue
+        ratio = result["seconds"] / old_result["seconds"]
+        flag = ""
+        if ratio > 1 + threshold and (result["seconds"] - old_result["seconds"]) * 1000 > min_difference:
+            flag = "  slower"
+            slower += 1
+        print(f"{result['name']:<32}{result['tasks']:9}{old_result['seconds']*1000:12.2f}"
+              f"{result['seconds']*1000:12.2f}{ratio:8.2f}{flag}")
+    if slower:
+        raise SystemExit(f"{slower} steps are more than {threshold:.0%} slower")
+
+def login_in_new_process(directory, use_index):
+    """
+    Looks up one username and password the way login does, in a fresh interpreter
+
+    directory: string -> Folder with user.txt
+    use_index: bool -> Value of USER_INDEX
+    Returns tuple: (seconds taken, peak resident memory in MB)
+    """
+    code = f"""
+import time, task_manager
+start = time.perf_counter()
+users = task_manager.UserDirectory("user.txt") if {use_index} else task_manager.readUsers("user.txt")
+found = "user123" in users.keys() and users["user123"] == "password"
+seconds = time.perf_counter() - start
+with open("/proc/self/status") as status:
+    peak = [int(line.split()[1]) for line in status if line.startswith("VmHWM")][0]
+print(seconds, peak / 1024)
+"""
+    output = subprocess.run([sys.executable, "-c", code], cwd=directory, capture_output=True, text=True, check=True,
+                            env=dict(os.environ, PYTHONPATH=PROJECT_DIR)).stdout
+    return tuple(float(value) for value in output.split())
+
+def bench_users(user_counts):
+    """
+    Benchmark of logging in and registering a user, reading all of user.txt and with the user index
+
+    user_counts: list -> Numbers of users to test
+    """
+    for num_users in user_counts:
+        with tempfile.TemporaryDirectory() as directory:
+            user_file = os.path.join(directory, task_manager.USER_FILE)
+            with open(user_file, "w") as out_file:
+                out_file.write("\n".join(["admin;password"] + [f"user{i};password" for i in range(num_users)]))
+
+            seconds, peak = login_in_new_process(directory, False)
+            show(f"{num_users} users, readUsers", seconds, f"{peak:8.1f} MB peak")
+            seconds, peak = login_in_new_process(directory, True)
+            show(f"{num_users} users, writing index", seconds, f"{peak:8.1f} MB peak")
+            seconds, peak = login_in_new_process(directory, True)
+            show(f"{num_users} users, index", seconds, f"{peak:8.1f} MB peak")
+
+            #Registering one user
+            users = task_manager.readUsers(user_file)
+            users["new_user"] = "password"
+            with settings(USER_INDEX=False):
+                seconds, result = timed(task_manager.write_usernames_to_file, users, user_file)
+            show(f"{num_users} users, register (rewrite)", seconds)
+            directory_users = task_manager.UserDirectory(user_file)
+            directory_users["other_user"] = "password"
+            seconds, result = timed(directory_users.append, ["other_user"])
+            show(f"{num_users} users, register (append)", seconds)
+
+def index_differences(store, words):
+    """
+    Returns the names of the indexes of a store that differ from indexes built again from its tasks
+
+    store: TaskStore -> Store whose indexes were kept current by sync
+    words: list -> Words to compare the search results of
+    """
+    tasks = list(store.tasks)
+    today = date.today().toordinal()
+    differences = []
+    fresh_users = task_manager.UserTaskIndex(tasks)
+    usernames = set(fresh_users.user_tasks) | set(store.user_task_index.user_tasks)
+    if any(store.user_task_index.tasks_of(username) != fresh_users.tasks_of(username) for username in usernames):
+        differences.append("users")
+    if store.due_date_index.entries != task_manager.DueDateIndex(tasks).entries:
+        differences.append("due_dates")
+    if store.report_cache.user_stats(store.users, today) != task_manager.collect_user_stats(store.users, tasks, today):
+        differences.append("report")
+    fresh_search = task_manager.SearchIndex(tasks)
+    if any(store.search_index.search(word) != fresh_search.search(word) for word in words):
+        differences.append("search")
+    return differences
+
+def bench_reload(num_tasks, num_users, num_changes):
+    """
+    Benchmark of picking up changes another process saved, reading all tasks again vs TaskStore.sync
+
+    num_tasks: int -> Number of tasks in the tasks file
+    num_users: int -> Number of users the tasks are assigned to
+    num_changes: int -> Number of tasks added or changed every time
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        write_dataset(directory, num_users, num_tasks)
+        task_file = os.path.join(directory, task_manager.TASK_FILE)
+        user_file = os.path.join(directory, task_manager.USER_FILE)
+        store = task_manager.TaskStore(task_manager.TextStorage(task_file, user_file, mode="journal"))
+        seconds, tasks = timed(lambda: store.tasks)
+        show(f"{num_tasks} tasks, first load", seconds)
+        #Indexes kept current by sync, checked at the end
+        store.user_task_index, store.report_cache, store.search_index
+        seconds, result = timed(task_manager.readTasks, task_file)
+        show(f"{num_tasks} tasks, readTasks", seconds)
+
+        rng = random.Random(1)
+        new_lines = [tasks[rng.randrange(num_tasks)].to_string() for i in range(num_changes)]
+        with open(task_file, "a") as out_file:
+            out_file.write("\n" + "\n".join(new_lines))
+        seconds, result = timed(store.sync)
+        show(f"{num_tasks} tasks, sync {num_changes} appended lines", seconds)
+
+        #Another process changes tasks, and then merges its journal into a new tasks file
+        other = task_manager.TaskStore(task_manager.TextStorage(task_file, user_file, mode="journal"))
+        for label in ("changes in journal", "rewritten file", "rewritten file again"):
+            for i in rng.sample(range(len(other.tasks)), num_changes):
+                old_task = other.tasks[i].copy()
+                other.tasks[i].completed = not old_task.completed
+                other.update_task(i, old_task)
+            if label != "changes in journal":
+                other.storage.compact(other.tasks)
+            seconds, result = timed(store.sync)
+            show(f"{num_tasks} tasks, sync {num_changes} {label}", seconds)
+
+        #Changes taken in by a compaction of this process are applied to the indexes by the next sync
+        other.add_tasks([task.copy() for task in rng.sample(other.tasks, num_changes)])
+        store.storage.compact(store.tasks)
+        seconds, result = timed(store.sync)
+        show(f"{num_tasks} tasks, sync {num_changes} taken in by compaction", seconds)
+
+        if [task.to_string() for task in store.tasks] != [task.to_string() for task in other.tasks]:
+            raise SystemExit("Tasks differ after sync")
+        words = [task.title.split()[0] for task in rng.sample(store.tasks, 10) if task.title.split()]
+        differences = index_differences(store, words)
+        if differences:
+            raise SystemExit(f"Indexes differ after sync: {', '.join(differences)}")
+
+def bench_history(num_tasks, num_users, num_days, trend_days):
+    """
+    Benchmark of recording the report history and of the trend report, against counting all tasks once
+
+    num_tasks: int -> Number of tasks counted for a day
+    num_users: int -> Number of users
+    num_days: int -> Number of days recorded in the history
+    trend_days: int -> Number of days the trend report covers
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        write_dataset(directory, num_users, num_tasks)
+        users = task_manager.readUsers(os.path.join(directory, task_manager.USER_FILE))
+        tasks = task_manager.readTasks(os.path.join(directory, task_manager.TASK_FILE))
+        today = date.today().toordinal()
+        seconds, user_stats = timed(task_manager.collect_user_stats, users, tasks, today)
+        show(f"{num_tasks} tasks, counting all tasks", seconds)
+
+        history_file = os.path.join(directory, task_manager.REPORT_HISTORY_FILE)
+        for day in range(today - num_days + 1, today):
+            task_manager.record_history(history_file, user_stats, day)
+        seconds, result = timed(task_manager.record_history, history_file, user_stats, today)
+        show(f"{num_users} users, recording a day", seconds,
+             f"{os.path.getsize(history_file) / 2**20:8.1f} MB for {num_days} days")
+
+        username = max(user_stats, key=lambda user: user_stats[user][0])
+        for label, numpy in (("numpy", task_manager.optional_numpy), ("struct", lambda: None)):
+            with settings(optional_numpy=numpy):
+                history = task_manager.ReportHistory(history_file)
+                #The first query imports NumPy
+                history.user_trend(username, 1, today)
+                seconds, rows = timed(history.user_trend, username, trend_days, today)
+                show(f"{num_users} users, {trend_days} day user trend ({label})", seconds)
+                seconds, rows = timed(history.overall_trend, trend_days, today)
+                show(f"{num_users} users, {trend_days} day overall trend ({label})", seconds)
+                history.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Task manager benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    startup = commands.add_parser("startup", help="import time and first query latency")
+    startup.add_argument("--tasks", type=int, default=100000)
+    startup.add_argument("--users", type=int, default=1000)
+    startup.add_argument("--repeats", type=int, default=5)
+
+    server = commands.add_parser("server", help="requests/sec and latency of server.py with concurrent clients")
+    server.add_argument("--tasks", type=int, default=100000)
+    server.add_argument("--users", type=int, default=1000)
+    server.add_argument("--clients", type=int, nargs="+", default=[1, 10, 100])
+    server.add_argument("--requests", type=int, default=200, help="requests per client")
+
+    concurrent = commands.add_parser("concurrent", help="stress test of several processes writing the same task file")
+    concurrent.add_argument("--tasks", type=int, default=10000)
+    concurrent.add_argument("--writers", type=int, default=8)
+    concurrent.add_argument("--operations", type=int, default=500, help="changes per writer")
+    concurrent.add_argument("--compact-limit", type=int, default=200, help="journal records before compaction")
+
+    shards = commands.add_parser("shards", help="bytes read and written per operation, tasks.txt vs shards")
+    shards.add_argument("--tasks", type=int, default=100000)
+    shards.add_argument("--users", type=int, default=1000)
+
+    report = commands.add_parser("report", help="counting the tasks for the reports with 1/2/4/8 processes")
+    report.add_argument("--tasks", type=int, default=1000000)
+    report.add_argument("--users", type=int, default=1000)
+    report.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+
+    cold_start = commands.add_parser("coldstart", help="loading tasks.txt from text and from the binary cache")
+    cold_start.add_argument("--tasks", type=int, nargs="+", default=[100000, 1000000])
+    cold_start.add_argument("--users", type=int, default=1000)
+
+    mmap = commands.add_parser("mmap", help="time and memory of viewing one user's tasks, loaded vs memory mapped")
+    mmap.add_argument("--tasks", type=int, nargs="+", default=[100000, 1000000])
+    mmap.add_argument("--users", type=int, default=1000)
+
+    search = commands.add_parser("search", help="search index vs substring scan")
+    search.add_argument("--tasks", type=int, default=1000000)
+    search.add_argument("--repeats", type=int, default=10)
+
+    render = commands.add_parser("render", help="showing all tasks, printed one at a time vs buffered vs dumped")
+    render.add_argument("--tasks", type=int, default=100000)
+    render.add_argument("--users", type=int, default=1000)
+
+    metrics = commands.add_parser("metrics", help="cost of the instrumentation when it is off and on")
+    metrics.add_argument("--tasks", type=int, default=100000)
+    metrics.add_argument("--users", type=int, default=1000)
+    metrics.add_argument("--calls", type=int, default=1000000)
+
+    generate = commands.add_parser("generate", help="write a tasks.txt and user.txt with random tasks")
+    generate.add_argument("directory", help="folder to write the files into")
+    suite = commands.add_parser("suite", help="load, view, report and change timings and peak memory at several sizes")
+    suite.add_argument("--tasks", type=int, nargs="+", default=[10000, 100000, 1000000])
+    suite.add_argument("--operations", type=int, default=100, help="changes timed for every kind of change")
+    suite.add_argument("--repeats", type=int, default=3, help="runs timed for every step, the best one counts")
+    suite.add_argument("--no-memory", action="store_true", help="do not measure peak memory, which runs every step again")
+    suite.add_argument("--old-loop-limit", type=int, default=2 * 10**8,
+                       help="largest users x tasks the old report loop is run for (default: %(default)s)")
+    suite.add_argument("--output", help="write the results to this JSON file")
+    for command in (generate, suite):
+        command.add_argument("--users", type=int, default=1000)
+        command.add_argument("--completed", type=float, default=0.4, help="fraction of completed tasks")
+        command.add_argument("--due-spread", type=int, default=90, help="days from assigned to due date, at most")
+        command.add_argument("--skew", type=float, default=1.0,
+                             help="the n-th user gets tasks in proportion to 1/n**skew, 0 for even (default: %(default)s)")
+    generate.add_argument("--tasks", type=int, default=100000)
+    generate.add_argument("--seed", type=int, default=1)
+    compare = commands.add_parser("compare", help="compare two result files of the suite")
+    compare.add_argument("base")
+    compare.add_argument("new")
+    compare.add_argument("--threshold", type=float, default=0.2, help="allowed slow down (default: %(default)s)")
+    compare.add_argument("--min-difference", type=float, default=0.5,
+                         help="milliseconds a step also has to be slower by (default: %(default)s)")
+
+    users = commands.add_parser("users", help="login and registering, reading all of user.txt vs the user index")
+    users.add_argument("--users", type=int, nargs="+", default=[100000, 1000000])
+
+    reload = commands.add_parser("reload", help="picking up changes of another process, reading all tasks vs sync")
+    reload.add_argument("--tasks", type=int, nargs="+", default=[100000, 1000000])
+    reload.add_argument("--users", type=int, default=1000)
+    reload.add_argument("--changes", type=int, default=100, help="tasks added or changed every time")
+
+    history = commands.add_parser("history", help="recording the report history and trend reports vs counting all tasks")
+    history.add_argument("--tasks", type=int, default=1000000)
+    history.add_argument("--users", type=int, default=1000)
+    history.add_argument("--days", type=int, default=365, help="days recorded in the history")
+    history.add_argument("--trend-days", type=int, default=90)
+
+    args = parser.parse_args()
+    if args.command == "startup":
+        bench_startup(args.tasks, args.users, args.repeats)
+    elif args.command == "server":
+        bench_server(args.tasks, args.users, args.clients, args.requests)
+    elif args.command == "concurrent":
+        bench_concurrent(args.tasks, args.writers, args.operations, args.compact_limit)
+    elif args.command == "shards":
+        bench_shards(args.tasks, args.users)
+    elif args.command == "report":
+        bench_parallel_report(args.tasks, args.users, args.workers)
+    elif args.command == "coldstart":
+        bench_cold_start(args.tasks, args.users)
+    elif args.command == "mmap":
+        bench_mmap(args.tasks, args.users)
+    elif args.command == "search":
+        bench_search(args.tasks, args.repeats)
+    elif args.command == "render":
+        bench_render(args.tasks, args.users)
+    elif args.command == "metrics":
+        bench_metrics(args.tasks, args.users, args.calls)
+    elif args.command == "users":
+        bench_users(args.users)
+    elif args.command == "history":
+        bench_history(args.tasks, args.users, args.days, args.trend_days)
+    elif args.command == "reload":
+        for num_tasks in args.tasks:
+            bench_reload(num_tasks, args.users, args.changes)
+    elif args.command == "generate":
+        os.makedirs(args.directory, exist_ok=True)
+        write_dataset(args.directory, args.users, args.tasks, args.seed, args.completed, args.due_spread, args.skew)
+    elif args.command == "suite":
+        run_suite(args.tasks, args.users, args.operations, args.repeats, not args.no_memory, args.old_loop_limit,
+                  args.output, completed=args.completed, due_spread=args.due_spread, skew=args.skew)
+    elif args.command == "compare":
+        compare_results(args.base, args.new, args.threshold, args.min_difference)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,418 @@
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+from datetime import date
+
+import task_manager
+from task_manager import Task, TaskStore
+
+#Unix socket the server listens on
+SOCKET_FILE = "task_manager.sock"
+
+#Longest request or response line in bytes, view_all and reports can be long
+LINE_LIMIT = 2**26
+
+class RequestError(Exception):
+    """
+    Error in a request, sent back to the client as the error message
+    """
+
+class TaskServer:
+    """
+    Serves many task manager sessions at once over a unix socket
+    All sessions share one TaskStore, so they see each other's changes straight away.
+    Requests and responses are JSON objects, one per line.
+    Every request has an "action", responses have "ok" and either the result or an "error".
+    """
+    def __init__(self, store):
+        '''
+        Inputs:
+        store: TaskStore -> Tasks and users shared by all sessions
+        '''
+        self.store = store
+
+    async def handle_connection(self, reader, writer):
+        '''
+        Answers the requests of one client until it disconnects
+        '''
+        #The user that is logged in on this connection
+        session = {"user": None}
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                writer.write((json.dumps(self.handle(session, line)) + "\n").encode())
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def handle(self, session, line):
+        '''
+        Runs a single request and returns the response
+
+        session: dict -> State of the connection, like the logged in user
+        line: bytes -> JSON request
+        '''
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise RequestError("A request has to be a JSON object")
+            action = request.get("action")
+            if action != "login" and session["user"] is None:
+                raise RequestError("Please log in first")
+
+            handler = getattr(self, f"action_{action}", None)
+            if handler is None:
+                raise RequestError(f"Unknown action {action}")
+            with task_manager.measure_action("server", action):
+                #Picks up changes other processes saved to the tasks file
+                self.store.sync()
+                response = handler(session, request)
+            response["ok"] = True
+            return response
+        except (RequestError, KeyError, TypeError, ValueError) as error:
+            return {"ok": False, "error": str(error)}
+
+    def string(self, request, name):
+        '''
+        Returns a field of the request, raises a RequestError if it is not a string
+        '''
+        value = request[name]
+        if not isinstance(value, str):
+            raise RequestError(f"{name} must be text")
+        return value
+
+    def existing_user(self, username):
+        '''
+        Raises a RequestError if username is not registered
+        '''
+        if not isinstance(username, str) or username not in self.store.users:
+            raise RequestError("User does not exist. Please enter an existing user.")
+        return username
+
+    def text(self, value):
+        '''
+        Raises a RequestError if value is not safe to store, see validate_string
+        '''
+        if not isinstance(value, str) or ";" in value or "\n" in value or "\r" in value:
+            raise RequestError("Your input cannot contain a ';' character or a line break")
+        return value
+
+    def own_task(self, session, request):
+        '''
+        Returns the position and task object of a task of the logged in user
+        '''
+        index = request["index"]
+        if not isinstance(index, int) or not 0 <= index < len(self.store.tasks):
+            raise RequestError("There is no such task")
+        task = self.store.tasks[index]
+        if task.username != session["user"]:
+            raise RequestError("That task is not assigned to you")
+        return index, task
+
+    def change_task(self, session, request, change):
+        '''
+        Applies change to an incomplete task of the logged in user and saves it
+
+        change: function -> Called with the task object to change it
+        '''
+        index, task = self.own_task(session, request)
+        if task.completed:
+            raise RequestError("Completed tasks cannot be changed")
+        old_task = task.copy()
+        change(task)
+        self.store.update_task(index, old_task)
+        return {}
+
+    def action_login(self, session, request):
+        users = self.store.users
+        username, password = self.string(request, "username"), self.string(request, "password")
+        if username not in users:
+            raise RequestError("User does not exist")
+        if users[username] != password:
+            raise RequestError("Wrong password")
+        session["user"] = username
+        return {"user": session["user"]}
+
+    def action_register(self, session, request):
+        if session["user"] != "admin":
+            raise RequestError("Registering new users requires admin privileges")
+        username, password = self.string(request, "username"), self.string(request, "password")
+        if username in self.store.users:
+            raise RequestError("User already exists. Please enter a new user.")
+        if username == "" or ";" in username + password or "\n" in username + password or "\r" in username + password:
+            raise RequestError("Username or password cannot contain ';' or a line break.")
+        self.store.add_user(username, password)
+        return {}
+
+    def action_add_task(self, session, request):
+        task = Task(self.existing_user(request["username"]), self.text(request["title"]),
+                    self.text(request["description"]), None, date.today(), False)
+        task.due_ordinal = task_manager.parse_date_ordinal(request["due_date"])
+        return {"index": self.store.add_task(task)}
+
+    def action_view_all(self, session, request):
+        #A page of tasks from "start", all of them if no "count" is given
+        start = request.get("start", 0)
+        count = request.get("count")
+        if not isinstance(start, int) or start < 0 or not (count is None or isinstance(count, int) and count >= 0):
+            raise RequestError("start and count must be whole numbers")
+        stop = len(self.store.tasks) if count is None else start + count
+        return {"total": len(self.store.tasks), "tasks": [t.display() for t in self.store.task_page(start, stop)]}
+
+    def action_view_mine(self, session, request):
+        return {"tasks": [[i, title] for i, title in self.store.task_titles(session["user"])]}
+
+    def action_view_task(self, session, request):
+        index, task = self.own_task(session, request)
+        return {"display": task.display(), "completed": bool(task.completed)}
+
+    def action_complete(self, session, request):
+        index, task = self.own_task(session, request)
+        old_task = task.copy()
+        task.completed = True
+        self.store.update_task(index, old_task)
+        return {}
+
+    def action_reassign(self, session, request):
+        username = self.existing_user(request["username"])
+        return self.change_task(session, request, lambda task: setattr(task, "username", username))
+
+    def action_set_due_date(self, session, request):
+        due_ordinal = task_manager.parse_date_ordinal(request["due_date"])
+        return self.change_task(session, request, lambda task: setattr(task, "due_ordinal", due_ordinal))
+
+    def action_view_due(self, session, request):
+        days = request.get("days", 0)
+        today = date.today().toordinal()
+        tasks = self.store.tasks
+        due_date_index = self.store.due_date_index
+        due_soon = due_date_index.due_between(today, today+days) if days > 0 else []
+        return {
+            "overdue": [tasks[i].display() for i in due_date_index.due_before(today)],
+            "due_soon": [tasks[i].display() for i in due_soon],
+        }
+
+    def action_search(self, session, request):
+        limit = request.get("limit", task_manager.SEARCH_RESULT_LIMIT)
+        if not isinstance(limit, int) or isinstance(limit, bool) or limit < 0:
+            raise RequestError("limit has to be a number of tasks")
+        found, results = self.store.search_index.best_matches(self.text(request["query"]), limit)
+        return {"found": found, "tasks": [self.store.tasks[i].display() for i, score in results]}
+
+    def action_report(self, session, request):
+        if session["user"] != "admin":
+            raise RequestError("Reports require admin privileges")
+        task_manager.generate_reports(self.store)
+        with open("task_overview.txt") as task_overview, open("user_overview.txt") as user_overview:
+            return {"task_overview": task_overview.read(), "user_overview": user_overview.read()}
+
+async def serve(socket_file):
+    """
+    Runs the server until it is stopped, then saves all pending changes
+
+    socket_file: string -> Unix socket to listen on
+    """
+    store = TaskStore()
+    #Load everything up front, so the first sessions do not wait for it.
+    #The search index takes the longest to build, seconds for a million tasks
+    store.tasks
+    store.users
+    store.search_index
+
+    if os.path.exists(socket_file):
+        os.remove(socket_file)
+    server = await asyncio.start_unix_server(TaskServer(store).handle_connection, socket_file, limit=LINE_LIMIT)
+
+    #Stops on Ctrl+C or kill
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    loop.add_signal_handler(signal.SIGINT, stop.set)
+    loop.add_signal_handler(signal.SIGTERM, stop.set)
+
+    print(f"Serving {len(store.tasks)} tasks on {socket_file}", flush=True)
+    try:
+        async with server:
+            await stop.wait()
+    finally:
+        store.close()
+        os.remove(socket_file)
+
+class TaskClient:
+    """
+    Connection to a TaskServer
+    """
+    async def connect(self, socket_file):
+        self.reader, self.writer = await asyncio.open_unix_connection(socket_file, limit=LINE_LIMIT)
+
+    async def request(self, action, **fields):
+        '''
+        Sends a request and returns the response
+        '''
+        fields["action"] = action
+        self.writer.write((json.dumps(fields) + "\n").encode())
+        await self.writer.drain()
+        return json.loads(await self.reader.readline())
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+async def run_client(socket_file):
+    """
+    Interactive client with the same menu as the task manager program
+
+    socket_file: string -> Unix socket of the server
+    """
+    client = TaskClient()
+    await client.connect(socket_file)
+    loop = asyncio.get_running_loop()
+
+    async def ask(prompt):
+        #input() blocks, so it runs outside the event loop
+        return await loop.run_in_executor(None, input, prompt)
+
+    #Login until valid
+    while True:
+        print("LOGIN")
+        response = await client.request("login", username=await ask("Username: "), password=await ask("Password: "))
+        if response["ok"]:
+            print("Login Successful!")
+            curr_user = response["user"]
+            break
+        print(response["error"])
+
+    menu_options = ["r - Registering a user", "a - Adding a task", "va - View all tasks",
+                    "vm - view my task", "od - view overdue tasks", "s - search tasks"]
+    if curr_user == "admin":
+        menu_options += ["gr - generate reports", "ds - display statistics"]
+    menu_options.append("e - Exit")
+
+    while True:
+        print()
+        menu = (await ask("Select one of the following Options below:\n    " + "\n    ".join(menu_options) + "\n    : ")).lower()
+
+        if menu == "r":
+            username = await ask("Username: ")
+            password = await ask("New Password: ")
+            if password != await ask("Confirm Password: "):
+                print("Passwords do no match")
+                continue
+            response = await client.request("register", username=username, password=password)
+            print("New user added" if response["ok"] else response["error"])
+
+        elif menu == "a":
+            response = await client.request("add_task", username=await ask("Username: "),
+                                            title=await ask("Title of Task: "),
+                                            description=await ask("Description of Task: "),
+                                            due_date=await ask("Due date of task (YYYY-MM-DD): "))
+            print("Task successfully added." if response["ok"] else response["error"])
+
+        elif menu == "va":
+            #Asks the server for one page at a time, n and p move between them
+            start = 0
+            while True:
+                response = await client.request("view_all", start=start, count=task_manager.PAGE_SIZE)
+                pages = max(1, -(-response["total"] // task_manager.PAGE_SIZE))
+                sys.stdout.write(f"{task_manager.SEPARATOR}\n"
+                                 + "".join([f"{display}\n{task_manager.SEPARATOR}\n" for display in response["tasks"]])
+                                 + f"Page {start // task_manager.PAGE_SIZE + 1} of {pages}\n")
+                sys.stdout.flush()
+                choice = (await ask("n - next page, p - previous page, any other key to go back to the menu: ")).strip().lower()
+                if choice == "n" and start + task_manager.PAGE_SIZE < response["total"]:
+                    start += task_manager.PAGE_SIZE
+                elif choice == "p" and start > 0:
+                    start -= task_manager.PAGE_SIZE
+                elif choice not in ("n", "p"):
+                    break
+
+        elif menu == "vm":
+            tasks = (await client.request("view_mine"))["tasks"]
+            print("-----------------------------------")
+            for number, (index, title) in enumerate(tasks, 1):
+                print(f"{number}: {title}")
+            print("-----------------------------------")
+            if not tasks:
+                print("You have no tasks.")
+                continue
+            selection = int(await ask("Selection (-1 to go back): "))
+            if selection == -1 or not 1 <= selection <= len(tasks):
+                continue
+            index = tasks[selection-1][0]
+            print((await client.request("view_task", index=index))["display"])
+            print("1: Mark as complete")
+            print("2: Edit incomplete task")
+            tick_edit = await ask("Selection: ")
+            if tick_edit == "1":
+                response = await client.request("complete", index=index)
+            elif tick_edit == "2":
+                print("1: Assigned user")
+                print("2: Due date")
+                edit = await ask("Selection: ")
+                if edit == "1":
+                    response = await client.request("reassign", index=index, username=await ask("Username: "))
+                else:
+                    response = await client.request("set_due_date", index=index,
+                                                    due_date=await ask("Due date of task (YYYY-MM-DD): "))
+            else:
+                continue
+            print("Task successfully added." if response["ok"] else response["error"])
+
+        elif menu == "od":
+            response = await client.request("view_due", days=int(await ask("Show tasks due within how many days? (0 for overdue only): ")))
+            print(f"Overdue tasks: {len(response['overdue'])}")
+            for display in response["overdue"] + response["due_soon"]:
+                print(display)
+                print("-----------------------------------")
+
+        elif menu == "s":
+            response = await client.request("search", query=await ask("Search for: "))
+            if not response["ok"]:
+                print(response["error"])
+                continue
+            print(f"Tasks found: {response['found']}")
+            for display in response["tasks"]:
+                print(display)
+                print("-----------------------------------")
+
+        elif menu in ("gr", "ds") and curr_user == "admin":
+            response = await client.request("report")
+            if menu == "ds":
+                print(response["task_overview"])
+                print(response["user_overview"])
+
+        elif menu == "e":
+            print("Goodbye!!!")
+            await client.close()
+            return
+
+        else:
+            print("You have made a wrong choice, Please Try again")
+
+def main():
+    parser = argparse.ArgumentParser(description="Task manager server")
+    parser.add_argument("command", choices=["serve", "client"])
+    parser.add_argument("--socket", default=SOCKET_FILE, help="unix socket (default: %(default)s)")
+    parser.add_argument("--metrics", help="record request latencies and write them to this file at exit, "
+                                          "Prometheus text for .prom files, JSON otherwise")
+    parser.add_argument("--profile", help="run this action under cProfile, like view_all")
+    args = parser.parse_args()
+    task_manager.start_metrics(args.metrics, args.profile)
+
+    try:
+        if args.command == "serve":
+            asyncio.run(serve(args.socket))
+        else:
+            asyncio.run(run_client(args.socket))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
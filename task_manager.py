@@ -1,9 +1,331 @@
+import argparse
+import atexit
+import contextlib
+import csv
+import gc
+import hashlib
+import heapq
+import json
+import math
+import mmap
 import os
+import re
+import sqlite3
+import struct
+import sys
+import threading
+import time
+import zlib
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+from collections.abc import Mapping
 from datetime import datetime, date
+from functools import lru_cache, wraps
+from itertools import accumulate, chain, compress, islice, repeat
+from operator import gt, lt
+from urllib.parse import quote
+
+#File locks are only available on unix, the "shared" storage mode needs them
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 
 DATETIME_STRING_FORMAT = "%Y-%m-%d"
 
+#Storage settings
+#"text"    -> tasks.txt and user.txt
+#"sqlite"  -> tables in an SQLite database
+#"sharded" -> one tasks file per assigned user in TASK_SHARD_DIR, and user.txt
+STORAGE_BACKEND = "text"
+#"snapshot" -> rewrites the whole tasks file on every change
+#"journal"  -> appends every change to the journal of the tasks file
+#"shared"   -> journal that several processes can write to at the same time,
+#              using file locks and merging each other's changes
+TASK_STORAGE_MODE = "journal"
+TASK_FILE = "tasks.txt"
+USER_FILE = "user.txt"
+DATABASE_FILE = "task_manager.db"
+TASK_SHARD_DIR = "task_shards"
+#Changes are written in batches, after FLUSH_COUNT changes or FLUSH_INTERVAL seconds,
+#whichever comes first. FLUSH_COUNT = 1 writes every change straight away
+FLUSH_COUNT = 50
+FLUSH_INTERVAL = 2.0
+#Number of journal records after which the journal is merged back into the tasks file
+JOURNAL_COMPACT_LIMIT = 1000
+#Keeps a binary copy of the tasks file next to it, which loads much faster than parsing the text
+TASK_CACHE = True
+#"load" -> reads every task into memory at start up
+#"mmap" -> memory maps the tasks file and only reads a task when it is used, see TaskFileView
+TASK_READ_MODE = "load"
+#Keeps the line positions of the tasks file in a file next to it in "mmap" mode
+TASK_INDEX_PERSIST = True
+#Keeps a hashed index of the user file next to it, so logging in does not read every user, see UserDirectory
+USER_INDEX = True
+#Number of users registered after the user index was written, after which it is written again
+USER_INDEX_REBUILD = 1000
+#Picks up changes other processes save to the tasks file while it is open, see TextStorage.sync.
+#Lines added to the end are read on their own, a rewritten file is compared line by line
+LIVE_RELOAD = True
+#Share of the tasks that can change in one sync before the indexes are rebuilt instead of updated
+SYNC_REBUILD_LIMIT = 0.1
+#Saves the search index next to the tasks file on exit, so it is not built again at the next search
+TASK_SEARCH_PERSIST = True
+#Number of tasks shown for a search
+SEARCH_RESULT_LIMIT = 20
+
+#Report settings
+#"objects" -> counts tasks by walking the list of task objects
+#"columns" -> counts tasks with batched operations over a TaskColumns store
+#"storage" -> counts tasks with the storage backend (sqlite queries or streaming the shards)
+#"cache"   -> uses the per-user counts a ReportCache keeps current as tasks change
+#"parallel" -> counts tasks straight from the task files in REPORT_WORKERS processes
+REPORT_BACKEND = "cache"
+REPORT_WORKERS = os.cpu_count() or 1
+#Adds the counts of every user to REPORT_HISTORY_FILE whenever reports are generated, for the trend report
+REPORT_HISTORY = True
+REPORT_HISTORY_FILE = "report_history.bin"
+#Number of days the trend report covers, unless another number is given
+TREND_DAYS = 90
+
+#Display settings
+#Number of tasks on a page of "View all tasks" and "View my tasks"
+PAGE_SIZE = 20
+#Number of tasks formatted and written at a time when dumping all tasks to a file
+DUMP_CHUNK_SIZE = 1000
+SEPARATOR = "-----------------------------------"
+
+#Instrumentation settings
+#Off unless a metrics file is given with --metrics or this environment variable.
+#Files ending in ".prom" are written in the Prometheus text format, anything else as JSON
+METRICS_ENV = "TASK_MANAGER_METRICS"
+#Runs one menu action or server action under cProfile, given with --profile or this environment variable
+PROFILE_ENV = "TASK_MANAGER_PROFILE"
+#Upper bounds of the latency histogram buckets in seconds
+METRICS_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+class Metrics:
+    """
+    Latency histograms and counters of the task manager, while instrumentation is on
+    Time spent waiting for the user to type is not counted towards any latency.
+    """
+    def __init__(self, file = None, profile_action = None):
+        '''
+        Inputs:
+        file: String -> File the metrics are written to at exit, None to not write them
+        profile_action: String -> Name of the action to run under cProfile, None for none
+        '''
+        self.file = file
+        #Name -> [count, total seconds, largest seconds, count per bucket with one more for larger times]
+        self.latencies = {}
+        self.counters = Counter()
+        #Seconds spent in input() so far
+        self.waiting = 0.0
+
+        self.profile_action = profile_action
+        self.profiler = None
+        if profile_action is not None:
+            import cProfile
+            self.profiler = cProfile.Profile()
+
+    def observe(self, name, seconds):
+        '''
+        Records one latency
+        '''
+        latency = self.latencies.get(name)
+        if latency is None:
+            latency = self.latencies[name] = [0, 0.0, 0.0, [0] * (len(METRICS_BUCKETS) + 1)]
+        latency[0] += 1
+        latency[1] += seconds
+        latency[2] = max(latency[2], seconds)
+        latency[3][bisect_left(METRICS_BUCKETS, seconds)] += 1
+
+    def count(self, name, amount = 1):
+        self.counters[name] += amount
+
+    @contextlib.contextmanager
+    def timer(self, name, profile = False):
+        '''
+        Records how long the with block takes, less the time waiting for input
+
+        profile: bool -> Also runs the block under cProfile
+        '''
+        waiting = self.waiting
+        if profile:
+            self.profiler.enable()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            if profile:
+                self.profiler.disable()
+            self.observe(name, seconds - (self.waiting - waiting))
+
+    def input(self, prompt = ""):
+        '''
+        input() that keeps track of the time spent waiting for it
+        '''
+        start = time.perf_counter()
+        try:
+            return input(prompt)
+        finally:
+            self.waiting += time.perf_counter() - start
+
+    def to_json(self):
+        '''
+        Returns the metrics as a JSON string
+        '''
+        bounds = [str(bound) for bound in METRICS_BUCKETS] + ["+Inf"]
+        latencies = {name: {"count": count, "sum": total, "max": largest, "mean": total / count,
+                            "buckets": dict(zip(bounds, buckets))}
+                     for name, (count, total, largest, buckets) in sorted(self.latencies.items())}
+        return json.dumps({"latency_seconds": latencies, "counters": dict(sorted(self.counters.items()))}, indent=2)
+
+    def to_prometheus(self):
+        '''
+        Returns the metrics in the Prometheus text format
+        '''
+        lines = ["# HELP task_manager_latency_seconds Time taken by task manager actions and functions",
+                 "# TYPE task_manager_latency_seconds histogram"]
+        for name, (count, total, largest, buckets) in sorted(self.latencies.items()):
+            cumulative = 0
+            for bound, bucket in zip([str(bound) for bound in METRICS_BUCKETS] + ["+Inf"], buckets):
+                cumulative += bucket
+                lines.append(f'task_manager_latency_seconds_bucket{{name="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'task_manager_latency_seconds_sum{{name="{name}"}} {total}')
+            lines.append(f'task_manager_latency_seconds_count{{name="{name}"}} {count}')
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"# TYPE task_manager_{name}_total counter")
+            lines.append(f"task_manager_{name}_total {value}")
+        return "\n".join(lines) + "\n"
+
+    def save(self):
+        '''
+        Writes the metrics file and the profile of the profiled action, called at exit
+        '''
+        if self.file is not None:
+            with open(self.file, "w") as metrics_file:
+                metrics_file.write(self.to_prometheus() if self.file.endswith(".prom") else self.to_json())
+        if self.profiler is not None:
+            profile_file = f"profile_{self.profile_action}.prof"
+            self.profiler.dump_stats(profile_file)
+            import pstats
+            print(f"Profile of {self.profile_action} saved to {profile_file}", file=sys.stderr)
+            pstats.Stats(self.profiler, stream=sys.stderr).sort_stats("cumulative").print_stats(20)
+
+#Metrics being recorded, None while instrumentation is off
+METRICS = None
+
+def start_metrics(file = None, profile_action = None):
+    """
+    Function to turn instrumentation on if a metrics file or an action to profile is given,
+    on the command line or in the METRICS_ENV and PROFILE_ENV environment variables
+
+    file: string -> File the metrics are written to at exit
+    profile_action: string -> Menu option or server action to run under cProfile, like "va" or "view_all"
+    """
+    global METRICS
+    file = file or os.environ.get(METRICS_ENV) or None
+    profile_action = profile_action or os.environ.get(PROFILE_ENV) or None
+    if file is None and profile_action is None:
+        return
+    METRICS = Metrics(file, MENU_ACTIONS.get(profile_action, profile_action))
+    atexit.register(METRICS.save)
+
+def ask(prompt = ""):
+    """
+    Function to ask the user for input, used for every prompt of the menu
+    While instrumentation is on, the time waiting for the answer is left out of the latencies
+
+    prompt: string -> Text shown before the answer
+    """
+    if METRICS is not None:
+        return METRICS.input(prompt)
+    return input(prompt)
+
+def measured(name):
+    """
+    Decorator recording how long every call of a function takes while instrumentation is on
+    When it is off, the only cost is one check per call
+
+    name: string -> Name of the latency
+    """
+    def decorate(function):
+        @wraps(function)
+        def measured_function(*args, **kwargs):
+            if METRICS is None:
+                return function(*args, **kwargs)
+            with METRICS.timer(name):
+                return function(*args, **kwargs)
+        return measured_function
+    return decorate
+
+@contextlib.contextmanager
+def measure_action(kind, action):
+    """
+    Records how long a menu or server action takes while instrumentation is on
+    and runs it under cProfile if it is the action to profile
+
+    kind: string -> "menu" or "server"
+    action: string -> Name of the action, like "view_all"
+    """
+    if METRICS is None:
+        yield
+        return
+    with METRICS.timer(f"{kind}.{action}", profile=METRICS.profile_action == action):
+        yield
+
+@lru_cache(maxsize=None)
+def optional_numpy():
+    """
+    Returns the numpy module, or None if it is not installed
+    NumPy is only imported when first needed, so importing task_manager stays fast
+    """
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+#Caches of parsed and formatted dates, dates repeat a lot between tasks
+date_ordinals = {}
+date_strings = {}
+
+def parse_date_ordinal(date_str):
+    """
+    Function to convert a date in DATETIME_STRING_FORMAT into a date ordinal
+    Reads the fixed YYYY-MM-DD layout directly instead of using datetime.strptime
+
+    date_str: string -> date in DATETIME_STRING_FORMAT
+    """
+    ordinal = date_ordinals.get(date_str)
+    if ordinal is None:
+        if len(date_str) == 10 and date_str[4] == "-" and date_str[7] == "-":
+            ordinal = date(int(date_str[:4]), int(date_str[5:7]), int(date_str[8:])).toordinal()
+        else:
+            #Anything else is left to strptime to accept or reject
+            ordinal = datetime.strptime(date_str, DATETIME_STRING_FORMAT).toordinal()
+        date_ordinals[date_str] = ordinal
+    return ordinal
+
+def format_date_ordinal(ordinal):
+    """
+    Function to convert a date ordinal into a string in DATETIME_STRING_FORMAT
+
+    ordinal: int -> date ordinal
+    """
+    date_str = date_strings.get(ordinal)
+    if date_str is None:
+        date_str = date.fromordinal(ordinal).strftime(DATETIME_STRING_FORMAT)
+        date_strings[ordinal] = date_str
+    return date_str
+
 class Task:
+    #Slots instead of a __dict__ per task, dates are stored as date ordinals
+    __slots__ = ("username", "title", "description", "due_ordinal", "assigned_ordinal", "completed")
+
     def __init__(self, username = None, title = None, description = None, due_date = None, assigned_date = None, completed = None):
         '''
         Inputs:
@@ -21,18 +343,34 @@ class Task:
         self.assigned_date = assigned_date
         self.completed = completed
 
+    @property
+    def due_date(self):
+        return None if self.due_ordinal is None else date.fromordinal(self.due_ordinal)
+
+    @due_date.setter
+    def due_date(self, value):
+        self.due_ordinal = None if value is None else value.toordinal()
+
+    @property
+    def assigned_date(self):
+        return None if self.assigned_ordinal is None else date.fromordinal(self.assigned_ordinal)
+
+    @assigned_date.setter
+    def assigned_date(self, value):
+        self.assigned_ordinal = None if value is None else value.toordinal()
+
     def from_string(self, task_str):
         '''
         Convert from string in tasks.txt to object
         '''
         tasks = task_str.split(";")
-        username = tasks[0]
-        title = tasks[1]
-        description = tasks[2]
-        due_date = datetime.strptime(tasks[3], DATETIME_STRING_FORMAT)
-        assigned_date = datetime.strptime(tasks[4], DATETIME_STRING_FORMAT)
-        completed = True if tasks[5] == "Yes" else False
-        self.__init__(username, title, description, due_date, assigned_date, completed)
+        #Usernames repeat between tasks, so only one copy of each is kept
+        self.username = sys.intern(tasks[0])
+        self.title = tasks[1]
+        self.description = tasks[2]
+        self.due_ordinal = parse_date_ordinal(tasks[3])
+        self.assigned_ordinal = parse_date_ordinal(tasks[4])
+        self.completed = True if tasks[5] == "Yes" else False
 
 
     def to_string(self):
@@ -43,50 +381,2897 @@ class Task:
             self.username,
             self.title,
             self.description,
-            self.due_date.strftime(DATETIME_STRING_FORMAT),
-            self.assigned_date.strftime(DATETIME_STRING_FORMAT),
+            format_date_ordinal(self.due_ordinal),
+            format_date_ordinal(self.assigned_ordinal),
             "Yes" if self.completed else "No"
         ]
         return ";".join(str_attrs)
 
+    def copy(self):
+        '''
+        Returns a separate task object with the same values
+        '''
+        task_copy = Task(self.username, self.title, self.description, None, None, self.completed)
+        task_copy.due_ordinal = self.due_ordinal
+        task_copy.assigned_ordinal = self.assigned_ordinal
+        return task_copy
+
     def display(self):
         '''
         Display object in readable format
         '''
-        disp_str = f"Task: \t\t {self.title}\n"
-        disp_str += f"Assigned to: \t {self.username}\n"
-        disp_str += f"Date Assigned: \t {self.assigned_date.strftime(DATETIME_STRING_FORMAT)}\n"
-        disp_str += f"Due Date: \t {self.due_date.strftime(DATETIME_STRING_FORMAT)}\n"
-        disp_str += f"Task Description: \n {self.description}\n"
-        return disp_str
+        return (f"Task: \t\t {self.title}\n"
+                f"Assigned to: \t {self.username}\n"
+                f"Date Assigned: \t {format_date_ordinal(self.assigned_ordinal)}\n"
+                f"Due Date: \t {format_date_ordinal(self.due_ordinal)}\n"
+                f"Task Description: \n {self.description}\n")
+
+@contextlib.contextmanager
+def paused_gc():
+    """
+    Pauses the cyclic garbage collector while many objects are created
+    Tasks do not form reference cycles, but every new object counts towards the next collection,
+    and collections keep walking all the tasks created so far
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
 
-def readTasks(file):
+@measured("read_tasks")
+def readTasks(file, journal = True):
     """
     Functions to read the text file containing task info
     Converts task info into a task object
     Generates list of task objects
 
     file: string -> name of file containing tasks
+    journal: bool -> Applies the changes in the journal of the file, False to leave that to the caller
     """
     # Read and parse tasks.txt
     if not os.path.exists(file):
         with open(file, "w") as default_file:
             pass
 
-    #Gets info of a task and generates a list of task info
-    with open(file, 'r') as task_file:
-        task_data = task_file.read().split("\n")
-        task_data = [t for t in task_data if t != ""]
+    #Loads the binary cache if it matches the tasks file,
+    #otherwise converts task info into task objects one line at a time
+    with paused_gc():
+        task_list = read_task_cache(file) if TASK_CACHE else None
+        if task_list is None:
+            task_list = list(iter_tasks(file))
+            if METRICS is not None:
+                METRICS.count("tasks_parsed", len(task_list))
+                METRICS.count("bytes_read", os.path.getsize(file))
+            if TASK_CACHE:
+                write_task_cache(file, task_list)
+
+    #Applies changes saved after the last compaction
+    if journal:
+        replay_journal(file, task_list)
+    
+    return task_list
+
+def iter_tasks(file):
+    """
+    Generator that reads the text file containing task info line by line
+    Yields a task object for every line, without holding the whole file in memory
+
+    file: string -> name of file containing tasks
+    """
+    with open(file, 'r') as task_file:
+        for t_str in task_file:
+            t_str = t_str.rstrip("\n")
+            if t_str == "":
+                continue
+            curr_t = Task()
+            curr_t.from_string(t_str)
+            yield curr_t
+
+#Layout of the binary task cache: a header, then the sections in the order of TASK_CACHE_SECTIONS.
+#Every section starts with its length in bytes. Numbers are in the byte order of the machine
+TASK_CACHE_MAGIC = b"TMCACHE" + sys.byteorder[0].encode()
+TASK_CACHE_HEADER = struct.Struct("=8sQQ20sQQ")
+TASK_CACHE_SECTIONS = ("usernames", "texts", "user_ids", "due", "assigned", "completed")
+
+def task_cache_file_name(file):
+    """
+    Returns the name of the binary cache belonging to a tasks file
+
+    file: string -> name of file containing tasks
+    """
+    return file + ".cache"
+
+def task_file_stamp(file):
+    """
+    Returns (size, modification time, hash) of a tasks file, which the cache is checked against
+
+    file: string -> name of file containing tasks
+    """
+    with open(file, "rb") as task_file:
+        digest = hashlib.sha1(task_file.read()).digest()
+        stat = os.fstat(task_file.fileno())
+    return stat.st_size, stat.st_mtime_ns, digest
+
+@measured("write_task_cache")
+def write_task_cache(file, tasks):
+    """
+    Function to write the binary cache of a tasks file
+    Usernames are stored once and referred to by number, dates and completion as arrays of numbers,
+    and titles and descriptions as one block of text
+
+    file: string -> name of file containing tasks
+    tasks: list -> Of the task objects in file
+    """
+    user_ids = {}
+    for task in tasks:
+        user_ids.setdefault(task.username, len(user_ids))
+
+    sections = [
+        "\n".join(user_ids).encode(),
+        "\n".join([t.title for t in tasks] + [t.description for t in tasks]).encode(),
+        array("I", [user_ids[t.username] for t in tasks]).tobytes(),
+        array("i", [t.due_ordinal for t in tasks]).tobytes(),
+        array("i", [t.assigned_ordinal for t in tasks]).tobytes(),
+        bytes([1 if t.completed else 0 for t in tasks]),
+    ]
+
+    size, mtime, digest = task_file_stamp(file)
+    cache_file = task_cache_file_name(file)
+    with open(cache_file + ".tmp", "wb") as out_file:
+        out_file.write(TASK_CACHE_HEADER.pack(TASK_CACHE_MAGIC, size, mtime, digest, len(tasks), len(user_ids)))
+        for section in sections:
+            out_file.write(struct.pack("=Q", len(section)))
+            out_file.write(section)
+    if METRICS is not None:
+        METRICS.count("bytes_written", os.path.getsize(cache_file + ".tmp"))
+    os.replace(cache_file + ".tmp", cache_file)
+
+@measured("read_task_cache")
+def read_task_cache(file):
+    """
+    Function to load the tasks from the binary cache of a tasks file
+    The cache is memory mapped and the number arrays are read in place without copying them
+
+    file: string -> name of file containing tasks
+    Returns list: of task objects, None if there is no cache or it does not match the tasks file
+    """
+    cache_file = task_cache_file_name(file)
+    if not os.path.exists(cache_file) or os.path.getsize(cache_file) < TASK_CACHE_HEADER.size:
+        return None
+
+    with open(cache_file, "rb") as cache, mmap.mmap(cache.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        magic, size, mtime, digest, task_count, user_count = TASK_CACHE_HEADER.unpack_from(data)
+        if magic != TASK_CACHE_MAGIC:
+            return None
+
+        #Cheap checks first, the hash only if size and modification time match
+        stat = os.stat(file)
+        if (stat.st_size, stat.st_mtime_ns) != (size, mtime) or task_file_stamp(file) != (size, mtime, digest):
+            return None
+
+        #Finds where every section is
+        sections = {}
+        position = TASK_CACHE_HEADER.size
+        for name in TASK_CACHE_SECTIONS:
+            length, = struct.unpack_from("=Q", data, position)
+            sections[name] = (position + 8, position + 8 + length)
+            position += 8 + length
+
+        usernames = [sys.intern(name) for name in data[slice(*sections["usernames"])].decode().split("\n")]
+        texts = data[slice(*sections["texts"])].decode().split("\n") if task_count else []
+
+        #The views are released at the end of the with block, so the map can be closed
+        with memoryview(data) as view, \
+                view[slice(*sections["user_ids"])].cast("I") as user_ids, \
+                view[slice(*sections["due"])].cast("i") as due, \
+                view[slice(*sections["assigned"])].cast("i") as assigned, \
+                view[slice(*sections["completed"])] as completed:
+
+            #Fills the slots directly, Task.__init__ would convert the dates again
+            task_list = []
+            new_task = Task.__new__
+            for i in range(task_count):
+                curr_t = new_task(Task)
+                curr_t.username = usernames[user_ids[i]]
+                curr_t.title = texts[i]
+                curr_t.description = texts[task_count + i]
+                curr_t.due_ordinal = due[i]
+                curr_t.assigned_ordinal = assigned[i]
+                curr_t.completed = completed[i] == 1
+                task_list.append(curr_t)
+
+    if METRICS is not None:
+        METRICS.count("tasks_from_cache", task_count)
+        METRICS.count("bytes_read", os.path.getsize(cache_file))
+    return task_list
+
+#Layout of the line index of a tasks file: a header, the usernames, the number of tasks of every user,
+#the position of every line in the tasks file and the task positions of every user one after another
+LINE_INDEX_MAGIC = b"TMINDEX" + sys.byteorder[0].encode()
+LINE_INDEX_HEADER = struct.Struct("=8sQQQQQQ")
+
+def line_index_file_name(file):
+    """
+    Returns the name of the line index belonging to a tasks file
+
+    file: string -> name of file containing tasks
+    """
+    return file + ".index"
+
+def build_line_index(data):
+    """
+    Function to find where every task starts in the contents of a tasks file
+    Empty lines are skipped, the same as iter_tasks
+
+    data: bytes/mmap -> Contents of the tasks file
+    Returns tuple: (array of line positions, dict of username -> array of task positions)
+    """
+    offsets = array("Q")
+    user_positions = {}
+    position = 0
+    size = len(data)
+    while position < size:
+        end = data.find(b"\n", position)
+        if end == -1:
+            end = size
+        if end > position:
+            username = data[position:data.find(b";", position, end)].decode()
+            positions = user_positions.get(username)
+            if positions is None:
+                positions = user_positions[username] = array("I")
+            positions.append(len(offsets))
+            offsets.append(position)
+        position = end + 1
+    return offsets, user_positions
+
+def write_line_index(file, offsets, user_positions):
+    """
+    Function to save the line index of a tasks file, stamped with the tasks file it belongs to
+
+    file: string -> name of file containing tasks
+    offsets: array -> Position of every line
+    user_positions: dict -> username -> array of task positions
+    """
+    usernames = "\n".join(user_positions).encode()
+    index_file = line_index_file_name(file)
+    with open(index_file + ".tmp", "wb") as out_file:
+        out_file.write(LINE_INDEX_HEADER.pack(LINE_INDEX_MAGIC, *file_stamp(file), len(offsets),
+                                              len(user_positions), len(usernames)))
+        out_file.write(usernames)
+        out_file.write(array("Q", [len(positions) for positions in user_positions.values()]).tobytes())
+        out_file.write(offsets.tobytes())
+        for positions in user_positions.values():
+            out_file.write(positions.tobytes())
+    os.replace(index_file + ".tmp", index_file)
+
+def read_line_index(file):
+    """
+    Function to load the saved line index of a tasks file
+    The index is memory mapped, so only the parts that are used are read
+
+    file: string -> name of file containing tasks
+    Returns tuple: same as build_line_index, None if there is no index or it does not match the tasks file
+    """
+    index_file = line_index_file_name(file)
+    if not os.path.exists(index_file) or os.path.getsize(index_file) < LINE_INDEX_HEADER.size:
+        return None
+
+    with open(index_file, "rb") as in_file:
+        data = mmap.mmap(in_file.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, *stamp, line_count, user_count, names_length = LINE_INDEX_HEADER.unpack_from(data)
+    if magic != LINE_INDEX_MAGIC or tuple(stamp) != file_stamp(file):
+        data.close()
+        return None
+
+    #The views keep the map open for as long as they are used
+    view = memoryview(data)
+    position = LINE_INDEX_HEADER.size
+    usernames = data[position:position+names_length].decode().split("\n") if user_count else []
+    position += names_length
+    counts = view[position:position + 8*user_count].cast("Q")
+    position += 8*user_count
+    offsets = view[position:position + 8*line_count].cast("Q")
+    position += 8*line_count
+
+    user_positions = {}
+    for username, count in zip(usernames, counts):
+        user_positions[username] = view[position:position + 4*count].cast("I")
+        position += 4*count
+    return offsets, user_positions
+
+#Layout of the index of a user file: a header, then the hashes of the usernames in ascending order
+#and the position of the line of every username in the same order
+USER_INDEX_MAGIC = b"TMUSERS" + sys.byteorder[0].encode()
+#magic, inode and size of the user file when the index was written, hash of the end of it, number of users
+USER_INDEX_HEADER = struct.Struct("=8sQQ20sQ")
+
+def user_index_file_name(file):
+    """
+    Returns the name of the index belonging to a user file
+
+    file: string -> name of file containing users and passwords
+    """
+    return file + ".index"
+
+def user_hash(username):
+    """
+    Returns the hash of a username the user index is sorted by
+    CRC32 is quick to work out, usernames with the same hash are told apart by reading their lines
+
+    username: bytes -> The username
+    """
+    return zlib.crc32(username)
+
+def user_file_digest(data, size):
+    """
+    Returns the hash of the last 4 KB of the first size bytes of a user file
+    Users are only ever appended, so this changes if the part the index was written for is edited
+
+    data: bytes/mmap -> Contents of the user file
+    size: int -> Number of bytes the index covers
+    """
+    return hashlib.sha1(data[max(0, size - 4096):size]).digest()
+
+@measured("write_user_index")
+def write_user_index(file):
+    """
+    Function to write the index of a user file
+    A user that is in the file more than once is found at its last line, like readUsers does
+
+    file: string -> name of file containing users and passwords
+    """
+    with open(file, "rb") as user_file:
+        data = user_file.read()
+
+    #Position of the last line of every username, later lines replace earlier ones in the dict
+    lines = data.split(b"\n")
+    positions = dict(zip([line.split(b";", 1)[0] for line in lines],
+                         accumulate([len(line) + 1 for line in lines[:-1]], initial=0)))
+    positions.pop(b"", None)
+    hashes = array("I", map(user_hash, positions))
+    starts = array("Q", positions.values())
+
+    #Sorted by hash, NumPy sorts much faster if it is installed
+    np = optional_numpy()
+    if np is not None:
+        order = np.argsort(np.frombuffer(hashes, dtype=np.uint32), kind="stable")
+        sections = [np.frombuffer(hashes, dtype=np.uint32)[order].tobytes(),
+                    np.frombuffer(starts, dtype=np.uint64)[order].tobytes()]
+    else:
+        order = sorted(range(len(hashes)), key=hashes.__getitem__)
+        sections = [array("I", [hashes[i] for i in order]).tobytes(), array("Q", [starts[i] for i in order]).tobytes()]
+
+    index_file = user_index_file_name(file)
+    with open(index_file + ".tmp", "wb") as out_file:
+        out_file.write(USER_INDEX_HEADER.pack(USER_INDEX_MAGIC, os.stat(file).st_ino, len(data),
+                                              user_file_digest(data, len(data)), len(hashes)))
+        for section in sections:
+            out_file.write(section)
+    os.replace(index_file + ".tmp", index_file)
+
+def read_user_index(file, data):
+    """
+    Function to load the index of a user file
+    The index is memory mapped, so a lookup only reads the parts of it that it needs
+
+    file: string -> name of file containing users and passwords
+    data: bytes/mmap -> Contents of the user file
+    Returns tuple: (map of the index, hashes, line positions, number of bytes of the user file covered),
+                   None if there is no index or it does not match the user file
+    """
+    index_file = user_index_file_name(file)
+    if not os.path.exists(index_file) or os.path.getsize(index_file) < USER_INDEX_HEADER.size:
+        return None
+
+    with open(index_file, "rb") as in_file:
+        index_data = mmap.mmap(in_file.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, inode, size, digest, user_count = USER_INDEX_HEADER.unpack_from(index_data)
+    if (magic != USER_INDEX_MAGIC or inode != os.stat(file).st_ino or size > len(data)
+            or digest != user_file_digest(data, size)):
+        index_data.close()
+        return None
+
+    #The views keep the map open for as long as they are used
+    view = memoryview(index_data)
+    position = USER_INDEX_HEADER.size
+    hashes = view[position:position + 4*user_count].cast("I")
+    positions = view[position + 4*user_count:position + 12*user_count].cast("Q")
+    return index_data, hashes, positions, size
+
+class UserDirectory(Mapping):
+    """
+    Users and passwords of a user file, used like the dict readUsers returns
+    A username is looked up with a binary search in a memory mapped index of the hashes of all usernames,
+    so logging in and checking a username only read a few pages of the files instead of every user.
+    Users registered after the index was written are appended to the file and kept in memory,
+    the index is written again once there are USER_INDEX_REBUILD of them.
+    """
+    def __init__(self, file):
+        '''
+        Inputs:
+        file: String -> name of file containing users and passwords
+        '''
+        # If no user.txt file, write one with a default account
+        if not os.path.exists(file):
+            with open(file, "w") as default_file:
+                default_file.write("admin;password")
+        self.file = file
+        self.open()
+
+    def open(self):
+        '''
+        Maps the user file and its index, writing the index if it does not match the file
+        '''
+        with open(self.file, "rb") as user_file:
+            self.data = mmap.mmap(user_file.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(self.file) else b""
+        #Usernames are not looked up in any order
+        if self.data and hasattr(mmap, "MADV_RANDOM"):
+            self.data.madvise(mmap.MADV_RANDOM)
+
+        index = read_user_index(self.file, self.data)
+        if index is None:
+            write_user_index(self.file)
+            index = read_user_index(self.file, self.data)
+        self.index_data, self.hashes, self.positions, self.indexed_size = index
+
+        #Users after the part of the file the index was written for, and users registered since
+        self.added = {}
+        for line in self.data[self.indexed_size:].split(b"\n"):
+            #Files saved on Windows end their lines with "\r\n"
+            line = line.rstrip(b"\r")
+            if line:
+                username, password = line.decode().split(";")
+                self.added[username] = password
+        self.length = len(self.hashes) + sum(1 for username in self.added if self.indexed(username) is None)
+
+    def indexed(self, username):
+        '''
+        Returns the password of a user in the part of the file the index was written for, None if not there
+        '''
+        #Only text can be a username, like the keys readUsers returns
+        if not isinstance(username, str):
+            return None
+        name = username.encode()
+        name_hash = user_hash(name)
+        hashes = self.hashes
+        found = bisect_left(hashes, name_hash)
+        #Usernames with the same hash are next to each other
+        while found < len(hashes) and hashes[found] == name_hash:
+            start = self.positions[found]
+            end = self.data.find(b"\n", start)
+            line_name, password = (self.data[start:] if end == -1 else self.data[start:end]).split(b";")
+            if line_name == name:
+                return password.rstrip(b"\r").decode()
+            found += 1
+        return None
+
+    def __getitem__(self, username):
+        if not isinstance(username, str):
+            raise KeyError(username)
+        password = self.added.get(username)
+        if password is None:
+            password = self.indexed(username)
+            if password is None:
+                raise KeyError(username)
+        return password
+
+    def __contains__(self, username):
+        if not isinstance(username, str):
+            return False
+        return username in self.added or self.indexed(username) is not None
+
+    def __setitem__(self, username, password):
+        '''
+        Adds a user in memory, append saves it to the file
+        '''
+        if username not in self:
+            self.length += 1
+        self.added[username] = password
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        #Users in the order of the file, like readUsers
+        seen = set()
+        for line in self.data[:self.indexed_size].split(b"\n"):
+            if line:
+                username = line.split(b";", 1)[0].decode()
+                if username not in seen:
+                    seen.add(username)
+                    yield username
+        for username in self.added:
+            if username not in seen:
+                yield username
+
+    def append(self, usernames):
+        '''
+        Saves new users by appending them to the user file, instead of writing the whole file again
+
+        usernames: list -> The new users, already added with users[username] = password
+        '''
+        if not usernames:
+            return
+        with open(self.file, "a") as out_file:
+            lines = "\n".join(f"{username};{self.added[username]}" for username in usernames)
+            out_file.write(("\n" if os.path.getsize(self.file) > 0 else "") + lines)
+            out_file.flush()
+            os.fsync(out_file.fileno())
+        if METRICS is not None:
+            METRICS.count("bytes_written", len(lines.encode()) + 1)
+
+        if len(self.added) >= USER_INDEX_REBUILD:
+            write_user_index(self.file)
+            self.close()
+            self.open()
+
+    def close(self):
+        '''
+        Releases the views of the index and closes the maps of the user file and its index
+        '''
+        #The maps can only be closed once nothing points into them
+        self.hashes.release()
+        self.positions.release()
+        self.index_data.close()
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+
+class TaskFileView:
+    """
+    List of the tasks in a tasks file that only reads a task when it is used, for TASK_READ_MODE "mmap"
+    The file is memory mapped and only the position of every line is kept,
+    with the positions of the tasks of every user. Titles can be read without making a task object.
+    Tasks that were used, changed or added are kept in memory on top of the file.
+    """
+    def __init__(self, file):
+        '''
+        Inputs:
+        file: String -> name of file containing tasks
+        '''
+        if not os.path.exists(file):
+            with open(file, "w") as default_file:
+                pass
+
+        self.file = file
+        with open(file, "rb") as task_file:
+            self.data = mmap.mmap(task_file.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(file) else b""
+        #Tasks are read in no particular order, so reading ahead would only fill memory
+        if self.data and hasattr(mmap, "MADV_RANDOM"):
+            self.data.madvise(mmap.MADV_RANDOM)
+
+        index = read_line_index(file) if TASK_INDEX_PERSIST else None
+        if index is None:
+            index = build_line_index(self.data)
+            if TASK_INDEX_PERSIST:
+                write_line_index(file, *index)
+        self.offsets, self.user_positions = index
+
+        #Task objects by position, of tasks that were used, changed or added
+        self.tasks_read = {}
+        self.length = len(self.offsets)
+
+    def __len__(self):
+        return self.length
+
+    def line(self, index):
+        '''
+        Returns the line of a task in the file as bytes
+        '''
+        start = self.offsets[index]
+        end = self.data.find(b"\n", start)
+        return self.data[start:] if end == -1 else self.data[start:end]
+
+    def decode(self, index):
+        '''
+        Returns the task object at a position, without keeping it
+        '''
+        task = self.tasks_read.get(index)
+        if task is None:
+            task = Task()
+            task.from_string(self.line(index).decode())
+        return task
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("task index out of range")
+        #Kept so changes made to the task are not lost
+        task = self.tasks_read.get(index)
+        if task is None:
+            task = self.tasks_read[index] = self.decode(index)
+        return task
+
+    def __setitem__(self, index, task):
+        self.tasks_read[index] = task
+
+    def __iter__(self):
+        for index in range(self.length):
+            yield self.decode(index)
+
+    def append(self, task):
+        self.tasks_read[self.length] = task
+        self.length += 1
+
+    def extend(self, tasks):
+        for task in tasks:
+            self.append(task)
+
+    def title(self, index):
+        '''
+        Returns the title of a task, only reading that field if the task was not used yet
+        '''
+        task = self.tasks_read.get(index)
+        if task is not None:
+            return task.title
+        line = self.line(index)
+        start = line.index(b";") + 1
+        return line[start:line.index(b";", start)].decode()
+
+    def positions_of(self, username):
+        '''
+        Returns the positions of the tasks assigned to a user, in ascending order
+        '''
+        positions = set(self.user_positions.get(username, ()))
+        for index, task in self.tasks_read.items():
+            if task.username == username:
+                positions.add(index)
+            else:
+                positions.discard(index)
+        return sorted(positions)
+
+def journal_file_name(file):
+    """
+    Returns the name of the journal belonging to a tasks file
+
+    file: string -> name of file containing tasks
+    """
+    return file + ".journal"
+
+@measured("replay_journal")
+def replay_journal(file, task_list, offset = 0, changes = None):
+    """
+    Function to apply the records in the journal of a tasks file to a list of tasks
+    Every record is "index;task string". An index equal to the number of tasks adds a task,
+    a smaller index replaces the task at that position.
+    Stops at a record that was not fully written, e.g. after a crash
+
+    file: string -> name of file containing tasks
+    task_list: list -> Of task objects read from file
+    offset: int -> Position in the journal to start from, in bytes
+    changes: dict -> Optional, gets position -> task before the first record for it (None for new tasks)
+
+    Returns int: position in the journal after the last complete record
+    """
+    journal_file = journal_file_name(file)
+    if not os.path.exists(journal_file):
+        return 0
+
+    start = offset
+    with open(journal_file, 'rb') as journal:
+        journal.seek(offset)
+        for line in journal:
+            #Unfinished record at the end of the journal
+            if not line.endswith(b"\n"):
+                break
+            offset += len(line)
+
+            index, t_str = line.decode().rstrip("\n").split(";", 1)
+            index = int(index)
+            curr_t = Task()
+            curr_t.from_string(t_str)
+
+            if changes is not None and index not in changes:
+                changes[index] = task_list[index] if index < len(task_list) else None
+            if index == len(task_list):
+                task_list.append(curr_t)
+            else:
+                task_list[index] = curr_t
+
+    if METRICS is not None:
+        METRICS.count("bytes_read", offset - start)
+    return offset
+
+@measured("append_journal")
+def append_journal(file, task_indexes, tasks):
+    """
+    Function to append task records to the journal of a tasks file in one write
+    The cost only depends on the number of records, not on how many tasks are stored
+
+    file: string -> name of file containing tasks
+    task_indexes: list -> Positions of the new or changed tasks, in ascending order
+    tasks: list -> Of all task objects
+    """
+    with open(journal_file_name(file), "a") as journal:
+        records = "".join([f"{i};{tasks[i].to_string()}\n" for i in task_indexes])
+        journal.write(records)
+        journal.flush()
+        os.fsync(journal.fileno())
+    if METRICS is not None:
+        METRICS.count("journal_records", len(task_indexes))
+        METRICS.count("bytes_written", len(records.encode()))
+
+@measured("write_tasks_snapshot")
+def write_tasks_snapshot(file, tasks):
+    """
+    Function to write all tasks into the tasks file
+    Writes a temporary file first and renames it, so the tasks file is never half written
+
+    file: string -> name of file containing tasks
+    tasks: list -> Of task objects
+    """
+    tmp_file = file + ".tmp"
+    with open(tmp_file, "w") as task_file:
+        task_file.write("\n".join([t.to_string() for t in tasks]))
+        task_file.flush()
+        os.fsync(task_file.fileno())
+    if METRICS is not None:
+        METRICS.count("bytes_written", os.path.getsize(tmp_file))
+    os.replace(tmp_file, file)
+
+@measured("compact_tasks")
+def compact_tasks(file, tasks):
+    """
+    Function to merge the journal back into the tasks file
+    The journal is only emptied after the new tasks file is in place.
+    Replaying records that are already in the tasks file gives the same tasks.
+
+    file: string -> name of file containing tasks
+    tasks: list -> Of task objects
+    """
+    journal_file = journal_file_name(file)
+    if not os.path.exists(journal_file) or os.path.getsize(journal_file) == 0:
+        return
+
+    write_tasks_snapshot(file, tasks)
+    #The tasks are at hand, so the next start up can load the cache instead of parsing the new file
+    if TASK_CACHE and isinstance(tasks, list):
+        write_task_cache(file, tasks)
+    with open(journal_file, "w"):
+        pass
+
+@measured("compact_task_file")
+def compact_task_file(file):
+    """
+    Function to merge the journal back into the tasks file without reading the tasks into memory
+    The tasks file is copied line by line, with the lines the journal changes replaced and its new tasks
+    added at the end. Only the journal records are held in memory.
+
+    file: string -> name of file containing tasks
+    """
+    journal_file = journal_file_name(file)
+    if not os.path.exists(journal_file) or os.path.getsize(journal_file) == 0:
+        return
+    if not os.path.exists(file):
+        with open(file, "w"):
+            pass
+
+    #Number of tasks in the file, empty lines are skipped the same as iter_tasks
+    with open(file, "rb") as task_file:
+        line_count = sum(1 for line in task_file if line.strip(b"\r\n"))
+
+    #Latest record of every position, new tasks in order
+    replaced = {}
+    added = []
+    with open(journal_file, "rb") as journal:
+        for line in journal:
+            #Unfinished record at the end of the journal
+            if not line.endswith(b"\n"):
+                break
+            index, t_str = line.rstrip(b"\r\n").split(b";", 1)
+            index = int(index)
+            if index < line_count:
+                replaced[index] = t_str
+            elif index < line_count + len(added):
+                added[index - line_count] = t_str
+            elif index == line_count + len(added):
+                added.append(t_str)
+            else:
+                raise ValueError(f"Journal record for task {index} of {file} leaves a gap")
+
+    tmp_file = file + ".tmp"
+    with open(file, "rb") as task_file, open(tmp_file, "wb") as out_file:
+        lines = (line.rstrip(b"\r\n") for line in task_file)
+        lines = (replaced.get(index, line) for index, line in enumerate(line for line in lines if line))
+        out_file.write(b"\n".join(chain(lines, added)))
+        out_file.flush()
+        os.fsync(out_file.fileno())
+    if METRICS is not None:
+        METRICS.count("bytes_written", os.path.getsize(tmp_file))
+    os.replace(tmp_file, file)
+    with open(journal_file, "w"):
+        pass
+
+def file_stamp(file):
+    """
+    Returns a value that changes whenever a file is replaced or written to,
+    None if the file does not exist
+
+    file: string -> name of the file
+    """
+    try:
+        stat = os.stat(file)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+def map_task_file(file):
+    """
+    Returns (read only memory map of a file, file_stamp of what was mapped)
+    The map is empty bytes for an empty file and the stamp None if there is no file.
+    The stamp is taken from the opened file, so it always belongs to the mapped contents
+
+    file: string -> name of the file
+    """
+    try:
+        task_file = open(file, "rb")
+    except FileNotFoundError:
+        return b"", None
+    with task_file:
+        stat = os.fstat(task_file.fileno())
+        data = mmap.mmap(task_file.fileno(), 0, access=mmap.ACCESS_READ) if stat.st_size else b""
+    return data, (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+def task_file_lines(data):
+    """
+    Returns the non empty lines of the contents of a tasks file as bytes,
+    so the position of a line is the position of its task, the same as iter_tasks
+
+    data: bytes/mmap -> Contents of the tasks file
+    """
+    lines = data[:].split(b"\n")
+    if b"" in lines:
+        lines = [line for line in lines if line]
+    return lines
+
+def task_line_hashes(data, old_hashes = None, reread = ()):
+    """
+    Returns the hash of every non empty line of the contents of a tasks file,
+    reading about a megabyte of lines at a time so the lines of the whole file are never held at once
+
+    data: bytes/mmap -> Contents of the tasks file
+    old_hashes: array -> Optional, hashes of the lines of the file before it changed
+    reread: list -> Optional, positions in ascending order whose lines are returned even if their hash is the same
+    Returns tuple: (array of hashes, dict of position -> line of the lines whose hash is not in old_hashes)
+    """
+    hashes = array("q")
+    changed_lines = {}
+    start = 0
+    size = len(data)
+    while start < size:
+        end = data.find(b"\n", min(start + 2**20, size))
+        if end == -1:
+            end = size
+        lines = task_file_lines(data[start:end])
+        first = len(hashes)
+        hashes.extend(map(hash, lines))
+        #Most of the file is usually the same as before, so runs of hashes are compared first
+        if old_hashes is not None and hashes[first:] != old_hashes[first:len(hashes)]:
+            for run in range(first, len(hashes), 256):
+                stop = min(run + 256, len(hashes))
+                if hashes[run:stop] != old_hashes[run:stop]:
+                    for i in range(run, stop):
+                        if i >= len(old_hashes) or hashes[i] != old_hashes[i]:
+                            changed_lines[i] = lines[i - first]
+        for i in reread[bisect_left(reread, first):bisect_left(reread, len(hashes))]:
+            changed_lines[i] = lines[i - first]
+        start = end + 1
+    return hashes, changed_lines
+
+def parse_task_lines(lines):
+    """
+    Returns the task objects of lines of a tasks file
+    Raises ValueError for a line that can not be read, e.g. one that is still being written
+
+    lines: list -> Of lines as bytes
+    """
+    parsed = []
+    for line in lines:
+        curr_t = Task()
+        try:
+            #Files saved on Windows end their lines with "\r\n"
+            curr_t.from_string(line.rstrip(b"\r").decode())
+        except (IndexError, UnicodeDecodeError) as error:
+            raise ValueError(f"Unreadable task line {line[:40]!r}") from error
+        parsed.append(curr_t)
+    return parsed
+
+class FileLock:
+    """
+    Advisory lock shared by all processes that use the same lock file
+    The holder can take it again, it is released when the outermost with block ends
+    """
+    def __init__(self, file):
+        '''
+        Inputs:
+        file: String -> name of the lock file
+        '''
+        if fcntl is None:
+            raise RuntimeError("File locks are not available on this system")
+        self.file = file
+        self.lock_file = None
+        self.depth = 0
+
+    def __enter__(self):
+        if self.depth == 0:
+            self.lock_file = open(self.file, "a")
+            fcntl.flock(self.lock_file, fcntl.LOCK_EX)
+        self.depth += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        self.depth -= 1
+        if self.depth == 0:
+            fcntl.flock(self.lock_file, fcntl.LOCK_UN)
+            self.lock_file.close()
+            self.lock_file = None
+
+class TextStorage:
+    """
+    Storage of tasks and users in tasks.txt and user.txt
+    Task changes are appended to a journal or rewrite the tasks file, see TASK_STORAGE_MODE
+
+    In "shared" mode several processes can use the same files. Every write takes a file lock,
+    first applies the changes other processes made since this one last looked (sync),
+    and then only appends its own records. The lock is only held for those few steps.
+    With LIVE_RELOAD sync also picks up changes in the other modes, without the lock.
+    """
+    def __init__(self, task_file = TASK_FILE, user_file = USER_FILE, mode = TASK_STORAGE_MODE):
+        '''
+        Inputs:
+        task_file: String
+        user_file: String
+        mode: String -> "journal", "shared" or "snapshot"
+        '''
+        self.task_file = task_file
+        self.user_file = user_file
+        self.mode = mode
+        self.lock = FileLock(task_file + ".lock") if mode == "shared" else None
+
+        #Number of journal records since the last compaction, counted from the tasks they changed
+        #when the journal is read, the journal is merged into the tasks file once there are JOURNAL_COMPACT_LIMIT
+        self.journal_records = 0
+
+        #What this process last saw of the files, used by sync
+        self.task_file_stamp = None
+        self.journal_offset = 0
+        self.user_file_stamp = None
+
+        #Contents of the tasks file the tasks were last brought up to date with, mapped,
+        #the number of tasks in it and the hash of every line, worked out when first needed
+        self.task_file_data = b""
+        self.task_file_lines = 0
+        self.line_hashes = None
+
+        #Changes taken in outside of sync, e.g. before a compaction, kept until sync returns them:
+        #position -> task before the change (None for new tasks), and if all tasks have to be read again
+        self.unreported_changes = {}
+        self.reload_needed = False
+
+        #Positions of the tasks changed by journal records since the tasks file was last seen,
+        #those tasks differ from the file even where its lines stay the same
+        self.journal_positions = set()
+
+    def locked(self):
+        '''
+        Returns a context manager that holds the file lock in "shared" mode
+        '''
+        if self.lock is None:
+            return contextlib.nullcontext()
+        return self.lock
+
+    def remember_task_file(self, tasks, line_count = None):
+        '''
+        Remembers the tasks file as holding exactly the tasks, after reading or writing all of them
+        line_count: int -> Number of tasks in the file, if the tasks also have the changes in the journal
+        '''
+        self.task_file_data, self.task_file_stamp = map_task_file(self.task_file)
+        self.task_file_lines = len(tasks) if line_count is None else line_count
+        self.line_hashes = None
+        self.journal_positions = set()
+
+    def compact(self, tasks = None):
+        '''
+        Merges the journal into the tasks file
+        tasks: list -> Of all task objects, None if they were not loaded, then the file is merged line by line
+        '''
+        if tasks is None:
+            with self.locked():
+                compact_task_file(self.task_file)
+                self.journal_offset = 0
+                self.journal_records = 0
+            return
+
+        with self.locked():
+            #Takes in the changes of other processes first, so none are lost.
+            #The next sync returns them, so the indexes over the tasks are updated as well
+            if not self.take_in(tasks):
+                #The tasks file lost tasks, writing the tasks in memory over it would bring them back
+                return
+            compact_tasks(self.task_file, tasks)
+            self.remember_task_file(tasks)
+            self.journal_offset = 0
+            self.journal_records = 0
+
+    def load_tasks(self):
+        '''
+        Returns the list of all task objects
+        The journal is replayed on top of the tasks file, it is only merged into the file by save_tasks,
+        so a session that only reads tasks writes nothing
+        '''
+        with self.locked():
+            #Other processes replace the tasks file under the map in "shared" mode
+            if TASK_READ_MODE == "mmap" and self.mode != "shared":
+                tasks = TaskFileView(self.task_file)
+            else:
+                tasks = readTasks(self.task_file, journal=False)
+            line_count = len(tasks)
+            changes = {}
+            self.journal_offset = replay_journal(self.task_file, tasks, 0, changes)
+
+            self.remember_task_file(tasks, line_count)
+            self.journal_positions = set(changes)
+            self.journal_records = len(changes)
+            self.unreported_changes = {}
+            self.reload_needed = False
+        return tasks
+
+    def load_users(self):
+        '''
+        Returns a dict of all users and their passwords
+        '''
+        with self.locked():
+            #Other processes append users to the file in "shared" mode, the whole file is read to merge them
+            if USER_INDEX and self.mode != "shared":
+                users = UserDirectory(self.user_file)
+            else:
+                users = readUsers(self.user_file)
+            self.user_file_stamp = file_stamp(self.user_file)
+        return users
+
+    def stream_tasks(self):
+        '''
+        Yields all task objects one at a time
+        Only reads the whole tasks file at once if the journal has changes to replay, and writes nothing
+        '''
+        journal_file = journal_file_name(self.task_file)
+        if os.path.exists(journal_file) and os.path.getsize(journal_file) > 0:
+            with self.locked():
+                tasks = readTasks(self.task_file)
+            yield from tasks
+        elif os.path.exists(self.task_file):
+            yield from iter_tasks(self.task_file)
+
+    def reload_task_file(self, tasks, changes):
+        '''
+        Brings the tasks up to date with a tasks file that was written since it was last seen
+        If lines were only added to the end, only those are read. Otherwise the hash of every line
+        is compared with the line at the same position before, and only lines that differ are read.
+
+        tasks: list -> Of all task objects, changed in place
+        changes: dict -> Gets position -> task before the change (None for new tasks)
+        Returns bool: False if the file has fewer tasks than before, then all tasks have to be read again
+        Raises ValueError if a line can not be read yet, nothing is changed then
+        '''
+        old_data = self.task_file_data
+        data, stamp = map_task_file(self.task_file)
+        old_size = len(old_data)
+        tail = max(0, old_size - 4096)
+
+        if (stamp is not None and self.task_file_stamp is not None and stamp[0] == self.task_file_stamp[0]
+                and len(data) > old_size and data[tail:old_size] == old_data[tail:]
+                and b"\n" in (old_data[-1:], data[old_size:old_size + 1])):
+            #Lines were added to the end of the same file, without changing the last line
+            lines = task_file_lines(data[old_size:])
+            positions = range(self.task_file_lines, self.task_file_lines + len(lines))
+            line_count = self.task_file_lines + len(lines)
+            line_hashes = self.line_hashes
+            if line_hashes is not None:
+                line_hashes = line_hashes + array("q", map(hash, lines))
+            journal_positions = self.journal_positions
+        else:
+            old_hashes = self.line_hashes
+            if old_hashes is None:
+                old_hashes = task_line_hashes(old_data)[0]
+            #Tasks changed by journal records are read from the file again, the journal is replayed on top
+            line_hashes, changed_lines = task_line_hashes(data, old_hashes, sorted(self.journal_positions))
+            if len(line_hashes) < len(old_hashes):
+                return False
+            positions = sorted(changed_lines)
+            lines = [changed_lines[i] for i in positions]
+            line_count = len(line_hashes)
+            #The tasks are now the same as the file, until the journal is replayed
+            journal_positions = set()
+
+        #Reads all changed lines before changing anything
+        parsed = parse_task_lines(lines)
+        for position, curr_t in zip(positions, parsed):
+            if position not in changes:
+                changes[position] = tasks[position] if position < len(tasks) else None
+            if position == len(tasks):
+                tasks.append(curr_t)
+            else:
+                tasks[position] = curr_t
+
+        if METRICS is not None:
+            METRICS.count("tasks_reloaded", len(parsed))
+        self.task_file_data, self.task_file_stamp = data, stamp
+        self.task_file_lines = line_count
+        self.line_hashes = line_hashes
+        self.journal_positions = journal_positions
+        return True
+
+    def outdated(self):
+        '''
+        Returns bool: True if the tasks file or its journal changed since this process last looked
+        '''
+        journal_file = journal_file_name(self.task_file)
+        journal_size = os.path.getsize(journal_file) if os.path.exists(journal_file) else 0
+        return file_stamp(self.task_file) != self.task_file_stamp or journal_size != self.journal_offset
+
+    def take_in(self, tasks):
+        '''
+        Applies the changes other processes saved since this one last looked, and keeps them
+        in unreported_changes until sync returns them
+        Only reads the new journal records and the lines of the tasks file that changed, see reload_task_file.
+        Without LIVE_RELOAD this is only done in "shared" mode
+
+        tasks: list -> Of all task objects, changed in place
+        Returns bool: False if the tasks file lost tasks, then all tasks have to be read again
+        '''
+        if self.mode != "shared" and not LIVE_RELOAD:
+            return True
+
+        with self.locked():
+            if self.reload_needed:
+                return False
+            if not self.outdated():
+                return True
+            offset = self.journal_offset
+            if file_stamp(self.task_file) != self.task_file_stamp:
+                try:
+                    if not self.reload_task_file(tasks, self.unreported_changes):
+                        self.reload_needed = True
+                        return False
+                except ValueError:
+                    #Another process is still writing the file, tried again at the next sync
+                    return True
+                #Records that were in the journal before apply to the new file as well
+                offset = 0
+                self.journal_records = 0
+
+            changes = {}
+            self.journal_offset = replay_journal(self.task_file, tasks, offset, changes)
+            self.journal_positions.update(changes)
+            self.journal_records += len(changes)
+            for position, old_task in changes.items():
+                self.unreported_changes.setdefault(position, old_task)
+        return True
+
+    def sync(self, tasks):
+        '''
+        Applies the changes other processes saved since this one last looked, see take_in
+
+        tasks: list -> Of all task objects, changed in place
+        Returns list: (position, task before the change or None for a new task) of every changed task
+                      since the last sync, in ascending order, or None if all tasks have to be read again
+        '''
+        with self.locked():
+            if not self.take_in(tasks):
+                #The tasks are read again by the caller, starting from a clean slate
+                self.reload_needed = False
+                self.unreported_changes = {}
+                return None
+            changes, self.unreported_changes = self.unreported_changes, {}
+
+        #Records this process wrote itself change nothing
+        return [(i, old_task) for i, old_task in sorted(changes.items())
+                if old_task is None or old_task.to_string() != tasks[i].to_string()]
+
+    def save_tasks(self, task_indexes, tasks):
+        '''
+        Saves new or changed tasks
+
+        task_indexes: list -> Positions of the tasks in tasks, in ascending order
+        tasks: list -> Of all task objects
+        '''
+        if self.mode == "snapshot":
+            write_tasks_snapshot(self.task_file, tasks)
+            self.remember_task_file(tasks)
+            return
+
+        with self.locked():
+            if self.mode == "shared" and self.sync(tasks) != []:
+                #Positions of new tasks may already be taken by tasks of other processes
+                raise RuntimeError("Tasks were changed by another process, sync before choosing positions")
+
+            # Drops an unfinished record left by a process that crashed while writing
+            journal_file = journal_file_name(self.task_file)
+            journal_size = os.path.getsize(journal_file) if os.path.exists(journal_file) else 0
+            if self.mode == "shared" and journal_size > self.journal_offset:
+                os.truncate(journal_file, self.journal_offset)
+                journal_size = self.journal_offset
+
+            # Append the changes to the journal of the tasks file
+            append_journal(self.task_file, task_indexes, tasks)
+            self.journal_positions.update(task_indexes)
+            #Records other processes wrote since the last sync are still read by the next one
+            if journal_size == self.journal_offset:
+                self.journal_offset = os.path.getsize(journal_file)
+            self.journal_records += len(task_indexes)
+
+            # Merge the journal into the tasks file once it gets long
+            if self.journal_records >= JOURNAL_COMPACT_LIMIT:
+                self.compact(tasks)
+
+    def save_users(self, usernames, users):
+        '''
+        Saves new users
+
+        usernames: list -> The new users
+        users: dict -> Of all users and their passwords
+        '''
+        if self.mode != "shared":
+            if isinstance(users, UserDirectory):
+                users.append(usernames)
+            else:
+                write_usernames_to_file(users, self.user_file)
+            return
+
+        with self.locked():
+            #Takes in users registered by other processes, the first to register a name keeps it
+            if file_stamp(self.user_file) != self.user_file_stamp:
+                saved_users = readUsers(self.user_file)
+                new_users = {name: users[name] for name in usernames if name not in saved_users}
+                users.clear()
+                users.update(saved_users)
+                users.update(new_users)
+                usernames = list(new_users)
+
+            #Appends the new users instead of rewriting the file
+            if usernames:
+                with open(self.user_file, "a") as out_file:
+                    lines = "\n".join(f"{name};{users[name]}" for name in usernames)
+                    out_file.write(("\n" if os.path.getsize(self.user_file) > 0 else "") + lines)
+                    out_file.flush()
+                    os.fsync(out_file.fileno())
+            self.user_file_stamp = file_stamp(self.user_file)
+
+    def replace_all(self, tasks, users):
+        '''
+        Replaces all stored tasks and users
+        '''
+        with self.locked():
+            write_tasks_snapshot(self.task_file, tasks)
+            with open(journal_file_name(self.task_file), "w"):
+                pass
+            write_usernames_to_file(users, self.user_file)
+
+    def close(self, tasks):
+        '''
+        Every change is already in the journal, the next session replays it.
+        save_tasks merges it into the tasks file once it has JOURNAL_COMPACT_LIMIT records,
+        so closing writes nothing
+        '''
+
+class SqliteStorage:
+    """
+    Storage of tasks and users in an SQLite database
+    Tasks are stored with their position in the task list as id,
+    so every change is a single row update in its own transaction
+    """
+    def __init__(self, database_file = DATABASE_FILE):
+        '''
+        Inputs:
+        database_file: String
+        '''
+        self.database_file = database_file
+        #The connection is also used by the flush thread of WriteBehindStorage
+        self.connection = sqlite3.connect(database_file, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        with self.connection:
+            self.connection.executescript('''
+                CREATE TABLE IF NOT EXISTS users (
+                    id INTEGER PRIMARY KEY,
+                    username TEXT NOT NULL UNIQUE,
+                    password TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS tasks (
+                    id INTEGER PRIMARY KEY,
+                    username TEXT NOT NULL,
+                    title TEXT NOT NULL,
+                    description TEXT NOT NULL,
+                    due_date INTEGER NOT NULL,
+                    assigned_date INTEGER NOT NULL,
+                    completed INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS tasks_username ON tasks (username);
+                CREATE INDEX IF NOT EXISTS tasks_due_date ON tasks (completed, due_date);
+            ''')
+
+    def load_tasks(self):
+        '''
+        Returns the list of all task objects
+        '''
+        return list(self.stream_tasks())
+
+    def stream_tasks(self):
+        '''
+        Yields all task objects one at a time
+        '''
+        rows = self.connection.execute(
+            "SELECT username, title, description, due_date, assigned_date, completed FROM tasks ORDER BY id"
+        )
+        for username, title, description, due_date, assigned_date, completed in rows:
+            curr_t = Task(sys.intern(username), title, description, None, None, completed == 1)
+            curr_t.due_ordinal = due_date
+            curr_t.assigned_ordinal = assigned_date
+            yield curr_t
+
+    def load_users(self):
+        '''
+        Returns a dict of all users and their passwords
+        Adds a default admin account if no users exist
+        '''
+        rows = self.connection.execute("SELECT username, password FROM users ORDER BY id").fetchall()
+        if len(rows) == 0:
+            self.save_users(["admin"], {"admin": "password"})
+            rows = [("admin", "password")]
+        return dict(rows)
+
+    def task_row(self, task_index, task):
+        '''
+        Returns the values of the tasks table row of a task
+        '''
+        return (task_index, task.username, task.title, task.description,
+                task.due_ordinal, task.assigned_ordinal, 1 if task.completed else 0)
+
+    def save_tasks(self, task_indexes, tasks):
+        '''
+        Saves new or changed tasks as single rows in one transaction
+
+        task_indexes: list -> Positions of the tasks in tasks
+        tasks: list -> Of all task objects
+        '''
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO tasks VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [self.task_row(i, tasks[i]) for i in task_indexes]
+            )
+
+    def save_users(self, usernames, users):
+        '''
+        Saves new users in one transaction
+
+        usernames: list -> The new users
+        users: dict -> Of all users and their passwords
+        '''
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO users (username, password) VALUES (?, ?)",
+                [(username, users[username]) for username in usernames]
+            )
+
+    def replace_all(self, tasks, users):
+        '''
+        Replaces all stored tasks and users in one transaction
+        '''
+        with self.connection:
+            self.connection.execute("DELETE FROM tasks")
+            self.connection.execute("DELETE FROM users")
+            self.connection.executemany(
+                "INSERT INTO tasks VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (self.task_row(i, t) for i, t in enumerate(tasks))
+            )
+            self.connection.executemany(
+                "INSERT INTO users (username, password) VALUES (?, ?)", users.items()
+            )
+
+    def user_stats(self, users, today):
+        '''
+        Counts the tasks of every user with an aggregate query
+
+        users: dict -> Of users and thier passwords
+        today: int -> Todays date as a date ordinal
+
+        Returns dict: username -> [tasks, completed, overdue], same as collect_user_stats
+        '''
+        rows = self.connection.execute(
+            "SELECT username, COUNT(*), SUM(completed), SUM(completed = 0 AND due_date < ?) "
+            "FROM tasks GROUP BY username", (today,)
+        )
+        counts = {username: [total, completed, overdue] for username, total, completed, overdue in rows}
+        return {user: counts.get(user, [0, 0, 0]) for user in users}
+
+    def locked(self):
+        '''
+        SQLite locks the database itself, so there is nothing to hold here
+        '''
+        return contextlib.nullcontext()
+
+    def sync(self, tasks):
+        '''
+        Tasks are not shared between processes through the database, see TextStorage.sync
+        '''
+        return []
+
+    def close(self, tasks):
+        '''
+        Closes the database connection before exiting
+        '''
+        self.connection.close()
+
+class ShardedStorage:
+    """
+    Storage of tasks in one file per assigned user, users in user.txt
+    Every line of a shard is "index;task string", the index being the position of the task
+    in the task list, so the order of all tasks is kept across shards.
+    A session can read only the shard of its user, and a change only rewrites the shard
+    of the task, or appends it to the shard of its new user when it is reassigned.
+    A reassigned task is written as "index:version;task string" with a version one higher
+    than before, so if a crash leaves it in both shards the copy in the new shard wins,
+    see kept_copy. Reading all shards takes the other copy out of its shard.
+    """
+    def __init__(self, shard_dir = TASK_SHARD_DIR, user_file = USER_FILE):
+        '''
+        Inputs:
+        shard_dir: String -> folder of the shard files
+        user_file: String
+        '''
+        self.shard_dir = shard_dir
+        self.user_file = user_file
+
+        #Tasks that have been read or saved, by position
+        self.loaded_tasks = {}
+        #Number of times every task in loaded_tasks was reassigned, 0 if it is missing
+        self.versions = {}
+        #Shard file of every task in loaded_tasks, and the positions in every shard that was read
+        self.shard_of = {}
+        self.shards = {}
+
+        #file_stamp of every shard when they were last checked for tasks in two shards
+        self.checked_shards = None
+
+    def shard_file(self, username):
+        '''
+        Returns the name of the shard file of a user
+        Characters that are not safe in file names are escaped
+        '''
+        return os.path.join(self.shard_dir, quote(username, safe="") + ".txt")
+
+    def shard_files(self):
+        '''
+        Returns the names of all shard files
+        '''
+        if not os.path.isdir(self.shard_dir):
+            return []
+        return [os.path.join(self.shard_dir, name) for name in sorted(os.listdir(self.shard_dir))
+                if name.endswith(".txt")]
+
+    def iter_shard(self, file):
+        '''
+        Yields (position, version, task object) for every line of a shard file
+        '''
+        if not os.path.exists(file):
+            return
+        with open(file, "r") as shard:
+            for line in shard:
+                index, t_str = line.rstrip("\n").split(";", 1)
+                index, _, version = index.partition(":")
+                curr_t = Task()
+                curr_t.from_string(t_str)
+                yield int(index), int(version or 0), curr_t
+
+    def shard_record(self, index):
+        '''
+        Returns the line of a task in its shard
+        '''
+        version = self.versions.get(index, 0)
+        position = f"{index}:{version}" if version else f"{index}"
+        return f"{position};{self.loaded_tasks[index].to_string()}\n"
+
+    def kept_copy(self, index, copy, other_copy):
+        '''
+        Decides which copy of a task in two shards is kept, after a crash while it was reassigned
+        The copy with the higher version is kept, or the one in the later file name if they are equal.
+        Reported on stderr, so it does not mix with the menu or an export to standard output
+
+        index: int -> Position of the task
+        copy: tuple -> (version, shard file) of one copy
+        other_copy: tuple -> (version, shard file) of the other copy
+        Returns tuple: the copy that is kept
+        '''
+        kept = max(copy, other_copy)
+        print(f"Task {index} is in {other_copy[1]} and {copy[1]}, keeping the copy in {kept[1]}", file=sys.stderr)
+        return kept
+
+    def remove_duplicates(self):
+        '''
+        Takes tasks that are in two shards out of the shard whose copy is not kept, see kept_copy
+        Only the position and version at the start of every line are read, and only if a shard
+        changed since the last check. Done before the shards are streamed, so every task is counted once
+        '''
+        files = self.shard_files()
+        stamps = [file_stamp(file) for file in files]
+        if stamps == self.checked_shards:
+            return
+
+        copies = {}
+        stale = {}
+        for file in files:
+            with open(file, "rb") as shard:
+                for line in shard:
+                    index, _, version = line.split(b";", 1)[0].partition(b":")
+                    index = int(index)
+                    copy = (int(version or 0), file)
+                    other_copy = copies.get(index)
+                    if other_copy is not None and other_copy[1] != file:
+                        copy = self.kept_copy(index, copy, other_copy)
+                        stale.setdefault(other_copy[1] if copy != other_copy else file, set()).add(index)
+                    copies[index] = copy
+
+        for file, indexes in stale.items():
+            with open(file, "rb") as shard:
+                lines = [line for line in shard if int(line.split(b";", 1)[0].partition(b":")[0]) not in indexes]
+            tmp_file = file + ".tmp"
+            with open(tmp_file, "wb") as out_file:
+                out_file.write(b"".join(lines))
+                out_file.flush()
+                os.fsync(out_file.fileno())
+            os.replace(tmp_file, file)
+
+            #Tasks read from the stale copies are not in that shard any more
+            if file in self.shards:
+                self.shards[file] -= indexes
+            for index in indexes:
+                if self.shard_of.get(index) == file:
+                    del self.shard_of[index]
+                    del self.loaded_tasks[index]
+                    self.versions.pop(index, None)
+        self.checked_shards = [file_stamp(file) for file in files]
+
+    def read_shard(self, file):
+        '''
+        Reads a shard file into loaded_tasks, unless it was read before
+        A task that is also in a shard read before is kept from one of them, see kept_copy.
+        The other shard is rewritten without it.
+
+        Returns set: positions of the tasks in the shard
+        '''
+        if file not in self.shards:
+            indexes = set()
+            stale_files = set()
+            for index, version, task in self.iter_shard(file):
+                other_file = self.shard_of.get(index)
+                if other_file is not None and other_file != file:
+                    other_copy = (self.versions.get(index, 0), other_file)
+                    if self.kept_copy(index, (version, file), other_copy) == other_copy:
+                        stale_files.add(file)
+                        continue
+                    self.shards[other_file].discard(index)
+                    stale_files.add(other_file)
+                self.loaded_tasks[index] = task
+                self.versions[index] = version
+                self.shard_of[index] = file
+                indexes.add(index)
+            self.shards[file] = indexes
+            for stale_file in stale_files:
+                self.write_shard(stale_file)
+        return self.shards[file]
+
+    def write_shard(self, file):
+        '''
+        Rewrites a shard file from loaded_tasks
+        Writes a temporary file first and renames it, so the shard is never half written
+        '''
+        tmp_file = file + ".tmp"
+        with open(tmp_file, "w") as shard:
+            shard.write("".join([self.shard_record(i) for i in sorted(self.shards[file])]))
+            shard.flush()
+            os.fsync(shard.fileno())
+        os.replace(tmp_file, file)
+
+    def append_shard(self, file, task_indexes):
+        '''
+        Appends tasks to a shard file without reading it
+        '''
+        os.makedirs(self.shard_dir, exist_ok=True)
+        with open(file, "a") as shard:
+            shard.write("".join([self.shard_record(i) for i in task_indexes]))
+            shard.flush()
+            os.fsync(shard.fileno())
+        for index in task_indexes:
+            self.shard_of[index] = file
+            if file in self.shards:
+                self.shards[file].add(index)
+
+    def load_tasks(self):
+        '''
+        Returns the list of all task objects, read from every shard
+        '''
+        self.loaded_tasks = {}
+        self.versions = {}
+        self.shard_of = {}
+        self.shards = {}
+        for file in self.shard_files():
+            self.read_shard(file)
+
+        #Positions are kept across shards, a missing one means a shard lost a task
+        missing = [i for i in range(len(self.loaded_tasks)) if i not in self.loaded_tasks]
+        if missing:
+            raise ValueError(f"Shards in {self.shard_dir} have no task at positions {missing[:10]}"
+                             f"{' and more' if len(missing) > 10 else ''}, the last one is {max(self.loaded_tasks)}")
+        return [self.loaded_tasks[i] for i in range(len(self.loaded_tasks))]
+
+    def load_user_tasks(self, username):
+        '''
+        Returns (position, task object) of every task assigned to a user, only reading their shard
+        '''
+        file = self.shard_file(username)
+        return [(i, self.loaded_tasks[i]) for i in sorted(self.read_shard(file))
+                if self.shard_of.get(i) == file]
+
+    def load_users(self):
+        '''
+        Returns a dict of all users and their passwords
+        '''
+        return UserDirectory(self.user_file) if USER_INDEX else readUsers(self.user_file)
+
+    def stream_tasks(self):
+        '''
+        Yields all task objects one shard at a time, so only one shard is held in memory
+        Tasks are grouped by user instead of in task list order
+        '''
+        self.remove_duplicates()
+        for file in self.shard_files():
+            for index, version, task in self.iter_shard(file):
+                yield task
+
+    def save_tasks(self, task_indexes, tasks):
+        '''
+        Saves new or changed tasks, only writing the shards they are in
+
+        task_indexes: list -> Positions of the tasks in tasks, in ascending order
+        tasks: list/dict -> Of task objects by position
+        '''
+        appends = {}
+        rewrites = set()
+        for index in task_indexes:
+            task = tasks[index]
+            self.loaded_tasks[index] = task
+            old_file = self.shard_of.get(index)
+            new_file = self.shard_file(task.username)
+            if old_file == new_file:
+                rewrites.add(old_file)
+                continue
+
+            #New task, or reassigned to another user
+            appends.setdefault(new_file, []).append(index)
+            if old_file is not None:
+                self.versions[index] = self.versions.get(index, 0) + 1
+                self.shards[old_file].discard(index)
+                rewrites.add(old_file)
+
+        #The new shard is written first, so a crash can not lose a reassigned task
+        for file, indexes in appends.items():
+            self.append_shard(file, indexes)
+        for file in rewrites:
+            self.write_shard(file)
+
+    def save_users(self, usernames, users):
+        '''
+        Saves new users
+        '''
+        if isinstance(users, UserDirectory):
+            users.append(usernames)
+        else:
+            write_usernames_to_file(users, self.user_file)
+
+    def replace_all(self, tasks, users):
+        '''
+        Replaces all stored tasks and users
+        '''
+        for file in self.shard_files():
+            os.remove(file)
+        self.loaded_tasks = dict(enumerate(tasks))
+        self.versions = {}
+        self.shard_of = {}
+        self.shards = {}
+        by_shard = {}
+        for index, task in enumerate(tasks):
+            by_shard.setdefault(self.shard_file(task.username), []).append(index)
+        for file, indexes in by_shard.items():
+            self.append_shard(file, indexes)
+        write_usernames_to_file(users, self.user_file)
+
+    def user_stats(self, users, today):
+        '''
+        Counts the tasks of every user by streaming their shard
+
+        users: dict -> Of users and thier passwords
+        today: int -> Todays date as a date ordinal
+
+        Returns dict: username -> [tasks, completed, overdue], same as collect_user_stats
+        '''
+        self.remove_duplicates()
+        stats = {}
+        for user in users:
+            total = completed = overdue = 0
+            for index, version, task in self.iter_shard(self.shard_file(user)):
+                total += 1
+                if task.completed:
+                    completed += 1
+                elif task.due_ordinal < today:
+                    overdue += 1
+            stats[user] = [total, completed, overdue]
+        return stats
+
+    def locked(self):
+        '''
+        Shards are not shared between processes, so there is nothing to hold here
+        '''
+        return contextlib.nullcontext()
+
+    def sync(self, tasks):
+        '''
+        Shards are not shared between processes, see TextStorage.sync
+        '''
+        return []
+
+    def close(self, tasks):
+        '''
+        Every change is already in its shard
+        '''
+
+class WriteBehindStorage:
+    """
+    Wraps a storage backend and saves changes in batches instead of one at a time
+    Changed tasks and new users are remembered and written together once
+    FLUSH_COUNT changes are pending or FLUSH_INTERVAL seconds have passed.
+    Pending changes are also written on exit and at interpreter shutdown.
+    """
+    def __init__(self, backend, flush_count = FLUSH_COUNT, flush_interval = FLUSH_INTERVAL):
+        '''
+        Inputs:
+        backend: TextStorage/SqliteStorage -> Storage the changes are written to
+        flush_count: int -> Number of pending changes that triggers a write
+        flush_interval: float -> Seconds after the first pending change that trigger a write
+        '''
+        self.backend = backend
+        self.flush_count = flush_count
+        self.flush_interval = flush_interval
+
+        #Pending changes
+        self.tasks = None
+        self.task_indexes = set()
+        self.users = None
+        self.usernames = []
+
+        #Serialises flushes from the timer thread and the main program
+        self.lock = threading.RLock()
+        self.timer = None
+
+        atexit.register(self.flush)
+
+    def __getattr__(self, name):
+        #Everything else, like load_tasks and replace_all, goes straight to the backend
+        return getattr(self.backend, name)
+
+    def pending(self):
+        '''
+        Returns the number of pending changes
+        '''
+        return len(self.task_indexes) + len(self.usernames)
+
+    def changed(self):
+        '''
+        Writes the pending changes if there are enough of them,
+        otherwise makes sure they are written within flush_interval seconds
+        '''
+        if self.pending() >= self.flush_count:
+            self.flush()
+        elif self.timer is None:
+            self.timer = threading.Timer(self.flush_interval, self.flush)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def save_tasks(self, task_indexes, tasks):
+        '''
+        Remembers new or changed tasks to be saved with the next flush
+        '''
+        with self.lock:
+            self.tasks = tasks
+            self.task_indexes.update(task_indexes)
+            self.changed()
+
+    def save_users(self, usernames, users):
+        '''
+        Remembers new users to be saved with the next flush
+        '''
+        with self.lock:
+            self.users = users
+            self.usernames += usernames
+            self.changed()
+
+    def sync(self, tasks):
+        '''
+        Writes pending changes first if other processes saved changes, so those are applied on top of them
+        '''
+        with self.lock:
+            if getattr(self.backend, "outdated", lambda: False)():
+                self.flush()
+            return self.backend.sync(tasks)
+
+    def flush(self):
+        '''
+        Writes all pending changes to the backend
+        '''
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+
+            #Tasks are saved in ascending order, so new tasks are added in the right order
+            if self.task_indexes:
+                self.backend.save_tasks(sorted(self.task_indexes), self.tasks)
+                self.task_indexes = set()
+            if self.usernames:
+                self.backend.save_users(self.usernames, self.users)
+                self.usernames = []
+
+    def load_tasks(self):
+        '''
+        Writes pending changes first, so they are not lost from the tasks that are read
+        '''
+        self.flush()
+        return self.backend.load_tasks()
+
+    def user_stats(self, users, today):
+        '''
+        Writes pending changes so the backend counts them as well
+        '''
+        self.flush()
+        return self.backend.user_stats(users, today)
+
+    def close(self, tasks):
+        '''
+        Writes all pending changes and closes the backend
+        '''
+        self.flush()
+        self.backend.close(tasks)
+
+def open_storage(backend = STORAGE_BACKEND):
+    """
+    Function to open a storage backend
+    Changes are written in batches if FLUSH_COUNT is more than 1
+
+    backend: string -> "text", "sqlite" or "sharded"
+    """
+    if backend == "sqlite":
+        storage = SqliteStorage()
+    elif backend == "sharded":
+        storage = ShardedStorage()
+    else:
+        storage = TextStorage()
+
+    #Other processes have to see every change straight away in "shared" mode
+    if FLUSH_COUNT > 1 and TASK_STORAGE_MODE != "shared":
+        return WriteBehindStorage(storage)
+    return storage
+
+def copy_storage(source, target):
+    """
+    Function to copy all tasks and users from one storage backend to another
+    Prints how long the copy took and the number of tasks copied per second
+
+    source: TextStorage/SqliteStorage/ShardedStorage -> Storage to read from
+    target: TextStorage/SqliteStorage/ShardedStorage -> Storage to write to
+    """
+    start = time.perf_counter()
+    tasks = source.load_tasks()
+    users = source.load_users()
+    target.replace_all(tasks, users)
+    seconds = time.perf_counter() - start
+
+    print(f"Copied {len(tasks)} tasks and {len(users)} users in {seconds:.2f} seconds "
+          f"({len(tasks)/max(seconds, 1e-9):.0f} tasks/sec)")
+
+class TaskColumns:
+    """
+    Columnar copy of the task list used for statistics
+    Keeps one array per field instead of one object per task:
+    user ids, due and assigned date ordinals and completion flags
+    """
+    def __init__(self, tasks = ()):
+        '''
+        Inputs:
+        tasks: list -> Of task objects
+        '''
+        #Usernames are stored as ids into user_names
+        self.user_ids = {}
+        self.user_names = []
+
+        self.users = array("i")
+        self.due_dates = array("i")
+        self.assigned_dates = array("i")
+        self.completed = array("b")
+
+        for index, task in enumerate(tasks):
+            self.add(index, task)
+
+    def __len__(self):
+        return len(self.users)
+
+    def user_id(self, username):
+        '''
+        Returns the id of a username, new usernames get the next id
+        '''
+        user_id = self.user_ids.get(username)
+        if user_id is None:
+            user_id = len(self.user_names)
+            self.user_ids[username] = user_id
+            self.user_names.append(username)
+        return user_id
+
+    def add(self, index, task):
+        '''
+        Adds a new task at the end of the columns
+        '''
+        self.users.append(self.user_id(task.username))
+        self.due_dates.append(task.due_ordinal)
+        self.assigned_dates.append(task.assigned_ordinal)
+        self.completed.append(1 if task.completed else 0)
+
+    def update(self, index, old_task, task):
+        '''
+        Overwrites the task at position index with a changed task
+        '''
+        self.users[index] = self.user_id(task.username)
+        self.due_dates[index] = task.due_ordinal
+        self.assigned_dates[index] = task.assigned_ordinal
+        self.completed[index] = 1 if task.completed else 0
+
+    def user_stats(self, users, today):
+        '''
+        Counts the tasks of every user with batched operations
+
+        users: dict -> Of users and thier passwords
+        today: int -> Todays date as a date ordinal
+
+        Returns dict: username -> [tasks, completed, overdue], same as collect_user_stats
+        '''
+        numpy = optional_numpy()
+        if numpy is not None:
+            user_col = numpy.frombuffer(self.users, dtype=numpy.intc)
+            done = numpy.frombuffer(self.completed, dtype=numpy.int8) != 0
+            overdue = ~done & (numpy.frombuffer(self.due_dates, dtype=numpy.intc) < today)
+
+            size = len(self.user_names)
+            totals = numpy.bincount(user_col, minlength=size).tolist()
+            completed = numpy.bincount(user_col[done], minlength=size).tolist()
+            overdue = numpy.bincount(user_col[overdue], minlength=size).tolist()
+        else:
+            #Counter and compress run over the arrays without a loop in Python
+            #(due < today) > completed is only true for overdue tasks that are not completed
+            totals = Counter(self.users)
+            completed = Counter(compress(self.users, self.completed))
+            overdue = Counter(compress(self.users, map(gt, map(lt, self.due_dates, repeat(today)), self.completed)))
+
+        user_stats = {}
+        for user in users:
+            user_id = self.user_ids.get(user)
+            if user_id is None:
+                user_stats[user] = [0, 0, 0]
+            else:
+                user_stats[user] = [totals[user_id], completed[user_id], overdue[user_id]]
+        return user_stats
+
+class UserTaskIndex:
+    """
+    Index of the positions of the tasks assigned to every user
+    Positions are kept in ascending order, the same order as the task list
+    """
+    def __init__(self, tasks = ()):
+        '''
+        Inputs:
+        tasks: list -> Of task objects
+        '''
+        #username -> list of positions in the task list
+        self.user_tasks = {}
+
+        for index, task in enumerate(tasks):
+            self.add(index, task)
+
+    def add(self, index, task):
+        '''
+        Adds a new task, new tasks are always at the end of the task list
+        '''
+        self.user_tasks.setdefault(task.username, []).append(index)
+
+    def update(self, index, old_task, task):
+        '''
+        Moves a task to its new user if it was reassigned
+        '''
+        if old_task.username != task.username:
+            self.user_tasks[old_task.username].remove(index)
+            insort(self.user_tasks.setdefault(task.username, []), index)
+
+    def tasks_of(self, username):
+        '''
+        Returns the positions of all tasks assigned to username
+        '''
+        return self.user_tasks.get(username, [])
+
+class DueDateIndex:
+    """
+    Index of all incomplete tasks sorted by due date
+    Entries are (due date ordinal, position in the task list) tuples
+    """
+    def __init__(self, tasks = ()):
+        '''
+        Inputs:
+        tasks: list -> Of task objects
+        '''
+        self.entries = sorted(
+            (task.due_ordinal, index) for index, task in enumerate(tasks) if not task.completed
+        )
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, index, task):
+        '''
+        Adds a new task if it is not completed
+        '''
+        if not task.completed:
+            insort(self.entries, (task.due_ordinal, index))
+
+    def update(self, index, old_task, task):
+        '''
+        Moves a task to its new due date, or removes it once it is completed
+        '''
+        if not old_task.completed:
+            del self.entries[bisect_left(self.entries, (old_task.due_ordinal, index))]
+        self.add(index, task)
+
+    def due_before(self, day):
+        '''
+        Returns the positions of incomplete tasks due before day, earliest first
+
+        day: int -> date ordinal
+        '''
+        end = bisect_left(self.entries, (day,))
+        return [index for due, index in self.entries[:end]]
+
+    def due_between(self, first_day, last_day):
+        '''
+        Returns the positions of incomplete tasks due from first_day up to and including last_day
+
+        first_day: int -> date ordinal
+        last_day: int -> date ordinal
+        '''
+        start = bisect_left(self.entries, (first_day,))
+        end = bisect_left(self.entries, (last_day+1,))
+        return [index for due, index in self.entries[start:end]]
+
+    def count_overdue(self, today):
+        '''
+        Returns the number of incomplete tasks that are overdue
+
+        today: int -> Todays date as a date ordinal
+        '''
+        return bisect_left(self.entries, (today,))
+
+class ReportCache:
+    """
+    Per-user report counts kept current as tasks are added and changed
+    Every change applies a delta to the counts of the users involved,
+    so reports can be written without counting all tasks again.
+    Also keeps the rendered report section of every user, see getReportInfo
+    """
+    def __init__(self, tasks, due_date_index, today = None):
+        '''
+        Inputs:
+        tasks: list -> Of task objects
+        due_date_index: DueDateIndex -> Incomplete tasks sorted by due date
+        today: int -> Date ordinal the overdue counts are for, todays date by default
+        '''
+        self.tasks = tasks
+        self.due_date_index = due_date_index
+        self.today = date.today().toordinal() if today is None else today
+
+        #username -> [tasks, completed, overdue]
+        self.counts = {}
+
+        #username -> (numbers the section was rendered with, lines of the section)
+        self.sections = {}
+
+        #Number of changes applied, used to tell if written reports are out of date
+        self.changes = 0
+
+        for index, task in enumerate(tasks):
+            self.add(index, task)
+
+    def apply(self, task, sign):
+        '''
+        Adds (sign = 1) or removes (sign = -1) a task from the counts of its user
+        '''
+        counts = self.counts.setdefault(task.username, [0, 0, 0])
+        counts[0] += sign
+        if task.completed:
+            counts[1] += sign
+        elif task.due_ordinal < self.today:
+            counts[2] += sign
+
+    def add(self, index, task):
+        '''
+        Counts a new task
+        '''
+        self.apply(task, 1)
+        self.changes += 1
+
+    def update(self, index, old_task, task):
+        '''
+        Replaces the counts of a task before a change with the counts after it
+        '''
+        self.apply(old_task, -1)
+        self.apply(task, 1)
+        self.changes += 1
+
+    def roll_over(self, today):
+        '''
+        Recounts overdue tasks when the date has changed since the counts were made
+        Only the incomplete tasks due before today are visited, using the due date index
+
+        today: int -> Todays date as a date ordinal
+        '''
+        if today == self.today:
+            return
+
+        for counts in self.counts.values():
+            counts[2] = 0
+        for index in self.due_date_index.due_before(today):
+            self.counts[self.tasks[index].username][2] += 1
+
+        self.today = today
+        self.changes += 1
+
+    def user_stats(self, users, today):
+        '''
+        Returns the current counts of every user
+
+        users: dict -> Of users and thier passwords
+        today: int -> Todays date as a date ordinal
+
+        Returns dict: username -> [tasks, completed, overdue], same as collect_user_stats
+        '''
+        self.roll_over(today)
+        return {user: list(self.counts.get(user, (0, 0, 0))) for user in users}
+
+    def state(self, users):
+        '''
+        Returns a value that changes whenever the reports would change
+
+        users: dict -> Of users and thier passwords
+        '''
+        return (self.changes, date.today().toordinal(), len(users))
+
+def count_task_range(file_range):
+    """
+    Function to count the tasks of every user in one byte range of a task file
+    Only the fields the reports need are parsed. A line belongs to the range it starts in.
+    Runs in the worker processes of a ParallelReport
+
+    file_range: tuple -> (file name, first byte, end byte, todays date ordinal, fields before the username)
+    Returns dict: username -> [tasks, completed, overdue], including unregistered users
+    """
+    file, start, end, today, skip = file_range
+    counts = {}
+    due_ordinals = {}
+    with open(file, "rb") as task_file:
+        #Skips the rest of a line that started in the previous range
+        if start > 0:
+            task_file.seek(start-1)
+            start += len(task_file.readline()) - 1
+
+        position = start
+        while position < end:
+            line = task_file.readline()
+            if not line:
+                break
+            position += len(line)
+
+            fields = line.rstrip(b"\r\n").split(b";")
+            if len(fields) < skip + 6:
+                continue
+            stats = counts.get(fields[skip])
+            if stats is None:
+                stats = counts[fields[skip]] = [0, 0, 0]
+            stats[0] += 1
+            if fields[skip+5] == b"Yes":
+                stats[1] += 1
+            else:
+                due = due_ordinals.get(fields[skip+3])
+                if due is None:
+                    due = due_ordinals[fields[skip+3]] = parse_date_ordinal(fields[skip+3].decode())
+                if due < today:
+                    stats[2] += 1
+
+    return {username.decode(): stats for username, stats in counts.items()}
+
+class ParallelReport:
+    """
+    Counts the tasks for the reports in a pool of processes, straight from the task files
+    The files are split into byte ranges that the workers parse and count on their own,
+    and the per-user counts of all ranges are added up at the end.
+    """
+    def __init__(self, files, skip = 0, workers = REPORT_WORKERS):
+        '''
+        Inputs:
+        files: list -> Names of the files holding all tasks, tasks.txt or the shards
+        skip: int -> Fields before the username on every line, 1 for the index in shards
+        workers: int -> Number of processes, 1 counts in this process
+        '''
+        self.files = files
+        self.skip = skip
+        self.workers = workers
+
+        #Counts of every user for a date ordinal and the files as they were,
+        #so the tasks are only counted again once the day or the files change
+        self.counted_state = None
+        self.counts = None
+
+    def ranges(self, today):
+        '''
+        Returns the byte ranges the files are split into, a few per worker so they finish together
+        '''
+        sizes = [(file, os.path.getsize(file)) for file in self.files if os.path.exists(file)]
+        range_size = max(sum(size for file, size in sizes) // (self.workers * 4), 2**16)
+        return [(file, start, min(start + range_size, size), today, self.skip)
+                for file, size in sizes for start in range(0, size, range_size)]
+
+    def count(self, today):
+        '''
+        Returns dict: username -> [tasks, completed, overdue] of every user with tasks
+        '''
+        state = (today, tuple(file_stamp(file) for file in self.files))
+        if self.counted_state != state:
+            ranges = self.ranges(today)
+            if self.workers > 1 and len(ranges) > 1:
+                #Only imported when needed, so importing task_manager stays fast
+                from concurrent.futures import ProcessPoolExecutor
+                with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                    results = list(pool.map(count_task_range, ranges))
+            else:
+                results = map(count_task_range, ranges)
+
+            self.counts = {}
+            for result in results:
+                for username, stats in result.items():
+                    total = self.counts.setdefault(username, [0, 0, 0])
+                    total[0] += stats[0]
+                    total[1] += stats[1]
+                    total[2] += stats[2]
+            self.counted_state = state
+        return self.counts
+
+    def task_count(self):
+        '''
+        Returns the number of tasks in the files
+        '''
+        return sum(stats[0] for stats in self.count(date.today().toordinal()).values())
+
+    def user_stats(self, users, today):
+        '''
+        Counts the tasks of every user, see count
+
+        users: dict -> Of users and thier passwords
+        today: int -> Todays date as a date ordinal
+
+        Returns dict: username -> [tasks, completed, overdue], same as collect_user_stats
+        '''
+        counts = self.count(today)
+        return {user: counts.get(user, [0, 0, 0]) for user in users}
+
+#Layout of a saved search index: a header, then for titles and for descriptions the words,
+#the number of tasks of every word and the positions of those tasks one word after another
+SEARCH_INDEX_MAGIC = b"TMSRCH02"
+SEARCH_INDEX_HEADER = struct.Struct("=8sQQQQQQ")
+SEARCH_FIELDS = (("title", 2.0), ("description", 1.0))
+
+def search_index_file_name(file):
+    """
+    Returns the name of the saved search index belonging to a tasks file
+
+    file: string -> name of file containing tasks
+    """
+    return file + ".search"
+
+def search_index_stamp(file):
+    """
+    Returns (size, modification time) of a tasks file and of its journal, the tasks a saved search index is for
+    The journal is 0, 0 if it does not exist
+
+    file: string -> name of file containing tasks
+    Returns tuple: None if the tasks file does not exist
+    """
+    stamp = file_stamp(file)
+    if stamp is None:
+        return None
+    journal_stamp = file_stamp(journal_file_name(file))
+    return stamp[1:] + (journal_stamp[1:] if journal_stamp is not None else (0, 0))
+
+def tokenize(text):
+    """
+    Returns the set of lower case words in a text
+    """
+    return set(re.findall(r"\w+", text.lower()))
+
+class SearchIndex:
+    """
+    Inverted index of the words in the titles and descriptions of the tasks
+    Every word has a sorted array of the positions of the tasks it is in, one per field,
+    and the sorted list of all words finds the words starting with a prefix.
+    Kept current as tasks are added or changed, like the other task indexes.
+    """
+    def __init__(self, tasks = ()):
+        '''
+        Inputs:
+        tasks: list -> Of task objects
+        '''
+        self.postings = {field: {} for field, weight in SEARCH_FIELDS}
+        self.words = []
+        self.task_count = 0
+
+        #True if the index changed since it was built, saved or loaded
+        self.changed = False
+
+        for index, task in enumerate(tasks):
+            for field, weight in SEARCH_FIELDS:
+                postings = self.postings[field]
+                for word in tokenize(getattr(task, field)):
+                    positions = postings.get(word)
+                    if positions is None:
+                        positions = postings[word] = array("I")
+                    positions.append(index)
+            self.task_count += 1
+        self.words = sorted(set().union(*self.postings.values()))
+        self.changed = True
+
+    def add_word(self, field, word, index):
+        postings = self.postings[field]
+        positions = postings.get(word)
+        if positions is None:
+            positions = postings[word] = array("I")
+            if not self.has_word(word, field):
+                insort(self.words, word)
+        if positions and positions[-1] > index:
+            insort(positions, index)
+        else:
+            positions.append(index)
+
+    def remove_word(self, field, word, index):
+        postings = self.postings[field]
+        positions = postings[word]
+        positions.remove(index)
+        if not positions:
+            del postings[word]
+            if not self.has_word(word):
+                del self.words[bisect_left(self.words, word)]
+
+    def has_word(self, word, skip_field = None):
+        '''
+        Returns True if any field other than skip_field has the word
+        '''
+        return any(word in self.postings[field] for field, weight in SEARCH_FIELDS if field != skip_field)
+
+    def add(self, index, task):
+        for field, weight in SEARCH_FIELDS:
+            for word in tokenize(getattr(task, field)):
+                self.add_word(field, word, index)
+        self.task_count += 1
+        self.changed = True
+
+    def update(self, index, old_task, task):
+        for field, weight in SEARCH_FIELDS:
+            old_text = getattr(old_task, field)
+            new_text = getattr(task, field)
+            if old_text == new_text:
+                continue
+            old_words = tokenize(old_text)
+            new_words = tokenize(new_text)
+            for word in old_words - new_words:
+                self.remove_word(field, word, index)
+            for word in new_words - old_words:
+                self.add_word(field, word, index)
+            self.changed = True
+
+    def matching_words(self, prefix):
+        '''
+        Returns the words starting with prefix
+        '''
+        start = bisect_left(self.words, prefix)
+        end = start
+        while end < len(self.words) and self.words[end].startswith(prefix):
+            end += 1
+        return self.words[start:end]
+
+    def term_postings(self, term):
+        '''
+        Returns [(sorted positions, score of a match)] of every word and field a search term matches
+        Titles count more than descriptions, rare words more than common ones,
+        and the whole word more than a word it is the start of
+        '''
+        matches = []
+        for word in self.matching_words(term):
+            for field, weight in SEARCH_FIELDS:
+                positions = self.postings[field].get(word)
+                if positions:
+                    score = weight * math.log(1 + self.task_count / len(positions))
+                    matches.append((positions, score if word == term else score / 2))
+        return matches
+
+    def search(self, query, limit = None):
+        '''
+        Finds the tasks that have every word of the query, or a word starting with it
+
+        query: string -> Words to search for
+        limit: int -> Number of results to return, all by default
+        Returns list: (position, score) of the matching tasks, best matches first
+        '''
+        return self.best_matches(query, limit)[1]
+
+    def best_matches(self, query, limit = None):
+        '''
+        Same as search, also counting all matching tasks when only the best ones are returned
+
+        Returns tuple: (number of matching tasks, list of (position, score) of the best ones)
+        '''
+        terms = tokenize(query)
+        if not terms:
+            return 0, []
+
+        #Starts from the term with the fewest tasks, the other terms only check those
+        term_matches = sorted((self.term_postings(term) for term in terms),
+                              key=lambda matches: sum(len(positions) for positions, score in matches))
+        #Arrays over all tasks only pay off once many tasks match every term
+        np = optional_numpy()
+        if np is not None and sum(len(positions) for positions, score in term_matches[0]) > 10000:
+            return self.search_numpy(np, term_matches, limit)
+
+        scores = {}
+        for positions, score in term_matches[0]:
+            for index in positions:
+                scores[index] = scores.get(index, 0) + score
+
+        for matches in term_matches[1:]:
+            if not scores:
+                break
+            term_scores = {}
+            for positions, score in matches:
+                #Looks each candidate up in the sorted positions, unless that is more work than reading them
+                if len(scores) * math.log2(len(positions) + 1) < len(positions):
+                    for index in scores:
+                        found = bisect_left(positions, index)
+                        if found < len(positions) and positions[found] == index:
+                            term_scores[index] = term_scores.get(index, 0) + score
+                else:
+                    for index in positions:
+                        if index in scores:
+                            term_scores[index] = term_scores.get(index, 0) + score
+            scores = {index: scores[index] + score for index, score in term_scores.items()}
+
+        if limit is not None:
+            return len(scores), heapq.nsmallest(limit, scores.items(), key=lambda result: (-result[1], result[0]))
+        return len(scores), sorted(scores.items(), key=lambda result: (-result[1], result[0]))
+
+    def search_numpy(self, np, term_matches, limit):
+        '''
+        Same as best_matches, adding up the scores of all tasks in arrays with NumPy
+        Used for queries matching many tasks, where looping over them in Python is slow
+        '''
+        size = max(self.task_count, 1)
+        scores = np.zeros(size)
+        found = np.ones(size, dtype=bool)
+        for matches in term_matches:
+            term_scores = np.zeros(size)
+            for positions, score in matches:
+                #Every task is only once in the positions of a word, so += adds to each of them
+                term_scores[np.frombuffer(positions, dtype=np.uint32)] += score
+            found &= term_scores > 0
+            scores += term_scores
+
+        indexes = np.flatnonzero(found)
+        found_count = len(indexes)
+        if limit is not None and len(indexes) > limit:
+            #Only sorts the best ones, ties with the last one go to the first tasks like in search
+            found_scores = scores[indexes]
+            last = -np.partition(-found_scores, limit - 1)[limit - 1]
+            better = indexes[found_scores > last]
+            indexes = np.concatenate((better, indexes[found_scores == last][:limit - len(better)]))
+        indexes = indexes[np.lexsort((indexes, -scores[indexes]))]
+        return found_count, list(zip(indexes.tolist(), scores[indexes].tolist()))
+
+    def save(self, file):
+        '''
+        Saves the index next to a tasks file, stamped with the tasks file and journal it was built from
+        Nothing is saved if the tasks file does not exist, there is nothing to stamp it with
+
+        file: string -> name of file containing tasks
+        '''
+        stamp = search_index_stamp(file)
+        if stamp is None:
+            return
+        sections = []
+        for field, weight in SEARCH_FIELDS:
+            postings = self.postings[field]
+            words = "\n".join(postings).encode()
+            sections.append(struct.pack("=QQ", len(postings), len(words)) + words)
+            sections.append(array("Q", [len(positions) for positions in postings.values()]).tobytes())
+            sections.extend(positions.tobytes() for positions in postings.values())
+
+        index_file = search_index_file_name(file)
+        with open(index_file + ".tmp", "wb") as out_file:
+            out_file.write(SEARCH_INDEX_HEADER.pack(SEARCH_INDEX_MAGIC, *stamp, self.task_count,
+                                                    array("I").itemsize))
+            out_file.writelines(sections)
+        os.replace(index_file + ".tmp", index_file)
+        self.changed = False
+
+    @classmethod
+    def load(cls, file, task_count):
+        '''
+        Loads the saved index of a tasks file
+
+        file: string -> name of file containing tasks
+        task_count: int -> Number of tasks the index has to be for
+        Returns SearchIndex: None if there is no saved index or it is not for the tasks in the file
+        '''
+        index_file = search_index_file_name(file)
+        if not os.path.exists(index_file) or os.path.getsize(index_file) < SEARCH_INDEX_HEADER.size:
+            return None
+        with open(index_file, "rb") as in_file:
+            data = in_file.read()
+
+        magic, *stamp, saved_count, item_size = SEARCH_INDEX_HEADER.unpack_from(data)
+        if (magic, item_size, saved_count) != (SEARCH_INDEX_MAGIC, array("I").itemsize, task_count) or \
+                tuple(stamp) != search_index_stamp(file):
+            return None
+
+        search_index = cls()
+        position = SEARCH_INDEX_HEADER.size
+        for field, weight in SEARCH_FIELDS:
+            word_count, words_length = struct.unpack_from("=QQ", data, position)
+            position += 16
+            words = data[position:position+words_length].decode().split("\n") if word_count else []
+            position += words_length
+            counts = array("Q", data[position:position + 8*word_count])
+            position += 8*word_count
+
+            postings = search_index.postings[field]
+            for word, count in zip(words, counts):
+                positions = postings[word] = array("I")
+                positions.frombytes(data[position:position + item_size*count])
+                position += item_size*count
+
+        search_index.words = sorted(set().union(*search_index.postings.values()))
+        search_index.task_count = task_count
+        search_index.changed = False
+        return search_index
+
+class TaskStore:
+    """
+    Tasks and users of the task manager, with the indexes over the tasks
+    Nothing is read from storage until it is first used,
+    and every index is only built the first time it is needed.
+    """
+    def __init__(self, storage = None):
+        '''
+        Inputs:
+        storage: TextStorage/SqliteStorage/ShardedStorage/WriteBehindStorage -> open_storage() by default
+        '''
+        self.storage_obj = storage
+        self.task_list = None
+        self.username_passwords = None
+
+        #Indexes that have been built, kept current when tasks are added or changed
+        self.task_indexes = {}
+
+        #What the report files were last written for, None if not written yet
+        self.reported_state = None
+
+        #Report counted by worker processes, kept so its counts are reused
+        self.parallel_report = None
+
+        #Number of times tasks were added or changed since they were loaded
+        self.task_changes = 0
+
+    @property
+    def storage(self):
+        if self.storage_obj is None:
+            self.storage_obj = open_storage()
+        return self.storage_obj
+
+    @property
+    def tasks(self):
+        if self.task_list is None:
+            self.task_list = self.storage.load_tasks()
+        return self.task_list
+
+    @property
+    def users(self):
+        if self.username_passwords is None:
+            self.username_passwords = self.storage.load_users()
+        return self.username_passwords
+
+    def index(self, name):
+        '''
+        Returns a task index, building it on first use
+
+        name: string -> "columns", "users", "due_dates", "report" or "search"
+        '''
+        task_index = self.task_indexes.get(name)
+        if task_index is None:
+            if name == "columns":
+                task_index = TaskColumns(self.tasks)
+            elif name == "users":
+                task_index = UserTaskIndex(self.tasks)
+            elif name == "due_dates":
+                task_index = DueDateIndex(self.tasks)
+            elif name == "report":
+                task_index = ReportCache(self.tasks, self.index("due_dates"))
+            elif name == "search":
+                task_index = self.saved_search_index() or SearchIndex(self.tasks)
+            else:
+                raise ValueError(f"Unknown task index {name}")
+            self.task_indexes[name] = task_index
+        return task_index
+
+    @property
+    def user_task_index(self):
+        return self.index("users")
+
+    @property
+    def due_date_index(self):
+        return self.index("due_dates")
+
+    @property
+    def report_cache(self):
+        return self.index("report")
+
+    @property
+    def search_index(self):
+        return self.index("search")
+
+    def search_file(self):
+        '''
+        Returns the tasks file the search index can be saved with, None if it can not be saved
+        The index is saved for the tasks file and its journal as they are, other processes change them in "shared" mode
+        '''
+        storage = getattr(self.storage, "backend", self.storage)
+        if not TASK_SEARCH_PERSIST or not isinstance(storage, TextStorage) or storage.mode == "shared":
+            return None
+        return storage.task_file
+
+    def saved_search_index(self):
+        '''
+        Returns the saved search index, None if there is none for the current tasks
+        '''
+        tasks = self.tasks
+        file = self.search_file()
+        if file is None or self.task_changes:
+            return None
+        return SearchIndex.load(file, len(tasks))
+
+    def report_tasks(self):
+        '''
+        Returns what getReportInfo should count the tasks from, see REPORT_BACKEND
+        '''
+        if REPORT_BACKEND == "cache":
+            return self.report_cache
+        elif REPORT_BACKEND == "columns":
+            return self.index("columns")
+        elif REPORT_BACKEND == "storage" and isinstance(getattr(self.storage, "backend", self.storage),
+                                                        (SqliteStorage, ShardedStorage)):
+            return self.storage
+        elif REPORT_BACKEND == "parallel" and self.report_files() is not None:
+            #Kept, so the counts are reused until the files change
+            files, skip = self.report_files()
+            if self.parallel_report is None or (self.parallel_report.files, self.parallel_report.skip) != (files, skip):
+                self.parallel_report = ParallelReport(files, skip)
+            return self.parallel_report
+        return self.tasks
+
+    def report_files(self):
+        '''
+        Saves pending changes and returns (the files holding all tasks, fields before the username),
+        None if the tasks are not stored in text files
+        '''
+        storage = self.storage
+        if isinstance(storage, WriteBehindStorage):
+            storage.flush()
+            storage = storage.backend
+
+        if isinstance(storage, ShardedStorage):
+            #The shards are counted as they are, without a task left in two of them
+            storage.remove_duplicates()
+            return storage.shard_files(), 1
+        elif isinstance(storage, TextStorage):
+            #Changes still in the journal are merged into the tasks file first,
+            #line by line if the tasks were not loaded
+            journal_file = journal_file_name(storage.task_file)
+            if os.path.exists(journal_file) and os.path.getsize(journal_file) > 0:
+                storage.compact(self.task_list)
+            return [storage.task_file], 0
+        return None
+
+    def report_state(self):
+        '''
+        Returns a value that changes whenever the reports would change
+        '''
+        if REPORT_BACKEND == "parallel":
+            report_files = self.report_files()
+            if report_files is not None:
+                return (tuple(file_stamp(file) for file in report_files[0]), date.today().toordinal(), len(self.users))
+        return self.report_cache.state(self.users)
+
+    @property
+    def known_tasks(self):
+        '''
+        The tasks that have been read by position: all of them,
+        or with sharded storage only those of the users passed to user_tasks so far
+        '''
+        if self.task_list is None and hasattr(self.storage, "load_user_tasks"):
+            return self.storage.loaded_tasks
+        return self.tasks
+
+    def user_tasks(self, username):
+        '''
+        Returns (position, task object) of every task assigned to a user
+        With sharded storage only the user's shard is read, unless all tasks are loaded already
+        '''
+        if self.task_list is None and hasattr(self.storage, "load_user_tasks"):
+            return self.storage.load_user_tasks(username)
+        tasks = self.tasks
+        if isinstance(tasks, TaskFileView):
+            return [(i, tasks[i]) for i in tasks.positions_of(username)]
+        return [(i, tasks[i]) for i in self.user_task_index.tasks_of(username)]
+
+    def task_titles(self, username):
+        '''
+        Returns (position, title) of every task assigned to a user
+        With TASK_READ_MODE "mmap" only the titles are read from the tasks file
+        '''
+        if self.task_list is None and hasattr(self.storage, "load_user_tasks"):
+            return [(i, task.title) for i, task in self.storage.load_user_tasks(username)]
+        tasks = self.tasks
+        if isinstance(tasks, TaskFileView):
+            return [(i, tasks.title(i)) for i in tasks.positions_of(username)]
+        return [(i, tasks[i].title) for i in self.user_task_index.tasks_of(username)]
+
+    def task_page(self, start, stop):
+        '''
+        Returns the task objects from position start up to stop, for showing them
+        With TASK_READ_MODE "mmap" the tasks are read without keeping them in memory
+        '''
+        tasks = self.tasks
+        if isinstance(tasks, TaskFileView):
+            return [tasks.decode(i) for i in range(start, min(stop, len(tasks)))]
+        return tasks[start:stop]
+
+    def sync(self):
+        '''
+        Takes in the tasks other processes saved since they were loaded, see TextStorage.sync
+        The indexes are updated for every changed task. If a lot of tasks changed they are
+        rebuilt the next time they are used instead, and if the tasks file lost tasks
+        all tasks are read again.
+
+        Returns bool: True if tasks changed
+        '''
+        if self.task_list is None:
+            return False
+        changes = self.storage.sync(self.task_list)
+        if changes == []:
+            return False
+
+        if changes is None:
+            self.task_list = None
+            self.task_indexes = {}
+        elif len(changes) > SYNC_REBUILD_LIMIT * len(self.task_list):
+            self.task_indexes = {}
+        else:
+            for task_index, old_task in changes:
+                task = self.task_list[task_index]
+                for index_obj in self.task_indexes.values():
+                    if old_task is None:
+                        index_obj.add(task_index, task)
+                    else:
+                        index_obj.update(task_index, old_task, task)
+        self.reported_state = None
+        self.task_changes += 1
+        return True
+
+    def add_tasks(self, new_tasks):
+        '''
+        Adds new tasks to the tasks and indexes and saves them
+
+        new_tasks: list -> Of the new task objects
+        Returns int: the position of the first new task
+        '''
+        with self.storage.locked():
+            #Other processes may have added tasks at the positions these would take
+            self.sync()
+            tasks = self.tasks
+            first_index = len(tasks)
+            tasks.extend(new_tasks)
+            for task_index in range(first_index, len(tasks)):
+                for index_obj in self.task_indexes.values():
+                    index_obj.add(task_index, tasks[task_index])
+            self.storage.save_tasks(list(range(first_index, len(tasks))), tasks)
+            self.task_changes += 1
+        return first_index
+
+    def add_task(self, task):
+        '''
+        Adds a new task to the tasks and indexes and saves it
+
+        task: Task -> The new task
+        Returns int: the position of the task
+        '''
+        return self.add_tasks([task])
+
+    def update_task(self, task_index, old_task):
+        '''
+        Updates the indexes after a task was changed and saves it
+        If another process saved the same task in the meantime, only the fields changed
+        here are applied to its version, so both changes are kept
+
+        task_index: int -> Position of the task
+        old_task: Task -> Copy of the task from before the change
+        '''
+        tasks = self.known_tasks
+        task = tasks[task_index]
+        with self.storage.locked():
+            #The task was already changed in place, so the indexes take the change before sync.
+            #A version saved by another process then replaces the task the way the indexes have it
+            for index_obj in self.task_indexes.values():
+                index_obj.update(task_index, old_task, task)
+            if self.sync() and self.tasks[task_index] is not task:
+                latest_task = self.tasks[task_index]
+                latest_old_task = latest_task.copy()
+                for field in Task.__slots__:
+                    if getattr(task, field) != getattr(old_task, field):
+                        setattr(latest_task, field, getattr(task, field))
+                for index_obj in self.task_indexes.values():
+                    index_obj.update(task_index, latest_old_task, latest_task)
+            self.storage.save_tasks([task_index], self.known_tasks)
+            self.task_changes += 1
+
+    def add_user(self, username, password):
+        '''
+        Adds a new user and saves it
+        With shared storage a user registered by another process first keeps the name
+        '''
+        self.users[username] = password
+        self.storage.save_users([username], self.users)
+
+    def close(self):
+        '''
+        Finishes any pending storage work, like writing changes that are still buffered
+        Saves the search index if it was used
+        '''
+        if self.storage_obj is not None:
+            self.storage_obj.close(self.task_list)
 
-    #Converts task info into a task object
-    task_list = []
-    for t_str in task_data:
-        curr_t = Task()
-        curr_t.from_string(t_str)
-        task_list.append(curr_t)
-    
-    return task_list
+            search_index = self.task_indexes.get("search")
+            if search_index is not None and search_index.changed and self.search_file() is not None:
+                search_index.save(self.search_file())
 
+@measured("read_users")
 def readUsers(file):
     """
     Function to read all the users and passwords in a text file
@@ -103,6 +3288,8 @@ def readUsers(file):
     # Read in user_data
     with open(file, 'r') as user_file:
         user_data = user_file.read().split("\n")
+    if METRICS is not None:
+        METRICS.count("bytes_read", os.path.getsize(file))
 
     # Convert to a dictionary
     username_passwords = {}
@@ -122,8 +3309,8 @@ def login(usernames):
     while not logged_in:
 
         print("LOGIN")
-        curr_user = input("Username: ")
-        curr_pass = input("Password: ")
+        curr_user = ask("Username: ")
+        curr_pass = ask("Password: ")
         if curr_user not in usernames.keys():
             print("User does not exist")
             continue
@@ -142,6 +3329,10 @@ def validate_string(input_str):
     if ";" in input_str:
         print("Your input cannot contain a ';' character")
         return False
+    # Each task and user is stored on its own line
+    if "\n" in input_str or "\r" in input_str:
+        print("Your input cannot contain a line break")
+        return False
     return True
 
 def check_username_and_password(username, password):
@@ -152,29 +3343,46 @@ def check_username_and_password(username, password):
     if ";" in username or ";" in password:
         print("Username or password cannot contain ';'.")
         return False
+    # Each user is stored on its own line
+    if "\n" in username + password or "\r" in username + password:
+        print("Username or password cannot contain a line break.")
+        return False
     return True
 
-def write_usernames_to_file(username_dict):
+@measured("write_users")
+def write_usernames_to_file(username_dict, file = USER_FILE):
     '''
     Function to write username to file
 
     Input: dictionary of username-password key-value pairs
+    Writes a temporary file first and renames it, so the user file is never half written
     '''
-    with open("user.txt", "w") as out_file:
+    tmp_file = file + ".tmp"
+    with open(tmp_file, "w") as out_file:
         user_data = []
         for k in username_dict:
             user_data.append(f"{k};{username_dict[k]}")
         out_file.write("\n".join(user_data))
+        out_file.flush()
+        os.fsync(out_file.fileno())
+    if METRICS is not None:
+        METRICS.count("bytes_written", os.path.getsize(tmp_file))
+    os.replace(tmp_file, file)
 
-def check_user(exist = 1):
+    #The file was written again, so its index has to be as well
+    if USER_INDEX:
+        write_user_index(file)
+
+def check_user(username_passwords, exist = 1):
     """
     Checks if a user exists or does not exist and asks to enter another name
+    username_passwords: dict -> Containing all usernames and passwords
     exist = 0 -> Checks for existing users
     exist != 0 -> Checks for non-existing users
     """
     #Loops until a valid user is given
     while True:
-        new_username = input("Username: ")
+        new_username = ask("Username: ")
         
         if exist == 0:
             if new_username not in username_passwords.keys():
@@ -190,37 +3398,45 @@ def date_input():
     # Obtain and parse due date
     while True:
         try:
-            task_due_date = input("Due date of task (YYYY-MM-DD): ")
+            task_due_date = ask("Due date of task (YYYY-MM-DD): ")
             due_date_time = datetime.strptime(task_due_date, DATETIME_STRING_FORMAT)
             return due_date_time
         except ValueError:
             print("Invalid datetime format. Please use the format specified")
 
-def write_task():
-    # Write to tasks.txt
-    with open("tasks.txt", "w") as task_file:
-        task_file.write("\n".join([t.to_string() for t in task_list]))
+@measured("write_task")
+def write_task(store, task_index, old_task):
+    """
+    Function to save a changed task
+
+    store: TaskStore -> Tasks and users
+    task_index: int -> Position of the task in the list of tasks
+    old_task: Task -> Copy of the task from before the change
+    """
+    store.update_task(task_index, old_task)
     print("Task successfully added.")
 
-def reg_user():
+def reg_user(store):
     """
     Function to register a new user
 
+    store: TaskStore -> Tasks and users
+
     Checks for valid formatting for username and password
     Confirms password
     """
     print("Please enter a new username")
     #Checks for existing users
-    new_username = check_user(0)
+    new_username = check_user(store.users, 0)
 
     #User input new password
-    new_password = input("New Password: ")
+    new_password = ask("New Password: ")
 
     #Checks inputs don't have a ; in them
     if not check_username_and_password(new_username,new_password):
         return False
     
-    confirm_password = input("Confirm Password: ")
+    confirm_password = ask("Confirm Password: ")
 
     # Check if the new password and confirmed password are the same.
     if new_password == confirm_password:
@@ -228,32 +3444,33 @@ def reg_user():
         print("New user added")
 
         # Add to dictionary and write to file
-        username_passwords[new_username] = new_password
-        write_usernames_to_file(username_passwords)
+        store.add_user(new_username, new_password)
 
     # Otherwise you present a relevant message.
     else:
         print("Passwords do no match")
 
 
-def add_task():
+def add_task(store):
     """
     Function to allow users to add tasks for other existing users
+
+    store: TaskStore -> Tasks and users
     """
     #Checks for non-existing users
     print("Please assign the task to a user")
-    task_username = check_user()
+    task_username = check_user(store.users)
 
 
     # Get title of task and ensure safe for storage
     while True:
-        task_title = input("Title of Task: ")
+        task_title = ask("Title of Task: ")
         if validate_string(task_title):
             break
 
     # Get description of task and ensure safe for storage
     while True:
-        task_description = input("Description of Task: ")
+        task_description = ask("Description of Task: ")
         if validate_string(task_description):
             break
 
@@ -265,74 +3482,185 @@ def add_task():
     
     # Create a new Task object and append to list of tasks
     new_task = Task(task_username, task_title, task_description, due_date_time,curr_date, False)
-    task_list.append(new_task)
+    store.add_task(new_task)
+    print("Task successfully added.")
 
-    write_task()
+def render_tasks(tasks):
+    """
+    Function to format tasks the way they are shown, as one string
+    so they can be written with a single call instead of two prints per task
 
-def view_all():
+    tasks: iterable -> Of task objects
     """
-    Function is display all tasks on the system
+    return "".join([f"{task.display()}\n{SEPARATOR}\n" for task in tasks])
+
+def page_through(total, render_page, prompt):
     """
-    print("-----------------------------------")
+    Function to show a long list one page of PAGE_SIZE items at a time
+    Each page is written with a single call. n and p move to the next and previous page
+
+    total: int -> Number of items in the list
+    render_page: function -> Called with (start, stop), returns the text of the items from start up to stop
+    prompt: string -> What else can be entered on a page
+    Returns string: what was entered, other than n or p
+    """
+    page = 0
+    pages = max(1, -(-total // PAGE_SIZE))
+    while True:
+        start = page * PAGE_SIZE
+        sys.stdout.write(f"{render_page(start, min(start + PAGE_SIZE, total))}Page {page + 1} of {pages}\n")
+        sys.stdout.flush()
+
+        choice = ask(f"n - next page, p - previous page, {prompt}: ").strip().lower()
+        if choice == "n" and page + 1 < pages:
+            page += 1
+        elif choice == "p" and page > 0:
+            page -= 1
+        elif choice in ("n", "p"):
+            print("There is no such page")
+        else:
+            return choice
+
+def dump_tasks(store, file):
+    """
+    Function to write all tasks the way they are shown to a file
+    Tasks are formatted and written DUMP_CHUNK_SIZE at a time, so the whole output is never in memory
+
+    store: TaskStore -> Tasks and users
+    file: string -> name of the file, "-" for standard output
+    Returns int: the number of tasks written
+    """
+    #Iterating reads tasks without keeping them in TASK_READ_MODE "mmap"
+    tasks = iter(store.tasks)
+    dumped = 0
+    with (open(sys.stdout.fileno(), "w", closefd=False) if file == "-" else open(file, "w")) as out_file:
+        for chunk in iter(lambda: list(islice(tasks, DUMP_CHUNK_SIZE)), []):
+            out_file.write(render_tasks(chunk))
+            dumped += len(chunk)
+    return dumped
+
+def view_all(store):
+    """
+    Function is display all tasks on the system
+    Shows a page of tasks at a time, all of them can also be written to a file
 
-    if len(task_list) == 0:
+    store: TaskStore -> Tasks and users
+    """
+    if len(store.tasks) == 0:
+        print(SEPARATOR)
         print("There are no tasks.")
-        print("-----------------------------------")
+        print(SEPARATOR)
+        return
 
-    for t in task_list:
-        print(t.display())
-        print("-----------------------------------")
+    def render_page(start, stop):
+        return f"{SEPARATOR}\n{render_tasks(store.task_page(start, stop))}"
+
+    choice = page_through(len(store.tasks), render_page,
+                          "d - write all tasks to a file, any other key to go back to the menu")
+    if choice == "d":
+        file = ask("File name: ")
+        dumped = dump_tasks(store, file)
+        print(f"{dumped} tasks written to {file}")
+
+def view_due(store):
+    """
+    Function to display all overdue tasks
+    and the incomplete tasks due within a number of days
+
+    store: TaskStore -> Tasks and users
+    """
+    #Get number of days to look ahead
+    while True:
+        try:
+            days = int(ask("Show tasks due within how many days? (0 for overdue only): "))
+            if days >= 0:
+                break
+        except ValueError:
+            pass
+        print("Please enter a whole number of days")
+
+    today = date.today().toordinal()
+    task_list = store.tasks
+    due_date_index = store.due_date_index
 
-def view_mine():
+    print(SEPARATOR)
+    print(f"Overdue tasks: {due_date_index.count_overdue(today)}")
+    print(SEPARATOR)
+    for i in due_date_index.due_before(today):
+        print(task_list[i].display())
+        print(SEPARATOR)
+
+    #Tasks due from today up to the number of days given
+    if days > 0:
+        due_soon = due_date_index.due_between(today, today+days)
+        print(f"Tasks due within {days} days: {len(due_soon)}")
+        print(SEPARATOR)
+        for i in due_soon:
+            print(task_list[i].display())
+            print(SEPARATOR)
+
+def search_tasks(store):
+    """
+    Function to search the titles and descriptions of all tasks
+    Every word entered has to be in the task, or the start of a word in the task.
+    Shows the best matches first
+
+    store: TaskStore -> Tasks and users
+    """
+    query = ask("Search for: ")
+    #Only the shown tasks are sorted, the others are only counted
+    found, results = store.search_index.best_matches(query, SEARCH_RESULT_LIMIT)
+
+    print(SEPARATOR)
+    print(f"Tasks found: {found}")
+    if found > SEARCH_RESULT_LIMIT:
+        print(f"Showing the best {SEARCH_RESULT_LIMIT}")
+    print(SEPARATOR)
+    for i, score in results:
+        print(store.tasks[i].display())
+        print(SEPARATOR)
+
+def view_mine(store, curr_user):
     """
     Function to display a list of tasks assigned to current user
     Allows user to expand a chosen task for more information
     Allows user to set task as complete
     Allows user to edit assigned user or due date of task
-    """
-    print("-----------------------------------")
-    #Tag delaring if user has any tasks
-    has_task = False
 
-    #Task counter
-    task_number = 1
+    store: TaskStore -> Tasks and users
+    curr_user: string -> The user that is logged in
+    """
+    #Positions and titles of the tasks assigned to the current user
+    user_tasks = store.task_titles(curr_user)
 
-    #Declaring list that will cotain task objects of a user
-    user_tasks = []
-    
-    #Loops through all tasks in the system
-    for t in task_list:
-        #Checks if task is assigned to the current user
-        if t.username == curr_user:
-            has_task = True
-            
-            #Prints out all tasks belonging to current user
-            print(f"{task_number}: {t.title}")
-            
-            #Increase the task number
-            task_number += 1
+    #Tag delaring if user has any tasks
+    has_task = len(user_tasks) > 0
 
-            #Update the task list
-            user_tasks.append(t)
-    print("-----------------------------------")        
-    print("Please select which task to open. enter -1 to go back to the menu.")
-    
-    #User selects a task to expand
+    def render_titles(start, stop):
+        #Numbers the tasks of the current user across all pages
+        lines = [f"{number}: {title}\n" for number, (i, title) in enumerate(user_tasks[start:stop], start + 1)]
+        return f"{SEPARATOR}\n{''.join(lines)}{SEPARATOR}\n"
 
-    selection = int(input("Selection: "))
+    #User selects a task to expand, going through the pages first if there are many
+    selection = int(page_through(len(user_tasks), render_titles,
+                                 "the number of a task to open it, -1 to go back to the menu"))
     #Back out if the user wants to go back to the main menu
     if selection == -1:
         return
 
     #Expands selected task
-    curr_task = user_tasks[selection-1]
+    curr_index = user_tasks[selection-1][0]
+    curr_task = store.known_tasks[curr_index]
+
+    #Copy of the task before any changes, for updating the indexes
+    old_task = curr_task.copy()
     print(curr_task.display())
     print("-----------------------------------")
 
     #User selects if they want to mark as complete or edit the task
     print("1: Mark as complete")
     print("2: Edit incomplete task")
-    tick_edit = int(input("Selection: "))
+    tick_edit = int(ask("Selection: "))
 
     #Gets if the task is completed
     completed = curr_task.completed
@@ -341,8 +3669,8 @@ def view_mine():
     if tick_edit == 1:
         curr_task.completed = "Yes"
 
-        #Update task file
-        write_task()
+        #Update indexes and task file
+        write_task(store, curr_index, old_task)
 
         print("Task completed")
         print("-----------------------------------")
@@ -353,19 +3681,19 @@ def view_mine():
         #User selects which part of the task they want to edit
         print("1: Assigned user")
         print("2: Due date")
-        edit = int(input("Selection: "))
+        edit = int(ask("Selection: "))
 
         #User wants to edit the assigned user
         if edit == 1:
 
             #Check is user exists
-            new_user = check_user()
+            new_user = check_user(store.users)
 
             #Edit assinged user
             curr_task.username = new_user
             
-            #Update task file
-            write_task()
+            #Update indexes and task file
+            write_task(store, curr_index, old_task)
             print(f"Assigned user changed to {new_user}")
         
         #User wants to edit the due date
@@ -375,8 +3703,8 @@ def view_mine():
             due_date_edit = date_input()
             curr_task.due_date = due_date_edit
 
-            #Updates task file
-            write_task()
+            #Updates indexes and task file
+            write_task(store, curr_index, old_task)
             print(f"Due date changed to {due_date_edit}")
 
     #If user wants to edit an already completed task
@@ -395,8 +3723,12 @@ def percentage(number,total):
     number: int/float -> The subset of the set
     total: int/float -> The set
     """
+    #A user without tasks, or without incomplete tasks, has nothing to take a percentage of
+    if total == 0:
+        return 0
     return round((number/total)*100,2)
 
+@measured("write_reports")
 def writeReports(task_file,user_file,task_string,user_string):
     """
     Writes report contents into text files
@@ -417,6 +3749,55 @@ def writeReports(task_file,user_file,task_string,user_string):
         for line in user_string:
             userOverview.write(line)
 
+    if METRICS is not None:
+        METRICS.count("bytes_written", os.path.getsize(task_file) + os.path.getsize(user_file))
+
+def collect_user_stats(users,tasks,today):
+    """
+    Function to count the tasks of every user in a single pass over all tasks
+
+    users: dict -> Of users and thier passwords
+    tasks: list -> Of task objects
+    today: int -> Todays date as a date ordinal
+
+    Returns dict: username -> [tasks, completed, overdue]
+    """
+    #Counters for every registered user
+    user_stats = {user: [0, 0, 0] for user in users}
+
+    #Loops through all tasks in system once
+    for task in tasks:
+        counts = user_stats.get(task.username)
+
+        #Tasks of unregistered users are not part of the report
+        if counts is None:
+            continue
+
+        counts[0] += 1
+        #Increase counter if task is completed
+        if task.completed:
+            counts[1] += 1
+        #Incrase counter if NOT completed AND overdue
+        elif task.due_ordinal < today:
+            counts[2] += 1
+
+    return user_stats
+
+def count_user_stats(users,tasks,today):
+    """
+    Function to count the tasks of every user, with whatever the tasks are counted from
+
+    users: dict -> Of users and thier passwords
+    tasks: list/TaskColumns/SqliteStorage/ReportCache/ParallelReport -> Of task objects, or where to count them
+    today: int -> Todays date as a date ordinal
+
+    Returns dict: username -> [tasks, completed, overdue]
+    """
+    if isinstance(tasks, list):
+        return collect_user_stats(users,tasks,today)
+    return tasks.user_stats(users,today)
+
+@measured("report_info")
 def getReportInfo(users,userLen,tasks,taskLen):
     """
     Function to parse through all user and task info and generate a report
@@ -424,12 +3805,14 @@ def getReportInfo(users,userLen,tasks,taskLen):
 
     users: dict -> Of users and thier passwords
     userLen: int -> Number of users in system
-    tasks: list -> Of task objects
+    tasks: list/TaskColumns/SqliteStorage/ReportCache/ParallelReport -> Of task objects, or where to count them
     taskLen: int ->Number of tasks in system
+
+    Returns dict: username -> [tasks, completed, overdue] the report was written with
     """
 
-    #Gets todays date and converts it into a string
-    today_date = datetime.today().strftime(DATETIME_STRING_FORMAT)
+    #Gets todays date as a date ordinal
+    today = date.today().toordinal()
 
     #Header of user overview report 
     userStrings = [
@@ -441,31 +3824,30 @@ def getReportInfo(users,userLen,tasks,taskLen):
     #Counters
     total_completed = 0 #Total number of completed tasks
     total_overdue   = 0   #Total number of overdue tasks
+
+    #Counts the tasks of every user with one pass over the tasks
+    user_stats = count_user_stats(users,tasks,today)
+
+    #Rendered sections of users, only kept between reports by a ReportCache
+    sections = tasks.sections if isinstance(tasks, ReportCache) else {}
     
     #Loops through all users in system
     for user in users:
 
-        #Counters
-        user_tasks      = 0      #Number of tasks specific user has assigned
-        user_completed  = 0  #Number of tasks specific user has completed
-        user_overdue    = 0    #Number of tasks specific user has overdue
-        
-        #Loops through all tasks in system
-        for task in tasks:
-            #Increase counter if a task belongs to specific user
-            if task.username == user:
-                user_tasks += 1
-                #Increase counter if task is completed
-                if task.completed:
-                    user_completed += 1
-                #Incrase counter if NOT completed AND overdue
-                elif str(task.due_date) < today_date:
-                    user_overdue += 1
+        #Number of tasks specific user has assigned, completed and overdue
+        user_tasks, user_completed, user_overdue = user_stats[user]
 
         #Increase total counters after the user has been parsed
         total_completed += user_completed
         total_overdue   += user_overdue
 
+        #Reuses the section of a user if their numbers did not change
+        section_key = (user_tasks, user_completed, user_overdue, taskLen)
+        section = sections.get(user)
+        if section is not None and section[0] == section_key:
+            userStrings += section[1]
+            continue
+
         #Calculates the number of incompleted tasks by user
         user_incomp = user_tasks-user_completed
 
@@ -478,13 +3860,15 @@ def getReportInfo(users,userLen,tasks,taskLen):
         #List of lines containing user specific info
         #List is appended for each user.
         top_string = f"{user.title()}: INFORMATION"
-        userStrings += [
+        user_section = [
                 f"{top_string:=<40}\n",
-                f"Tasks_____________{user_tasks}/{num_tasks:<5} ({user_percent}%)\n",
+                f"Tasks_____________{user_tasks}/{taskLen:<5} ({user_percent}%)\n",
                 f"Completed_________{user_completed}/{user_tasks:<5} ({user_comp_percent}%)\n",
                 f"Incompleted_______{user_incomp}/{user_tasks:<5} ({user_incomp_percent}%)\n",
                 f"Overdue___________{user_overdue}/{user_incomp:<5} ({user_over_percent}%)\n\n"
             ]
+        sections[user] = (section_key, user_section)
+        userStrings += user_section
 
     #Calculates the number of incompleted tasks in total
     total_incompleted = taskLen-total_completed
@@ -505,104 +3889,675 @@ def getReportInfo(users,userLen,tasks,taskLen):
     #Writes both reports to both files
     writeReports('task_overview.txt','user_overview.txt',taskStrings,userStrings)
 
+    return user_stats
+
+@measured("generate_reports")
+def generate_reports(store):
+    """
+    Function to write the reports for the current tasks and users
+
+    store: TaskStore -> Tasks and users
+    """
+    tasks = store.report_tasks()
+
+    #A ParallelReport counts the tasks without loading them
+    task_count = tasks.task_count() if isinstance(tasks, ParallelReport) else len(store.tasks)
+    user_stats = getReportInfo(store.users,len(store.users),tasks,task_count)
+
+    #Remembers what the written reports are for
+    store.reported_state = store.report_state()
+
+    #Keeps the counts of today for the trend report
+    if REPORT_HISTORY:
+        record_history(REPORT_HISTORY_FILE, user_stats, date.today().toordinal())
+
+#Layout of the report history: a header, then records of a fixed size in order of the day they are for.
+#Every day has a record of all users together (user id 0), then one for every user in order of user id.
+#User n is on line n of the names file next to it. Numbers are in the byte order of the machine
+HISTORY_MAGIC = b"TMHIST1" + sys.byteorder[0].encode()
+HISTORY_RECORD = struct.Struct("=IIIII")
+
+def history_names_file_name(file):
+    """
+    Returns the name of the file with the usernames of a report history
+
+    file: string -> name of the report history
+    """
+    return file + ".users"
+
+class ReportHistory:
+    """
+    Counts of tasks of every user on the days reports were generated, read from a report history file
+    The records have a fixed size and are in order of the day, so the records of a range of days
+    are found with a binary search and read in one go, without counting any tasks.
+    """
+    def __init__(self, file = REPORT_HISTORY_FILE):
+        '''
+        Inputs:
+        file: String -> name of the report history
+        '''
+        self.file = file
+        self.user_ids = {}
+        names_file = history_names_file_name(file)
+        if os.path.exists(names_file):
+            with open(names_file, "r") as in_file:
+                for user_id, line in enumerate(in_file, 1):
+                    self.user_ids[line.rstrip("\n")] = user_id
+
+        self.data = b""
+        if os.path.exists(file) and os.path.getsize(file) > 0:
+            with open(file, "rb") as history_file:
+                self.data = mmap.mmap(history_file.fileno(), 0, access=mmap.ACCESS_READ)
+            if self.data[:len(HISTORY_MAGIC)] != HISTORY_MAGIC:
+                raise ValueError(f"{file} is not a report history of this program")
+        #A record that was not fully written is left out
+        self.count = max(0, len(self.data) - len(HISTORY_MAGIC)) // HISTORY_RECORD.size
+
+    def close(self):
+        '''
+        Unmaps the file
+        '''
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.data = b""
+
+    def offset(self, position):
+        '''
+        Returns where the record at a position starts in the file
+        '''
+        return len(HISTORY_MAGIC) + position * HISTORY_RECORD.size
+
+    def day(self, position):
+        '''
+        Returns the date ordinal of the record at a position
+        '''
+        return HISTORY_RECORD.unpack_from(self.data, self.offset(position))[0]
+
+    def last_day(self):
+        '''
+        Returns the date ordinal of the last recorded day, None if nothing is recorded
+        '''
+        return self.day(self.count - 1) if self.count else None
+
+    def find(self, day):
+        '''
+        Returns the position of the first record for day or a later day, with a binary search
+        '''
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.day(middle) < day:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def records(self, user_id, first_day, last_day):
+        '''
+        Returns (day, tasks, completed, overdue) of a user id for every recorded day from first_day to last_day
+        Only the records of those days are read, NumPy picks out the user's records if it is installed
+        '''
+        start = self.offset(self.find(first_day))
+        stop = self.offset(self.find(last_day + 1))
+        if start == stop:
+            return []
+
+        np = optional_numpy()
+        if np is not None:
+            rows = np.frombuffer(self.data, dtype=np.uint32, count=(stop - start) // 4, offset=start).reshape(-1, 5)
+            rows = rows[rows[:, 1] == user_id]
+            return [(day, tasks, completed, overdue) for day, user, tasks, completed, overdue in rows.tolist()]
+        return [(day, tasks, completed, overdue)
+                for day, user, tasks, completed, overdue in HISTORY_RECORD.iter_unpack(self.data[start:stop])
+                if user == user_id]
+
+    def user_trend(self, username, days, today):
+        '''
+        Returns (day, tasks, completed, overdue) of a user for every recorded day of the last days days
+        '''
+        user_id = self.user_ids.get(username)
+        if user_id is None:
+            return []
+        return self.records(user_id, today - days + 1, today)
+
+    def overall_trend(self, days, today):
+        '''
+        Returns (day, tasks, completed, overdue) of all users together for every recorded day of the last days days
+        '''
+        return self.records(0, today - days + 1, today)
+
+@measured("record_history")
+def record_history(file, user_stats, day):
+    """
+    Function to add the counts of every user on a day to the end of a report history
+    Counts recorded earlier on the same day are replaced, so every day keeps its last counts
+
+    file: string -> name of the report history
+    user_stats: dict -> username -> [tasks, completed, overdue], see collect_user_stats
+    day: int -> Date ordinal the counts are for
+    """
+    history = ReportHistory(file)
+    last_day = history.last_day()
+    if last_day is not None and day < last_day:
+        print(f"The report history already has {date.fromordinal(last_day)}, counts for an earlier day are not added")
+        history.close()
+        return
+
+    #Users that are not in the history yet get the next user ids
+    new_users = [user for user in user_stats if user not in history.user_ids]
+    if new_users:
+        with open(history_names_file_name(file), "a") as names_file:
+            names_file.write("".join(f"{user}\n" for user in new_users))
+        for user in new_users:
+            history.user_ids[user] = len(history.user_ids) + 1
+
+    totals = [sum(counts[i] for counts in user_stats.values()) for i in range(3)]
+    rows = sorted((history.user_ids[user], *counts) for user, counts in user_stats.items())
+    records = b"".join([HISTORY_RECORD.pack(day, 0, *totals)] + [HISTORY_RECORD.pack(day, *row) for row in rows])
+
+    #Drops the records of the same day, and a record that was not fully written
+    exists = len(history.data) > 0
+    end = history.offset(history.find(day))
+    history.close()
+    if exists:
+        os.truncate(file, end)
+    with open(file, "ab") as history_file:
+        history_file.write(records if exists else HISTORY_MAGIC + records)
+        history_file.flush()
+        os.fsync(history_file.fileno())
+    if METRICS is not None:
+        METRICS.count("bytes_written", len(records))
+
+def record_report_history(store):
+    """
+    Function to add todays counts of every user to the report history without writing the reports,
+    e.g. once a day from a scheduled job
+
+    store: TaskStore -> Tasks and users
+    """
+    today = date.today().toordinal()
+    user_stats = count_user_stats(store.users, store.report_tasks(), today)
+    record_history(REPORT_HISTORY_FILE, user_stats, today)
+
+def trend_lines(history, username, days, today):
+    """
+    Function to make the lines of the trend report from the report history
+    For a user it shows the share of their tasks that were completed on every recorded day,
+    for all users together the number of overdue tasks
+
+    history: ReportHistory -> Recorded counts
+    username: string -> User to show, None for all users together
+    days: int -> Number of days up to today to show
+    today: int -> Todays date as a date ordinal
+
+    Returns list: of lines
+    """
+    if username is None:
+        rows = history.overall_trend(days, today)
+        lines = [f"{f'OVERDUE TASKS, LAST {days} DAYS':=<40}\n"]
+        for day, tasks, completed, overdue in rows:
+            incomplete = tasks - completed
+            lines.append(f"{date.fromordinal(day)}  {overdue:>6}/{incomplete:<6} ({percentage(overdue,incomplete)}%)\n")
+    else:
+        rows = history.user_trend(username, days, today)
+        lines = [f"{f'{username.title()}: COMPLETION, LAST {days} DAYS':=<40}\n"]
+        for day, tasks, completed, overdue in rows:
+            lines.append(f"{date.fromordinal(day)}  {completed:>6}/{tasks:<6} ({percentage(completed,tasks)}%)"
+                         f"  overdue {overdue}\n")
+
+    if not rows:
+        lines.append("Nothing recorded for these days yet, reports record the counts of the day they are generated\n")
+    return lines
+
+def show_trends(store):
+    """
+    Function to show the trend report of a user or of all users together
+
+    store: TaskStore -> Tasks and users
+    """
+    username = ask("Username (leave empty for all users): ").strip() or None
+    if username is not None and username not in store.users:
+        print("User does not exist")
+        return
+
+    days = ask(f"Number of days ({TREND_DAYS}): ").strip()
+    if days != "" and (not days.isdigit() or int(days) == 0):
+        print("Please enter a number of days")
+        return
+
+    history = ReportHistory()
+    sys.stdout.write("".join(trend_lines(history, username, int(days or TREND_DAYS), date.today().toordinal())))
+    history.close()
+
+def display_statistics(store):
+    """
+    Function to display the task or user report
+    Writes the reports first if they are missing or out of date
+
+    store: TaskStore -> Tasks and users
+    """
+    # If no overview files, generates it
+    if not os.path.exists('task_overview.txt') or not os.path.exists('user_overview.txt'):
+        print("Report not found. Generating...")
+        generate_reports(store)
+
+    # If tasks or users changed since the reports were written, updates them
+    elif store.reported_state != store.report_state():
+        generate_reports(store)
+
+    #Get user selection for type of report
+    print("Which report would you like to see?")
+    print("1: Task overview")
+    print("2: User overview")
+    selection = int(ask("Selection: "))
+
+    #User wants to see task report
+    if selection == 1:
+        #Open task overview file and print each line
+        with open('task_overview.txt','r') as taskOverview:
+            for line in taskOverview:
+                print(line)
+    
+    #User wants to see user report
+    elif selection == 2:
+        #Open user overview file and print each line
+        with open('user_overview.txt','r') as userOverview:
+            for line in userOverview:
+                print(line)
+
+
+#########################
+# Command line tools
+#########################
+
+#Fields of a task row in CSV and JSONL files
+TASK_FIELDS = ["username", "title", "description", "due_date", "assigned_date", "completed"]
+
+def guess_file_format(file, file_format):
+    """
+    Returns the format of a file, from the file extension if no format is given
+
+    file: string -> name of the file
+    file_format: string -> "csv", "jsonl" or None
+    """
+    if file_format is not None:
+        return file_format
+    return "jsonl" if file.endswith((".jsonl", ".json")) else "csv"
+
+def read_rows(file, file_format):
+    """
+    Generator that reads a CSV file with a header row or a JSONL file one row at a time
+    Yields a dict of field name -> value for every row, or a ValueError saying what is wrong
+    with a JSONL line that is not a JSON object, so the import can skip it and go on
+
+    file: string -> name of the file, "-" for standard input
+    file_format: string -> "csv" or "jsonl"
+    """
+    with (open(sys.stdin.fileno(), "r", closefd=False) if file == "-" else open(file, "r", newline="")) as in_file:
+        if file_format == "jsonl":
+            for line in in_file:
+                if line.strip() == "":
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError as error:
+                    yield ValueError(f"not valid JSON ({error})")
+                    continue
+                if isinstance(row, dict):
+                    yield row
+                else:
+                    yield ValueError(f"not a JSON object ({type(row).__name__})")
+        else:
+            yield from csv.DictReader(in_file)
+
+def parse_completed(value):
+    """
+    Converts the completed field of an imported row into a boolean
+    Missing values count as not completed
+    """
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("yes", "true", "1")
+
+def import_tasks(storage, file, file_format):
+    """
+    Function to import tasks from a CSV or JSONL file
+    Rows are checked one at a time with the same rules as add_task,
+    rows that break the rules are skipped. All tasks are saved in one go at the end.
+
+    storage: TextStorage/SqliteStorage/WriteBehindStorage -> Storage to import into
+    file: string -> name of the file, "-" for standard input
+    file_format: string -> "csv" or "jsonl"
+    """
+    start = time.perf_counter()
+    store = TaskStore(storage)
+    users = store.users
+    new_tasks = []
+    skipped = 0
+    today = date.today().toordinal()
+
+    for row_number, row in enumerate(read_rows(file, file_format), 1):
+        if isinstance(row, ValueError):
+            print(f"Row {row_number}: skipped, {row}")
+            skipped += 1
+            continue
+        try:
+            username = row["username"]
+            title = row["title"]
+            description = row["description"]
+            if not all(isinstance(value, str) for value in (username, title, description)):
+                raise TypeError("username, title and description must be text")
+            due_ordinal = parse_date_ordinal(row["due_date"])
+            assigned_date = row.get("assigned_date")
+            assigned_ordinal = parse_date_ordinal(assigned_date) if assigned_date else today
+        except (KeyError, TypeError, ValueError) as error:
+            print(f"Row {row_number}: skipped, missing or invalid field ({error})")
+            skipped += 1
+            continue
+
+        if username not in users:
+            print(f"Row {row_number}: skipped, user {username} does not exist")
+            skipped += 1
+            continue
+        if not validate_string(title) or not validate_string(description):
+            print(f"Row {row_number}: skipped")
+            skipped += 1
+            continue
+
+        new_task = Task(sys.intern(username), title, description, None, None, parse_completed(row.get("completed")))
+        new_task.due_ordinal = due_ordinal
+        new_task.assigned_ordinal = assigned_ordinal
+        new_tasks.append(new_task)
+
+    if new_tasks:
+        store.add_tasks(new_tasks)
+    store.close()
+
+    imported = len(new_tasks)
+    seconds = time.perf_counter() - start
+    print(f"Imported {imported} tasks, skipped {skipped} rows in {seconds:.2f} seconds "
+          f"({(imported+skipped)/max(seconds, 1e-9):.0f} rows/sec)")
+
+def import_users(storage, file, file_format):
+    """
+    Function to import users from a CSV or JSONL file with username and password fields
+    Rows are checked one at a time with the same rules as reg_user,
+    rows that break the rules or name an existing user are skipped.
+    All users are saved in one go at the end.
+
+    storage: TextStorage/SqliteStorage/WriteBehindStorage -> Storage to import into
+    file: string -> name of the file, "-" for standard input
+    file_format: string -> "csv" or "jsonl"
+    """
+    start = time.perf_counter()
+    #Only the users are read and written, the tasks are never loaded
+    users = storage.load_users()
+    new_users = []
+    skipped = 0
+
+    for row_number, row in enumerate(read_rows(file, file_format), 1):
+        if isinstance(row, ValueError):
+            print(f"Row {row_number}: skipped, {row}")
+            skipped += 1
+            continue
+        try:
+            username = row["username"]
+            password = row["password"]
+            if not isinstance(username, str) or not isinstance(password, str):
+                raise TypeError("username and password must be text")
+        except (KeyError, TypeError) as error:
+            print(f"Row {row_number}: skipped, missing or invalid field ({error})")
+            skipped += 1
+            continue
+
+        if username in users:
+            print(f"Row {row_number}: skipped, user {username} already exists")
+            skipped += 1
+            continue
+        if username == "" or not check_username_and_password(username, password):
+            print(f"Row {row_number}: skipped")
+            skipped += 1
+            continue
+
+        users[username] = password
+        new_users.append(username)
+
+    if new_users:
+        storage.save_users(new_users, users)
+    storage.close(None)
+
+    seconds = time.perf_counter() - start
+    print(f"Imported {len(new_users)} users, skipped {skipped} rows in {seconds:.2f} seconds "
+          f"({(len(new_users)+skipped)/max(seconds, 1e-9):.0f} rows/sec)")
+
+def export_tasks(storage, file, file_format):
+    """
+    Function to export all tasks to a CSV or JSONL file
+    Tasks are written one at a time as they are read
+
+    storage: TextStorage/SqliteStorage/WriteBehindStorage -> Storage to export from
+    file: string -> name of the file, "-" for standard output
+    file_format: string -> "csv" or "jsonl"
+    """
+    start = time.perf_counter()
+    exported = 0
+
+    with (open(sys.stdout.fileno(), "w", closefd=False) if file == "-" else open(file, "w", newline="")) as out_file:
+        if file_format == "csv":
+            writer = csv.writer(out_file)
+            writer.writerow(TASK_FIELDS)
+
+        for task in storage.stream_tasks():
+            values = [
+                task.username,
+                task.title,
+                task.description,
+                format_date_ordinal(task.due_ordinal),
+                format_date_ordinal(task.assigned_ordinal),
+                "Yes" if task.completed else "No"
+            ]
+            if file_format == "csv":
+                writer.writerow(values)
+            else:
+                values[5] = bool(task.completed)
+                out_file.write(json.dumps(dict(zip(TASK_FIELDS, values))) + "\n")
+            exported += 1
+
+    seconds = time.perf_counter() - start
+    print(f"Exported {exported} tasks in {seconds:.2f} seconds ({exported/max(seconds, 1e-9):.0f} rows/sec)",
+          file=sys.stderr)
+
+def command_parser():
+    """
+    Returns the parser for the command line tools
+    """
+    parser = argparse.ArgumentParser(description="Task manager tools")
+    parser.add_argument("--storage", choices=["text", "sqlite", "sharded"], default=STORAGE_BACKEND,
+                        help="storage to use (default: %(default)s)")
+    parser.add_argument("--metrics", help=f"record latencies and counters and write them to this file at exit, "
+                                          f"Prometheus text for .prom files, JSON otherwise (or set {METRICS_ENV})")
+    parser.add_argument("--profile", help=f"run this menu action under cProfile, like va or view_all (or set {PROFILE_ENV})")
+    #Without a command the interactive program runs
+    commands = parser.add_subparsers(dest="command")
+
+    to_sqlite = commands.add_parser("to-sqlite", help="copy tasks.txt and user.txt into an SQLite database")
+    to_sqlite.add_argument("--database", default=DATABASE_FILE)
+    to_text = commands.add_parser("to-text", help="copy an SQLite database into tasks.txt and user.txt")
+    to_text.add_argument("--database", default=DATABASE_FILE)
+    to_shards = commands.add_parser("to-shards", help="split tasks.txt into one file per user")
+    to_shards.add_argument("--shards", default=TASK_SHARD_DIR, help="folder of the shard files")
+    from_shards = commands.add_parser("from-shards", help="join the shard files back into tasks.txt")
+    from_shards.add_argument("--shards", default=TASK_SHARD_DIR, help="folder of the shard files")
+
+    for name, help_text in [
+        ("import-tasks", "import tasks from a CSV or JSONL file"),
+        ("import-users", "import users from a CSV or JSONL file"),
+        ("export-tasks", "export all tasks to a CSV or JSONL file"),
+    ]:
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("file", help='file name, "-" for standard input/output')
+        command.add_argument("--format", choices=["csv", "jsonl"],
+                             help="file format (default: from the file extension, otherwise csv)")
+
+    dump = commands.add_parser("dump-tasks", help="write all tasks the way view all shows them to a file")
+    dump.add_argument("file", help='file name, "-" for standard output')
+
+    commands.add_parser("record-history", help="add todays counts of every user to the report history")
+    trend = commands.add_parser("trend", help="show the completion rate of a user, or overdue tasks of all users, per day")
+    trend.add_argument("--user", help="user to show (default: all users together)")
+    trend.add_argument("--days", type=int, default=TREND_DAYS, help="number of days up to today (default: %(default)s)")
+    return parser
+
+def run_command(args):
+    """
+    Function to run a command line tool
+
+    args: argparse.Namespace -> Parsed command line, see command_parser
+    """
+    if args.command == "to-sqlite":
+        copy_storage(TextStorage(), SqliteStorage(args.database))
+    elif args.command == "to-text":
+        copy_storage(SqliteStorage(args.database), TextStorage())
+    elif args.command == "to-shards":
+        copy_storage(TextStorage(), ShardedStorage(args.shards))
+    elif args.command == "from-shards":
+        copy_storage(ShardedStorage(args.shards), TextStorage())
+    elif args.command == "dump-tasks":
+        dump_tasks(TaskStore(open_storage(args.storage)), args.file)
+    elif args.command == "record-history":
+        record_report_history(TaskStore(open_storage(args.storage)))
+    elif args.command == "trend":
+        history = ReportHistory()
+        sys.stdout.write("".join(trend_lines(history, args.user, args.days, date.today().toordinal())))
+        history.close()
+    else:
+        storage = open_storage(args.storage)
+        fmt = guess_file_format(args.file, args.format)
+        if args.command == "import-tasks":
+            import_tasks(storage, args.file, fmt)
+        elif args.command == "import-users":
+            import_users(storage, args.file, fmt)
+        elif args.command == "export-tasks":
+            export_tasks(storage, args.file, fmt)
+
 
 #########################
 # Main Program
-######################### 
+#########################
 
-#Read tasks and generate a list of tasks
-task_list = readTasks("tasks.txt")
+#Names of the menu options, for the metrics and --profile
+MENU_ACTIONS = {
+    "r": "register_user",
+    "a": "add_task",
+    "va": "view_all",
+    "vm": "view_mine",
+    "od": "view_due",
+    "s": "search_tasks",
+    "gr": "generate_reports",
+    "ds": "display_statistics",
+    "tr": "show_trends",
+    "e": "exit",
+}
 
-#Read users and passwords and generates a dict
-username_passwords = readUsers("user.txt")
+def main():
+    """
+    Runs a command line tool if one is given,
+    otherwise logs in and runs the interactive menu
+    """
+    args = command_parser().parse_args()
+    start_metrics(args.metrics, args.profile)
 
-#Login until valid
-curr_user = login(username_passwords)
+    #Command line tools, run instead of the interactive program
+    if args.command is not None:
+        with measure_action("command", args.command):
+            run_command(args)
+        return
 
-#The number of users in the system
-num_users = len(username_passwords.keys())
+    #Tasks and users, loaded when first used
+    store = TaskStore()
 
-#The number of tasks in the system
-num_tasks = len(task_list)
+    #Login until valid
+    curr_user = login(store.users)
 
-while True:
-    # Get input from user
-    print()
-    if curr_user == 'admin':
-        menu = input('''Select one of the following Options below:
+    while True:
+        # Get input from user
+        print()
+        if curr_user == 'admin':
+            menu = ask('''Select one of the following Options below:
     r - Registering a user
     a - Adding a task
     va - View all tasks
     vm - view my task
+    od - view overdue tasks
+    s - search tasks
     gr - generate reports
     ds - display statistics
+    tr - trend report
     e - Exit
     : ''').lower()
-    else:
-        menu = input('''Select one of the following Options below:
+        else:
+            menu = ask('''Select one of the following Options below:
     r - Registering a user
     a - Adding a task
     va - View all tasks
     vm - view my task
+    od - view overdue tasks
+    s - search tasks
     e - Exit
     : ''').lower()
 
-    if menu == 'r': # Register new user (if admin)
-        # Request input of a new username
-        if curr_user != 'admin':
-            print("Registering new users requires admin privileges")
-            continue
-        
-        #If user registration invalid, go back to menu
-        if not reg_user():
-            continue
+        #Times the action while instrumentation is on
+        with measure_action("menu", MENU_ACTIONS.get(menu, "unknown")):
+            #Picks up changes saved by other processes while waiting for input
+            store.sync()
 
-    elif menu == 'a': # Add a new task
-        #If added task is invalid, go back to menu
-        if not add_task():
-            continue
+            if menu == 'r': # Register new user (if admin)
+                # Request input of a new username
+                if curr_user != 'admin':
+                    print("Registering new users requires admin privileges")
+                    continue
+            
+                #If user registration invalid, go back to menu
+                if not reg_user(store):
+                    continue
 
+            elif menu == 'a': # Add a new task
+                #If added task is invalid, go back to menu
+                if not add_task(store):
+                    continue
 
-    elif menu == 'va': # View all tasks
-        view_all()
 
-    elif menu == 'vm': # View my tasks
-        view_mine()
+            elif menu == 'va': # View all tasks
+                view_all(store)
 
-    elif menu == 'gr':
-        #Generates task and user report text files
-        getReportInfo(username_passwords,num_users,task_list,num_tasks)
+            elif menu == 'vm': # View my tasks
+                view_mine(store, curr_user)
 
-    elif menu == 'ds' and curr_user == 'admin': # If admin, display statistics
+            elif menu == 'od': # View overdue tasks and tasks due soon
+                view_due(store)
 
-        # If no overview files, generates it
-        if not os.path.exists('task_overview.txt') or not os.path.exists('user_overview.txt'):
-            print("Report not found. Generating...")
-            getReportInfo(username_passwords,num_users,task_list,num_tasks)       
+            elif menu == 's': # Search titles and descriptions
+                search_tasks(store)
 
-        #Get user selection for type of report
-        print("Which report would you like to see?")
-        print("1: Task overview")
-        print("2: User overview")
-        selection = int(input("Selection: "))
+            elif menu == 'gr':
+                #Generates task and user report text files
+                generate_reports(store)
 
-        #User wants to see task report
-        if selection == 1:
-            #Open task overview file and print each line
-            with open('task_overview.txt','r') as taskOverview:
-                for line in taskOverview:
-                    print(line)
-        
-        #User wants to see user report
-        elif selection == 2:
-            #Open user overview file and print each line
-            with open('user_overview.txt','r') as userOverview:
-                for line in userOverview:
-                    print(line)
-
-    elif menu == 'e': # Exit program
-        print('Goodbye!!!')
-        exit()
-
-    else: # Default case
-        print("You have made a wrong choice, Please Try again")
\ No newline at end of file
+            elif menu == 'ds' and curr_user == 'admin': # If admin, display statistics
+                display_statistics(store)
+
+            elif menu == 'tr' and curr_user == 'admin': # If admin, show completion and overdue trends
+                show_trends(store)
+
+            elif menu == 'e': # Exit program
+                #Finishes any pending storage work, like merging the journal into tasks.txt
+                store.close()
+                print('Goodbye!!!')
+                exit()
+
+            else: # Default case
+                print("You have made a wrong choice, Please Try again")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Checks that importing tasks and users skips broken rows and goes on with the rest
+
+Run with: python -m pytest tests  (or python -m unittest discover tests)
+"""
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import task_manager
+from task_manager import TextStorage, WriteBehindStorage, file_stamp, import_tasks, import_users, read_rows, readTasks, readUsers
+
+JSONL_TASKS = """{"username": "bob", "title": "one", "description": "first", "due_date": "2026-11-01"}
+{"username": "bob", "title": "two",
+
+[1, 2]
+"just text"
+{"username": "ghost", "title": "three", "description": "third", "due_date": "2026-11-01"}
+{"username": "bob", "title": "four", "description": "fourth", "due_date": "2026-11-02", "completed": true}
+"""
+
+class ImportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.task_file = os.path.join(self.directory, "tasks.txt")
+        self.user_file = os.path.join(self.directory, "user.txt")
+        with open(self.task_file, "w"):
+            pass
+        with open(self.user_file, "w") as user_file:
+            user_file.write("admin;adm1n\nbob;pw")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, content):
+        file = os.path.join(self.directory, name)
+        with open(file, "w") as out_file:
+            out_file.write(content)
+        return file
+
+    def run_import(self, function, file):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            function(TextStorage(self.task_file, self.user_file, "journal"), file, "jsonl")
+        return output.getvalue()
+
+    def test_read_rows(self):
+        rows = list(read_rows(self.write("tasks.jsonl", JSONL_TASKS), "jsonl"))
+        self.assertEqual(len(rows), 6)
+        self.assertIsInstance(rows[0], dict)
+        for row in rows[1:4]:
+            self.assertIsInstance(row, ValueError)
+        self.assertIn("not valid JSON", str(rows[1]))
+        self.assertIn("not a JSON object", str(rows[2]))
+
+    def test_import_tasks(self):
+        output = self.run_import(import_tasks, self.write("tasks.jsonl", JSONL_TASKS))
+        self.assertIn("Imported 2 tasks, skipped 4 rows", output)
+        self.assertIn("Row 2: skipped, not valid JSON", output)
+        self.assertIn("Row 3: skipped, not a JSON object (list)", output)
+        self.assertEqual([(task.title, task.completed) for task in readTasks(self.task_file)],
+                         [("one", False), ("four", True)])
+
+    def test_import_users(self):
+        file = self.write("users.jsonl", '{"username": "carol", "password": "pw"}\n{"username"\n["dave"]\n')
+        output = self.run_import(import_users, file)
+        self.assertIn("Imported 1 users, skipped 2 rows", output)
+        self.assertIn("carol", readUsers(self.user_file))
+
+    def test_import_users_leaves_tasks(self):
+        with open(self.task_file, "w") as task_file:
+            task_file.write("bob;Task;Description;2026-11-01;2026-10-01;No")
+        stamp = file_stamp(self.task_file)
+        file = self.write("users.jsonl", '{"username": "carol", "password": "pw"}\n')
+        #Reading a task would fail, the import must not need them
+        with mock.patch.object(task_manager, "readTasks", side_effect=AssertionError("tasks were read")):
+            self.run_import(import_users, file)
+            #Through the batched writes as well
+            with contextlib.redirect_stdout(io.StringIO()):
+                import_users(WriteBehindStorage(TextStorage(self.task_file, self.user_file, "journal")),
+                             self.write("more.jsonl", '{"username": "dave", "password": "pw"}\n'), "jsonl")
+        self.assertEqual(file_stamp(self.task_file), stamp)
+        self.assertEqual(list(readUsers(self.user_file)), ["admin", "bob", "carol", "dave"])
+
+if __name__ == "__main__":
+    unittest.main()
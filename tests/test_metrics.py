@@ -0,0 +1,48 @@
+"""
+Checks that the time spent waiting at a prompt is left out of the latencies
+
+Run with: python -m pytest tests  (or python -m unittest discover tests)
+"""
+import os
+import sys
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import task_manager
+from task_manager import Metrics, ask
+
+def slow_input(prompt = ""):
+    """
+    A user that takes a while to answer
+    """
+    time.sleep(0.05)
+    return "answer"
+
+class AskTest(unittest.TestCase):
+
+    def test_without_metrics(self):
+        with mock.patch.object(task_manager, "METRICS", None), mock.patch("builtins.input", return_value="answer") as user:
+            self.assertEqual(ask("Prompt: "), "answer")
+        user.assert_called_once_with("Prompt: ")
+
+    def test_waiting_left_out(self):
+        metrics = Metrics()
+        with mock.patch.object(task_manager, "METRICS", metrics), mock.patch("builtins.input", slow_input):
+            with metrics.timer("menu.test"):
+                self.assertEqual(ask("Prompt: "), "answer")
+        count, total, largest, buckets = metrics.latencies["menu.test"]
+        self.assertEqual(count, 1)
+        self.assertLess(total, 0.04)
+        self.assertGreaterEqual(metrics.waiting, 0.05)
+
+    def test_input_not_replaced(self):
+        with mock.patch.object(task_manager, "METRICS", None), mock.patch("atexit.register"):
+            task_manager.start_metrics("metrics.json")
+            self.assertFalse(hasattr(task_manager, "input"))
+            self.assertIsNotNone(task_manager.METRICS)
+
+if __name__ == "__main__":
+    unittest.main()
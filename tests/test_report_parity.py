@@ -0,0 +1,116 @@
+"""
+Checks that every way of counting the tasks for the reports gives the same counts
+as the per-user loop getReportInfo used to run
+
+Run with: python -m pytest tests  (or python -m unittest discover tests)
+"""
+import os
+import random
+import sys
+import unittest
+from datetime import date, timedelta
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import task_manager
+from task_manager import Task, TaskColumns, DueDateIndex, ReportCache, collect_user_stats
+
+TODAY = date(2026, 10, 18)
+
+def original_user_stats(users, tasks, today):
+    """
+    The per-user counts as getReportInfo used to count them, one loop over all tasks for every user
+    """
+    user_stats = {}
+    for user in users:
+        counts = [0, 0, 0]
+        for task in tasks:
+            if task.username == user:
+                counts[0] += 1
+                if task.completed:
+                    counts[1] += 1
+                elif task.due_ordinal < today:
+                    counts[2] += 1
+        user_stats[user] = counts
+    return user_stats
+
+def make_task(username, due_in, completed):
+    """
+    Returns a task of username due due_in days after TODAY
+    """
+    return Task(username, "title", "description", TODAY + timedelta(days=due_in), TODAY - timedelta(days=30), completed)
+
+class ReportParityTest(unittest.TestCase):
+
+    def setUp(self):
+        self.users = {"admin": "password", "bob": "pw", "carol": "pw", "idle": "pw"}
+        self.tasks = [
+            #Due today is not overdue yet
+            make_task("bob", 0, False),
+            make_task("bob", -1, False),
+            #Completed tasks past their due date are not overdue
+            make_task("bob", -5, True),
+            make_task("carol", 3, True),
+            make_task("carol", -40, True),
+            make_task("carol", 10, False),
+            make_task("admin", -1, False),
+            #Tasks of users that are not registered are not counted
+            make_task("ghost", -1, False),
+        ]
+        #"idle" has no tasks at all
+
+        rng = random.Random(4)
+        for i in range(2000):
+            username = rng.choice(["admin", "bob", "carol", "ghost"])
+            self.tasks.append(make_task(username, rng.randint(-60, 60), rng.random() < 0.4))
+
+    def expected(self, tasks = None):
+        return original_user_stats(self.users, self.tasks if tasks is None else tasks, TODAY.toordinal())
+
+    def test_edge_cases(self):
+        counts = original_user_stats(self.users, self.tasks[:8], TODAY.toordinal())
+        self.assertEqual(counts["bob"], [3, 1, 1])
+        self.assertEqual(counts["carol"], [3, 2, 0])
+        self.assertEqual(counts["admin"], [1, 0, 1])
+        self.assertEqual(counts["idle"], [0, 0, 0])
+        self.assertEqual(collect_user_stats(self.users, self.tasks[:8], TODAY.toordinal()), counts)
+
+    def test_single_pass(self):
+        self.assertEqual(collect_user_stats(self.users, self.tasks, TODAY.toordinal()), self.expected())
+
+    @unittest.skipIf(task_manager.optional_numpy() is None, "NumPy is not installed")
+    def test_columns_numpy(self):
+        columns = TaskColumns(self.tasks)
+        self.assertEqual(columns.user_stats(self.users, TODAY.toordinal()), self.expected())
+
+    def test_columns_without_numpy(self):
+        columns = TaskColumns(self.tasks)
+        with mock.patch.object(task_manager, "optional_numpy", lambda: None):
+            self.assertEqual(columns.user_stats(self.users, TODAY.toordinal()), self.expected())
+
+    def test_columns_after_changes(self):
+        columns = TaskColumns(self.tasks)
+        tasks = list(self.tasks)
+        for index in (0, 3, 7):
+            old_task = tasks[index]
+            tasks[index] = make_task("idle", -2, False)
+            columns.update(index, old_task, tasks[index])
+        tasks.append(make_task("idle", 1, True))
+        columns.add(len(tasks) - 1, tasks[-1])
+
+        expected = self.expected(tasks)
+        with mock.patch.object(task_manager, "optional_numpy", lambda: None):
+            self.assertEqual(columns.user_stats(self.users, TODAY.toordinal()), expected)
+        self.assertEqual(columns.user_stats(self.users, TODAY.toordinal()), expected)
+
+    def test_report_cache(self):
+        cache = ReportCache(self.tasks, DueDateIndex(self.tasks), TODAY.toordinal())
+        self.assertEqual(cache.user_stats(self.users, TODAY.toordinal()), self.expected())
+
+        #A day later tasks due today are overdue
+        tomorrow = TODAY.toordinal() + 1
+        self.assertEqual(cache.user_stats(self.users, tomorrow), original_user_stats(self.users, self.tasks, tomorrow))
+
+if __name__ == "__main__":
+    unittest.main()
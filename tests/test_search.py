@@ -0,0 +1,51 @@
+"""
+Checks that a saved search index is only used for the tasks it was built from
+
+Run with: python -m pytest tests  (or python -m unittest discover tests)
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from task_manager import SearchIndex, Task, TextStorage, append_journal, search_index_file_name
+
+class SavedSearchIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.task_file = os.path.join(self.directory, "tasks.txt")
+        self.tasks = [Task("bob", f"Report {i}", "Write the report", date(2026, 11, 1), date(2026, 10, 1), False)
+                      for i in range(10)]
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_no_tasks_file(self):
+        #Nothing to stamp the index with, so it is not saved
+        SearchIndex(self.tasks).save(self.task_file)
+        self.assertFalse(os.path.exists(search_index_file_name(self.task_file)))
+        self.assertIsNone(SearchIndex.load(self.task_file, len(self.tasks)))
+
+    def test_saved_for_tasks_and_journal(self):
+        TextStorage(self.task_file, os.path.join(self.directory, "user.txt")).replace_all(self.tasks, {"admin": "pw"})
+        SearchIndex(self.tasks).save(self.task_file)
+        loaded = SearchIndex.load(self.task_file, len(self.tasks))
+        self.assertEqual(loaded.search("report"), SearchIndex(self.tasks).search("report"))
+
+        #A change in the journal makes the saved index out of date
+        self.tasks[3].title = "Meeting"
+        append_journal(self.task_file, [3], self.tasks)
+        self.assertIsNone(SearchIndex.load(self.task_file, len(self.tasks)))
+
+        #Saved again with the journal, it is used
+        SearchIndex(self.tasks).save(self.task_file)
+        loaded = SearchIndex.load(self.task_file, len(self.tasks))
+        self.assertEqual(loaded.search("meeting"), SearchIndex(self.tasks).search("meeting"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+"""
+Checks that the server answers every request with a response, also broken ones
+
+Run with: python -m pytest tests  (or python -m unittest discover tests)
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from task_manager import TaskStore, TextStorage
+from server import TaskServer
+
+class TaskServerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        task_file = os.path.join(self.directory, "tasks.txt")
+        user_file = os.path.join(self.directory, "user.txt")
+        with open(task_file, "w"):
+            pass
+        with open(user_file, "w") as out_file:
+            out_file.write("admin;adm1n\nbob;pw")
+        self.store = TaskStore(TextStorage(task_file, user_file, "journal"))
+        self.server = TaskServer(self.store)
+        self.session = {"user": None}
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.directory)
+
+    def handle(self, request):
+        return self.server.handle(self.session, request if isinstance(request, bytes) else json.dumps(request).encode())
+
+    def test_login(self):
+        self.assertEqual(self.handle({"action": "login", "username": "admin", "password": "adm1n"}),
+                         {"user": "admin", "ok": True})
+        self.assertEqual(self.session["user"], "admin")
+
+    def test_broken_requests(self):
+        for request in ([1], "login", 5, None, b"{not json", {"action": "login"}, {"action": "login", "username": [1]}):
+            response = self.handle(request)
+            self.assertFalse(response["ok"], request)
+            self.assertIn("error", response)
+        self.assertEqual(self.handle([1])["error"], "A request has to be a JSON object")
+
+    def test_fields_not_text(self):
+        for username, password in ((5, "adm1n"), ("admin", 5), (["admin"], None), ({"a": 1}, "x")):
+            response = self.handle({"action": "login", "username": username, "password": password})
+            self.assertFalse(response["ok"])
+            self.assertIsNone(self.session["user"])
+
+        self.handle({"action": "login", "username": "admin", "password": "adm1n"})
+        for username, password in ((5, "x"), ("carol", 5)):
+            response = self.handle({"action": "register", "username": username, "password": password})
+            self.assertFalse(response["ok"])
+            self.assertIn("must be text", response["error"])
+        response = self.handle({"action": "add_task", "username": 5, "title": "Title",
+                                "description": "Description", "due_date": "2026-11-01"})
+        self.assertFalse(response["ok"])
+        self.assertEqual(len(self.store.tasks), 0)
+
+    def test_report_admin_only(self):
+        self.handle({"action": "login", "username": "bob", "password": "pw"})
+        response = self.handle({"action": "report"})
+        self.assertFalse(response["ok"])
+        self.assertEqual(response["error"], "Reports require admin privileges")
+
+    def test_search_limit(self):
+        self.handle({"action": "login", "username": "admin", "password": "adm1n"})
+        for number in range(5):
+            self.handle({"action": "add_task", "username": "admin", "title": f"Report {number}",
+                         "description": "Write the report", "due_date": "2026-11-01"})
+        response = self.handle({"action": "search", "query": "report", "limit": 2})
+        self.assertEqual(response["found"], 5)
+        self.assertEqual(len(response["tasks"]), 2)
+        self.assertFalse(self.handle({"action": "search", "query": "report", "limit": "all"})["ok"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+"""
+Checks that ShardedStorage reads back what it saved, and what a crash can leave in the shards
+
+Run with: python -m pytest tests  (or python -m unittest discover tests)
+"""
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from datetime import date
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import task_manager
+from task_manager import Task, TaskStore, ShardedStorage, collect_user_stats, export_tasks
+
+def make_task(username, title):
+    """
+    Returns a task of username with a title
+    """
+    return Task(username, title, "description", date(2026, 11, 1), date(2026, 10, 1), False)
+
+class ShardedStorageTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.shard_dir = os.path.join(self.directory, "shards")
+        self.user_file = os.path.join(self.directory, "user.txt")
+        self.tasks = [make_task("bob", "one"), make_task("carol", "two"), make_task("bob", "three")]
+        self.storage().replace_all(self.tasks, {"admin": "adm1n", "bob": "pw", "carol": "pw"})
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def storage(self):
+        return ShardedStorage(self.shard_dir, self.user_file)
+
+    def titles(self, tasks):
+        return [(task.username, task.title) for task in tasks]
+
+    def test_round_trip(self):
+        storage = self.storage()
+        tasks = storage.load_tasks()
+        self.assertEqual(self.titles(tasks), self.titles(self.tasks))
+
+        tasks.append(make_task("carol", "four"))
+        tasks[0].title = "one changed"
+        storage.save_tasks([0, 3], tasks)
+        self.assertEqual(self.titles(self.storage().load_tasks()), self.titles(tasks))
+
+    def test_reassigned(self):
+        storage = self.storage()
+        tasks = storage.load_tasks()
+        tasks[0].username = "carol"
+        storage.save_tasks([0], tasks)
+
+        storage = self.storage()
+        self.assertEqual(self.titles(storage.load_tasks()), self.titles(tasks))
+        self.assertEqual([i for i, task in storage.load_user_tasks("bob")], [2])
+        self.assertEqual([i for i, task in storage.load_user_tasks("carol")], [0, 1])
+
+    def crash_while_reassigning(self):
+        '''
+        Reassigns the first task to carol, crashing after it was added to the shard of carol
+        but before it was taken out of the shard of bob. Returns the tasks as they should be
+        '''
+        storage = self.storage()
+        tasks = storage.load_tasks()
+        tasks[0].username = "carol"
+        with mock.patch.object(ShardedStorage, "write_shard"):
+            storage.save_tasks([0], tasks)
+        return tasks
+
+    def test_crash_while_reassigning(self):
+        tasks = self.crash_while_reassigning()
+
+        #The new copy wins whichever shard is read first
+        shard_files = self.storage().shard_files()
+        crashed = {}
+        for file in shard_files:
+            with open(file) as shard:
+                crashed[file] = shard.read()
+        for files in (shard_files, shard_files[::-1]):
+            for file, content in crashed.items():
+                with open(file, "w") as shard:
+                    shard.write(content)
+            output, errors = io.StringIO(), io.StringIO()
+            with mock.patch.object(ShardedStorage, "shard_files", return_value=files), \
+                    contextlib.redirect_stdout(output), contextlib.redirect_stderr(errors):
+                self.assertEqual(self.titles(self.storage().load_tasks()), self.titles(tasks))
+            #Reported apart from the menu and exports
+            self.assertEqual(output.getvalue(), "")
+            self.assertIn("Task 0 is in", errors.getvalue())
+
+        #The stale copy was taken out of the shard of bob
+        self.assertEqual([i for i, task in self.storage().load_user_tasks("bob")], [2])
+
+    def test_crash_export(self):
+        tasks = self.crash_while_reassigning()
+        export_file = os.path.join(self.directory, "export.jsonl")
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            export_tasks(self.storage(), export_file, "jsonl")
+        with open(export_file) as exported:
+            rows = [json.loads(line) for line in exported]
+        self.assertEqual(sorted((row["username"], row["title"]) for row in rows), sorted(self.titles(tasks)))
+
+    def test_crash_user_stats(self):
+        tasks = self.crash_while_reassigning()
+        users = {"admin": "adm1n", "bob": "pw", "carol": "pw"}
+        today = date(2026, 10, 18).toordinal()
+        with contextlib.redirect_stderr(io.StringIO()):
+            self.assertEqual(self.storage().user_stats(users, today), collect_user_stats(users, tasks, today))
+
+    def test_crash_parallel_report(self):
+        tasks = self.crash_while_reassigning()
+        users = {"admin": "adm1n", "bob": "pw", "carol": "pw"}
+        today = date(2026, 10, 18).toordinal()
+        store = TaskStore(self.storage())
+        with mock.patch.object(task_manager, "REPORT_BACKEND", "parallel"), contextlib.redirect_stderr(io.StringIO()):
+            report = store.report_tasks()
+            self.assertEqual(report.task_count(), len(tasks))
+            self.assertEqual(report.user_stats(users, today), collect_user_stats(users, tasks, today))
+
+    def test_missing_task(self):
+        #Takes the task at position 1 out of the shard of carol
+        with open(self.storage().shard_file("carol"), "w"):
+            pass
+        with self.assertRaisesRegex(ValueError, r"no task at positions \[1\]"):
+            self.storage().load_tasks()
+
+if __name__ == "__main__":
+    unittest.main()
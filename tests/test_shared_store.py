@@ -0,0 +1,88 @@
+"""
+Checks that two stores on the same files in "shared" mode keep their indexes the same as
+indexes built from scratch, when they change the same task
+
+Run with: python -m pytest tests  (or python -m unittest discover tests)
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import task_manager
+from task_manager import DueDateIndex, Task, TaskStore, TextStorage, UserTaskIndex, collect_user_stats
+
+TODAY = date.today()
+
+class SharedStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.task_file = os.path.join(self.directory, "tasks.txt")
+        self.user_file = os.path.join(self.directory, "user.txt")
+        users = {"admin": "adm1n", "bob": "pw", "carol": "pw"}
+        #Enough tasks that one change is below SYNC_REBUILD_LIMIT, so the indexes are updated instead of rebuilt
+        self.assertLess(1, task_manager.SYNC_REBUILD_LIMIT * 100)
+        tasks = [Task("bob", f"Task {i}", "description", TODAY + timedelta(days=i % 7 - 2), TODAY, False)
+                 for i in range(99)]
+        tasks.append(Task("carol", "Task 99", "description", TODAY + timedelta(days=3), TODAY, False))
+        TextStorage(self.task_file, self.user_file).replace_all(tasks, users)
+
+        self.store_a = self.open_store()
+        self.store_b = self.open_store()
+
+    def tearDown(self):
+        self.store_a.close()
+        self.store_b.close()
+        shutil.rmtree(self.directory)
+
+    def open_store(self):
+        store = TaskStore(TextStorage(self.task_file, self.user_file, "shared"))
+        #The indexes the menu keeps current
+        store.user_task_index
+        store.due_date_index
+        store.report_cache
+        return store
+
+    def change(self, store, index, field, value):
+        task = store.tasks[index]
+        old_task = task.copy()
+        setattr(task, field, value)
+        store.update_task(index, old_task)
+
+    def assertIndexesCurrent(self, store):
+        tasks = store.tasks
+        self.assertEqual(store.due_date_index.entries, DueDateIndex(tasks).entries)
+        fresh_user_index = UserTaskIndex(tasks)
+        for user in store.users:
+            self.assertEqual(list(store.user_task_index.tasks_of(user)), list(fresh_user_index.tasks_of(user)))
+        today = TODAY.toordinal()
+        self.assertEqual(store.report_cache.user_stats(store.users, today), collect_user_stats(store.users, tasks, today))
+
+    def test_same_task_changed_by_both(self):
+        #B reassigns the task, then A moves its due date back without having seen that
+        self.change(self.store_b, 3, "username", "carol")
+        self.change(self.store_a, 3, "due_ordinal", self.store_a.tasks[3].due_ordinal - 5)
+
+        #Both changes are kept
+        task = self.store_a.tasks[3]
+        self.assertEqual((task.username, task.due_ordinal), ("carol", (TODAY + timedelta(days=1 - 5)).toordinal()))
+        self.assertIndexesCurrent(self.store_a)
+
+        self.store_b.sync()
+        self.assertEqual(self.store_b.tasks[3].to_string(), task.to_string())
+        self.assertIndexesCurrent(self.store_b)
+
+    def test_other_tasks_changed(self):
+        self.change(self.store_b, 5, "completed", True)
+        self.change(self.store_b, 6, "username", "carol")
+        self.change(self.store_a, 3, "completed", True)
+        self.assertIndexesCurrent(self.store_a)
+        self.assertTrue(self.store_a.tasks[5].completed)
+
+if __name__ == "__main__":
+    unittest.main()
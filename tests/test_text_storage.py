@@ -0,0 +1,93 @@
+"""
+Checks that TextStorage only writes the tasks file when the journal is merged into it
+
+Run with: python -m pytest tests  (or python -m unittest discover tests)
+"""
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from datetime import date
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import task_manager
+from task_manager import Task, TaskStore, TextStorage, export_tasks, file_stamp, journal_file_name, readTasks
+
+class TextStorageTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.task_file = os.path.join(self.directory, "tasks.txt")
+        self.user_file = os.path.join(self.directory, "user.txt")
+        with open(self.user_file, "w") as user_file:
+            user_file.write("admin;adm1n\nbob;pw")
+        tasks = [Task("bob", f"Task {i}", "description", date(2026, 11, 1), date(2026, 10, 1), False) for i in range(50)]
+        TextStorage(self.task_file, self.user_file).replace_all(tasks, {"admin": "adm1n", "bob": "pw"})
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def storage(self):
+        return TextStorage(self.task_file, self.user_file, "journal")
+
+    def export(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            export_tasks(self.storage(), os.path.join(self.directory, "export.jsonl"), "jsonl")
+        with open(os.path.join(self.directory, "export.jsonl")) as export_file:
+            return export_file.read()
+
+    def complete(self, index):
+        store = TaskStore(self.storage())
+        old_task = store.tasks[index].copy()
+        store.tasks[index].completed = True
+        store.update_task(index, old_task)
+        store.close()
+
+    def assertNotWritten(self, function):
+        stamps = file_stamp(self.task_file), file_stamp(journal_file_name(self.task_file))
+        function()
+        self.assertEqual((file_stamp(self.task_file), file_stamp(journal_file_name(self.task_file))), stamps)
+
+    def test_read_only_sessions(self):
+        def view():
+            store = TaskStore(self.storage())
+            store.user_tasks("bob")
+            store.close()
+
+        #With an empty journal, and with changes in the journal
+        for index in (None, 3):
+            if index is not None:
+                self.complete(index)
+            self.assertNotWritten(view)
+            self.assertNotWritten(self.export)
+        self.assertIn('"title": "Task 3", "description": "description", "due_date": "2026-11-01", '
+                      '"assigned_date": "2026-10-01", "completed": true', self.export())
+
+    def test_changes_are_appended(self):
+        stamp = file_stamp(self.task_file)
+        for index in range(5):
+            self.complete(index)
+        #Every change is one journal record, the tasks file is still the same
+        self.assertEqual(file_stamp(self.task_file), stamp)
+        with open(journal_file_name(self.task_file)) as journal:
+            self.assertEqual(len(journal.readlines()), 5)
+        self.assertEqual([task.completed for task in readTasks(self.task_file)[:6]], [True] * 5 + [False])
+
+    def test_compacts_at_limit(self):
+        with mock.patch.object(task_manager, "JOURNAL_COMPACT_LIMIT", 4):
+            for index in range(3):
+                self.complete(index)
+            stamp = file_stamp(self.task_file)
+            #Records left by earlier sessions count towards the limit
+            self.complete(3)
+        self.assertNotEqual(file_stamp(self.task_file), stamp)
+        self.assertEqual(os.path.getsize(journal_file_name(self.task_file)), 0)
+        self.assertEqual([task.completed for task in readTasks(self.task_file)[:5]], [True] * 4 + [False])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+"""
+Checks that UserDirectory finds the same users and passwords as readUsers
+
+Run with: python -m pytest tests  (or python -m unittest discover tests)
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import task_manager
+from task_manager import UserDirectory, readUsers, user_index_file_name
+
+class UserDirectoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.user_file = os.path.join(self.directory, "user.txt")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, content, mode = "w"):
+        with open(self.user_file, mode, newline="") as user_file:
+            user_file.write(content)
+
+    def assertSameUsers(self, users):
+        expected = readUsers(self.user_file)
+        self.assertEqual(dict(users), expected)
+        self.assertEqual(list(users), list(expected))
+        self.assertEqual(len(users), len(expected))
+        for username, password in expected.items():
+            self.assertIn(username, users)
+            self.assertEqual(users[username], password)
+        self.assertNotIn("nobody", users)
+
+    def test_duplicate_names(self):
+        #The last line of a user wins, like in readUsers
+        self.write("admin;password\nbob;old\ncarol;pw\nbob;new")
+        users = UserDirectory(self.user_file)
+        self.assertEqual(users["bob"], "new")
+        self.assertSameUsers(users)
+
+    def test_windows_line_endings(self):
+        self.write("admin;password\r\nbob;pw\r\ncarol;secret\r\n")
+        users = UserDirectory(self.user_file)
+        self.assertEqual(users["carol"], "secret")
+        self.assertEqual(users["admin"], "password")
+        self.assertEqual(list(users), ["admin", "bob", "carol"])
+
+    def test_users_past_the_index(self):
+        self.write("admin;password\nbob;pw")
+        UserDirectory(self.user_file)
+        #Another process appends users after the index was written
+        self.write("\ncarol;pw\nbob;changed", "a")
+        users = UserDirectory(self.user_file)
+        self.assertEqual(users.indexed_size, len("admin;password\nbob;pw"))
+        self.assertEqual(users["carol"], "pw")
+        self.assertEqual(users["bob"], "changed")
+        self.assertSameUsers(users)
+
+    def test_stale_index(self):
+        self.write("admin;password\nbob;pw\ncarol;pw")
+        UserDirectory(self.user_file)
+        #Edited in place, the index points at lines that moved
+        self.write("admin;password\ndave;pw\nbob;other")
+        users = UserDirectory(self.user_file)
+        self.assertNotIn("carol", users)
+        self.assertEqual(users["bob"], "other")
+        self.assertSameUsers(users)
+
+        #An index that is not an index at all
+        with open(user_index_file_name(self.user_file), "wb") as index_file:
+            index_file.write(b"\0" * 100)
+        self.assertSameUsers(UserDirectory(self.user_file))
+
+    def test_keys_not_text(self):
+        self.write("admin;password\nbob;pw")
+        users = UserDirectory(self.user_file)
+        #Like a dict of str keys, other keys are not there
+        for username in (None, 5, b"bob", ["bob"], {"name": "bob"}):
+            self.assertNotIn(username, users)
+            with self.assertRaises(KeyError):
+                users[username]
+            self.assertIsNone(users.get(username))
+        self.assertEqual(users.get("bob"), "pw")
+
+    def test_append_and_rebuild(self):
+        self.write("admin;password")
+        users = UserDirectory(self.user_file)
+        old_maps = (users.data, users.index_data)
+        with mock.patch.object(task_manager, "USER_INDEX_REBUILD", 3):
+            for number in range(3):
+                users[f"user{number}"] = "pw"
+                users.append([f"user{number}"])
+        #The index was written again and the old maps closed
+        self.assertTrue(all(old_map.closed for old_map in old_maps))
+        self.assertEqual(users.added, {})
+        self.assertEqual(users["user2"], "pw")
+        self.assertSameUsers(users)
+        users.close()
+
+if __name__ == "__main__":
+    unittest.main()